@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from django.utils import timezone
+from .models import User, OutboundEmail
 
 
 @admin.register(User)
@@ -61,4 +62,23 @@ class UserAdmin(BaseUserAdmin):
             self.message_user(request, f'Password for {user.username}: {password}')
         
         self.message_user(request, f'Generated passwords for {updated_count} users.')
-    generate_random_passwords.short_description = "Generate random passwords"
\ No newline at end of file
+    generate_random_passwords.short_description = "Generate random passwords"
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Admin for the outbound email queue"""
+    
+    list_display = ('subject', 'to_email', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('to_email', 'from_email', 'subject', 'attempts', 'last_error', 'created_at', 'sent_at')
+    exclude = ('body', 'html_body')
+    ordering = ('-created_at',)
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        """Queue selected emails for immediate delivery"""
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} emails were queued for delivery.')
+    retry_now.short_description = "Retry selected emails now"
@@ -1,5 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, PasswordResetForm, SetPasswordForm
+from django.template.loader import render_to_string
+from django.utils import timezone
+from . import mail
 from .models import User
 
 
@@ -42,34 +45,20 @@ class StudentRegistrationForm(UserCreationForm):
         
         if commit:
             user.save()
-            # Send registration confirmation email
+            # Queue registration confirmation email
             if user.email:
-                try:
-                    from django.core.mail import send_mail
-                    from django.template.loader import render_to_string
-                    from django.urls import reverse
-                    from django.conf import settings
-                    from django.utils import timezone
-                    
-                    login_url = f"{getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')}{reverse('accounts:login')}"
-                    html_message = render_to_string('emails/registration_confirmation.html', {
-                        'username': user.username,
-                        'first_name': user.first_name or user.username,
-                        'login_url': login_url,
-                        'year': timezone.now().year,
-                    })
-                    send_mail(
-                        subject='Student Account Registration - Pending Approval',
-                        message=f"Hello {user.first_name or user.username},\n\nThank you for registering as a student.\nUsername: {user.username}\n\nYour account is pending approval from an evaluator. You will receive another email once your account is approved and activated.",
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        html_message=html_message,
-                        fail_silently=False,
-                    )
-                except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Failed to send registration email to {user.email}: {str(e)}")
+                html_message = render_to_string('emails/registration_confirmation.html', {
+                    'username': user.username,
+                    'first_name': user.first_name or user.username,
+                    'login_url': mail.login_url(),
+                    'year': timezone.now().year,
+                })
+                mail.enqueue(
+                    user.email,
+                    subject='Student Account Registration - Pending Approval',
+                    body=f"Hello {user.first_name or user.username},\n\nThank you for registering as a student.\nUsername: {user.username}\n\nYour account is pending approval from an evaluator. You will receive another email once your account is approved and activated.",
+                    html_body=html_message,
+                )
         return user
 
 
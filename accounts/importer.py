@@ -0,0 +1,205 @@
+"""
+Bulk user import from CSV or XLSX rosters.
+
+Rows are streamed from the file and processed in chunks. Each chunk is
+validated against itself and the database with one query per unique
+column, then passwords generated with ``secrets.token_urlsafe`` are hashed
+in a process pool and the users are inserted with ``bulk_create``.
+Credential emails are queued in the outbox for the mail worker.
+"""
+import csv
+import io
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from . import mail
+from .models import User
+
+COLUMNS = ['username', 'first_name', 'last_name', 'email', 'role', 'student_id', 'department', 'batch', 'phone_number']
+ROLES = {role for role, _ in User.ROLE_CHOICES if role != 'admin'}
+CHUNK_SIZE = 1000
+
+
+class ImportFileError(Exception):
+    """The roster cannot be read"""
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import run"""
+    created: int = 0
+    errors: list = field(default_factory=list)  # [(line number, message)]
+    queued: int = 0  # credential emails queued
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def read_csv(fileobj):
+    reader = csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [_clean(name).lower() for name in header]
+    for values in reader:
+        yield dict(zip(header, map(_clean, values)))
+
+
+def read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files requires the openpyxl package')
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [_clean(name).lower() for name in header]
+        for values in rows:
+            yield dict(zip(header, map(_clean, values)))
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    """Stream roster rows from a binary file as dicts keyed by lowercase column name"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return read_csv(fileobj)
+    if extension == '.xlsx':
+        return read_xlsx(fileobj)
+    raise ImportFileError(f'Unsupported roster format "{extension}", use .csv or .xlsx')
+
+
+def _validate_chunk(chunk, seen):
+    """Split a chunk of (line, row) into valid rows and errors"""
+    usernames = {row.get('username', '') for _, row in chunk}
+    # User.email is not unique in the database, so existing addresses are matched case-insensitively here
+    emails = {row.get('email', '').lower() for _, row in chunk} - {''}
+    student_ids = {row.get('student_id', '') for _, row in chunk} - {''}
+    taken = {
+        'username': set(User.objects.filter(username__in=usernames).values_list('username', flat=True)),
+        'email': set(
+            User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+            .values_list('email_lower', flat=True)
+        ),
+        'student_id': set(User.objects.filter(student_id__in=student_ids).values_list('student_id', flat=True)),
+    }
+    username_validator = UnicodeUsernameValidator()
+
+    valid, errors = [], []
+    for line, row in chunk:
+        row = {column: row.get(column, '') for column in COLUMNS}
+        row['role'] = row['role'].lower() or 'student'
+        try:
+            if not row['username']:
+                raise ValidationError('username is required')
+            username_validator(row['username'])
+            if row['role'] not in ROLES:
+                raise ValidationError(f'unknown role "{row["role"]}"')
+            if row['email']:
+                validate_email(row['email'])
+            for column in COLUMNS:
+                max_length = User._meta.get_field(column).max_length
+                if len(row[column]) > max_length:
+                    raise ValidationError(f'{column} is longer than {max_length} characters')
+            for column in ('username', 'email', 'student_id'):
+                value = row[column].lower() if column == 'email' else row[column]
+                if not value:
+                    continue
+                if value in taken[column]:
+                    raise ValidationError(f'{column} "{row[column]}" already exists')
+                if value in seen[column]:
+                    raise ValidationError(f'duplicate {column} "{row[column]}" in file')
+        except ValidationError as e:
+            errors.append((line, ' '.join(e.messages)))
+            continue
+        for column in ('username', 'email', 'student_id'):
+            if row[column]:
+                seen[column].add(row[column].lower() if column == 'email' else row[column])
+        valid.append(row)
+    return valid, errors
+
+
+def _init_worker():
+    # Spawned workers start without Django configured
+    django.setup()
+
+
+def _hash_passwords(passwords, pool, workers):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=max(len(passwords) // (4 * workers), 1)))
+
+
+def _create_users(rows, pool, workers, send_emails, result):
+    passwords = [secrets.token_urlsafe(10) for _ in rows]
+    users = [
+        User(
+            username=row['username'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            role=row['role'],
+            student_id=row['student_id'] or None,
+            department=row['department'] or None,
+            batch=row['batch'] or None,
+            phone_number=row['phone_number'] or None,
+            password=password_hash,
+            is_active=True,
+            approval_status='approved',
+        )
+        for row, password_hash in zip(rows, _hash_passwords(passwords, pool, workers))
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=CHUNK_SIZE)
+        if send_emails:
+            result.queued += mail.enqueue_credentials(zip(users, passwords))
+
+
+def import_users(rows, workers=None, dry_run=False, send_emails=True, chunk_size=CHUNK_SIZE):
+    """
+    Create users from an iterable of row dicts.
+
+    ``workers`` is the size of the password hashing pool; ``1`` hashes in
+    process. Invalid rows are reported in the result and skipped. With
+    ``dry_run`` rows are only validated and ``created`` counts the rows
+    that would be created. With ``send_emails`` each chunk queues the
+    credential emails of its users in the same transaction.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = ImportResult()
+    seen = {'username': set(), 'email': set(), 'student_id': set()}
+    numbered = enumerate(rows, start=2)  # line 1 is the header
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 and not dry_run else None
+    try:
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            valid, errors = _validate_chunk(chunk, seen)
+            result.errors.extend(errors)
+            if valid and not dry_run:
+                _create_users(valid, pool, workers, send_emails, result)
+            result.created += len(valid)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result
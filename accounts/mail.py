@@ -0,0 +1,157 @@
+"""
+Durable outbound email.
+
+Requests only enqueue OutboundEmail rows; the ``run_mail_worker`` command
+delivers them in batches over one persistent backend connection. Failed
+messages are retried with exponential backoff until MAX_ATTEMPTS, and
+message bodies are cleared once delivered since they may carry passwords
+or reset links.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=2)
+# A claimed message is retried after this long if its worker died mid-send
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def login_url():
+    return f"{getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')}{reverse('accounts:login')}"
+
+
+def build(to_email, subject, body, html_body='', from_email=None):
+    """An unsaved outbox row"""
+    return OutboundEmail(
+        to_email=to_email,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+    )
+
+
+def enqueue(to_email, subject, body, html_body='', from_email=None):
+    """Queue one email for the mail worker"""
+    message = build(to_email, subject, body, html_body, from_email)
+    message.save()
+    return message
+
+
+def credentials_email(user, password):
+    """Unsaved account credentials email for a new user"""
+    role = user.get_role_display()
+    url = login_url()
+    html_body = render_to_string('emails/credentials_template.html', {
+        'username': user.username,
+        'password': password,
+        'role': role,
+        'user_type': role,
+        'first_name': user.first_name or user.username,
+        'login_url': url,
+        'year': timezone.now().year,
+    })
+    return build(
+        user.email,
+        f'Your {role} Account Credentials - Student Report System',
+        f"Hello {user.first_name or user.username},\n\nYour {role.lower()} account has been created.\nUsername: {user.username}\nPassword: {password}\n\nPlease log in at {url} and change your password.",
+        html_body,
+    )
+
+
+def enqueue_credentials(credentials):
+    """Queue credential emails for (user, password) pairs. Returns the number queued."""
+    messages = [credentials_email(user, password) for user, password in credentials if user.email]
+    OutboundEmail.objects.bulk_create(messages, batch_size=BATCH_SIZE * 10)
+    return len(messages)
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def claim(batch_size=BATCH_SIZE):
+    """
+    Reserve up to batch_size due messages for this worker.
+
+    Claimed rows get their attempt counted and next_attempt_at pushed out by
+    CLAIM_TIMEOUT, so concurrent workers skip them and a crashed worker's
+    messages come back on their own.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def _as_email(message, connection):
+    email = EmailMultiAlternatives(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email,
+        to=[message.to_email],
+        connection=connection,
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def _record_failure(message, error):
+    now = timezone.now()
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = 'failed'
+        logger.error(f"Giving up on email {message.id} to {message.to_email} after {message.attempts} attempts: {error}")
+    else:
+        message.next_attempt_at = now + backoff(message.attempts)
+        logger.warning(f"Email {message.id} to {message.to_email} failed, retrying at {message.next_attempt_at}: {error}")
+    message.last_error = str(error)
+    message.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def deliver(connection, batch_size=BATCH_SIZE):
+    """
+    Send one batch of due messages over an open backend connection.
+
+    Returns (sent, failed) counts; (0, 0) means the outbox had nothing due.
+    """
+    messages = claim(batch_size)
+    sent_ids, failed = [], 0
+    for message in messages:
+        try:
+            connection.open()
+            connection.send_messages([_as_email(message, connection)])
+        except Exception as e:
+            # Drop a possibly broken connection; the next message reopens it
+            connection.close()
+            _record_failure(message, e)
+            failed += 1
+        else:
+            sent_ids.append(message.id)
+    if sent_ids:
+        OutboundEmail.objects.filter(id__in=sent_ids).update(
+            status='sent', sent_at=timezone.now(), body='', html_body='', last_error=''
+        )
+    return len(sent_ids), failed
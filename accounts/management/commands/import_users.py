@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import importer
+from reports import dashboards
+
+
+class Command(BaseCommand):
+    help = 'Create users in bulk from a CSV or XLSX roster and queue their credential emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file (.csv or .xlsx) with a header row')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes used to hash passwords (default: number of CPUs)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the roster without creating users')
+        parser.add_argument('--no-email', action='store_true', help='Do not queue credential emails')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as roster:
+                rows = importer.read_rows(roster, path)
+                result = importer.import_users(
+                    rows, workers=options['workers'], dry_run=options['dry_run'], send_emails=not options['no_email']
+                )
+        except (OSError, importer.ImportFileError) as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{result.created} rows valid, {len(result.errors)} rows with errors. No users were created.'
+            ))
+            return
+
+        # bulk_create sends no signals
+        dashboards.invalidate(dashboards.ADMIN_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created} users, skipped {len(result.errors)} rows, queued {result.queued} credential emails.'
+        ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from accounts import mail
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails over one persistent connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox has nothing due')
+        parser.add_argument('--batch-size', type=int, default=mail.BATCH_SIZE, help='Messages claimed per batch')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = mail.deliver(connection, batch_size=options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} emails, {failed} failed')
+                    continue
+                if options['once']:
+                    break
+                # Do not hold an idle SMTP session open between polls
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS(f'Mail worker stopped: {total_sent} sent, {total_failed} failed.'))
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -33,6 +34,13 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # user_management pages through users newest first, optionally by role
+            models.Index(fields=['-date_joined', '-id'], name='accounts_joined_idx'),
+            models.Index(fields=['role', '-date_joined', '-id'], name='accounts_role_joined_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
     
@@ -46,4 +54,37 @@ class User(AbstractUser):
     
     @property
     def is_admin(self):
-        return self.role == 'admin' or getattr(self, 'is_superuser', False)
\ No newline at end of file
+        return self.role == 'admin' or getattr(self, 'is_superuser', False)
+
+
+class OutboundEmail(models.Model):
+    """Email waiting in the outbox for the mail worker (see accounts.mail)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True, help_text='Cleared after delivery, may contain credentials')
+    html_body = models.TextField(blank=True, help_text='Cleared after delivery, may contain credentials')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='accounts_outbox_due_idx'),
+        ]
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+    
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.get_status_display()})"
@@ -1,3 +1,228 @@
-from django.test import TestCase
+import io
+import socketserver
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from reports import dashboards
+from .models import User, OutboundEmail
+from . import importer
+from . import mail as outbox
+
+ROSTER = (
+    'Username,First_Name,Last_Name,Email,Role,Student_ID,Department,Batch\n'
+    'alice,Alice,Able,alice@example.com,,S1,Computer Science,2024\n'
+    'bob,Bob,Baker,bob@example.com,evaluator,,Civil,\n'
+    'alice,Alice,Again,alice2@example.com,,S2,,\n'
+    'carol,Carol,Cole,not-an-email,,,,\n'
+    'dave,Dave,Dunn,,admin,,,\n'
+    'erin,Erin,Eve,,,,,\n'
+)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTests(TestCase):
+
+    def rows(self, text=ROSTER):
+        return importer.read_rows(io.BytesIO(text.encode()), 'roster.csv')
+
+    def test_import_validates_and_creates(self):
+        result = importer.import_users(self.rows(), workers=2)
+        self.assertEqual(result.created, 3)
+        self.assertEqual([line for line, _ in result.errors], [4, 5, 6])
+        self.assertIn('duplicate username', result.errors[0][1])
+
+        alice = User.objects.get(username='alice')
+        self.assertEqual((alice.role, alice.student_id, alice.approval_status), ('student', 'S1', 'approved'))
+        self.assertEqual(User.objects.get(username='bob').role, 'evaluator')
+        self.assertEqual(result.queued, 2)
+        queued = OutboundEmail.objects.get(to_email='alice@example.com')
+        password = queued.body.split('Password: ')[1].split()[0]
+        self.assertTrue(alice.check_password(password))
+
+        again = importer.import_users(self.rows(), workers=1)
+        self.assertEqual(again.created, 0)
+
+    def test_existing_email_matches_case_insensitively(self):
+        User.objects.create_user(username='existing', email='alice@example.com', password='pass12345')
+        rows = self.rows('username,email\nnewalice,Alice@Example.COM\n')
+        result = importer.import_users(rows, workers=1)
+        self.assertEqual(result.created, 0)
+        self.assertIn('email "Alice@Example.COM" already exists', result.errors[0][1])
+
+    def test_dry_run_creates_nothing(self):
+        result = importer.import_users(self.rows(), workers=1, dry_run=True)
+        self.assertEqual((result.created, len(result.errors)), (3, 3))
+        self.assertFalse(User.objects.exists())
+
+    def test_xlsx_roster(self):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        workbook.active.append(['username', 'email', 'student_id'])
+        workbook.active.append(['frank', 'frank@example.com', 1001])
+        data = io.BytesIO()
+        workbook.save(data)
+        data.seek(0)
+        result = importer.import_users(importer.read_rows(data, 'roster.xlsx'), workers=1)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(User.objects.get(username='frank').student_id, '1001')
+
+    def test_command_and_upload_page_send_credentials(self):
+        admin = User.objects.create_user(username='admin', password='pass12345', role='admin')
+        self.client.force_login(admin)
+        roster = SimpleUploadedFile('roster.csv', ROSTER.encode())
+        with mock.patch('django.core.mail.get_connection', side_effect=AssertionError('SMTP during the import')):
+            response = self.client.post(reverse('reports:admin_import_users'), {'roster': roster, 'send_emails': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 2)
+        self.assertEqual(len(response.context['errors']), 3)
+        self.assertEqual(mail.outbox, [])
+        call_command('run_mail_worker', '--once', stdout=io.StringIO())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['alice@example.com', 'bob@example.com'])
+
+        out = io.StringIO()
+        with tempfile.NamedTemporaryFile(suffix='.csv') as roster:
+            roster.write(b'username,email\ngrace,grace@example.com\n')
+            roster.flush()
+            with mock.patch('reports.dashboards.invalidate') as invalidate:
+                call_command('import_users', roster.name, '--workers', '1', stdout=out, stderr=io.StringIO())
+        self.assertIn('Created 1 users', out.getvalue())
+        # The admin dashboard's user counts are refreshed although bulk_create sends no signals
+        invalidate.assert_called_once_with(dashboards.ADMIN_SCOPE)
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').get().to_email, 'grace@example.com')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server recording connections and messages"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connections = 0
+        self.messages = []
+        self.reject = set()
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 sink ready')
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 sink')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip('<> ')
+                if address in self.server.reject:
+                    self.reply('550 mailbox unavailable')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 end with .')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                self.server.messages.extend(recipients)
+                recipients = []
+                self.reply('250 queued')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                if verb == 'RSET':
+                    recipients = []
+                self.reply('250 OK')
+
+
+class MailWorkerTests(TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink()
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+        self.addCleanup(self.sink.server_close)
+        self.addCleanup(self.sink.shutdown)
+        smtp = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.sink.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        )
+        smtp.enable()
+        self.addCleanup(smtp.disable)
+
+    def test_batch_reuses_one_connection_and_clears_bodies(self):
+        for i in range(5):
+            outbox.enqueue(f'user{i}@example.com', 'Hello', 'Password: secret', '<p>secret</p>')
+        call_command('run_mail_worker', '--once', stdout=io.StringIO())
+
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(len(self.sink.messages), 5)
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'body', 'html_body')), {('sent', '', '')})
+
+    def test_failures_back_off_then_give_up(self):
+        self.sink.reject.add('bounce@example.com')
+        bounce = outbox.enqueue('bounce@example.com', 'Hello', 'body')
+        outbox.enqueue('ok@example.com', 'Hello', 'body')
+        call_command('run_mail_worker', '--once', stdout=io.StringIO())
+
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), ('pending', 1))
+        self.assertGreater(bounce.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        self.assertIn('550', bounce.last_error)
+        self.assertEqual(self.sink.messages, ['ok@example.com'])
+
+        OutboundEmail.objects.filter(id=bounce.id).update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        call_command('run_mail_worker', '--once', stdout=io.StringIO())
+        bounce.refresh_from_db()
+        self.assertEqual(bounce.status, 'failed')
+        self.assertEqual(bounce.body, 'body')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class HomePageTests(TestCase):
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pass12345', role='student')
+        self.url = reverse('accounts:home')
+
+    def test_anonymous_visit_skips_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'name="password"')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_stale_signed_cookie_skips_the_database(self):
+        self.client.cookies['sessionid'] = 'not-a-signed-session'
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'name="password"')
+
+    def test_logged_in_user_is_sent_to_their_dashboard(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('reports:student_dashboard'), fetch_redirect_response=False)
+
+    def test_login_and_logout(self):
+        response = self.client.post(self.url, {'username': 'student', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('reports:student_dashboard'), fetch_redirect_response=False)
+        self.client.post(reverse('accounts:logout'))
+        response = self.client.get(self.url)
+        self.assertContains(response, 'logged out successfully')
@@ -10,7 +10,6 @@ from django.urls import reverse_lazy, reverse
 from django.views.generic import CreateView
 from django.utils import timezone
 from django.http import HttpResponseForbidden, HttpResponseRedirect
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.views.decorators.http import require_http_methods
@@ -21,6 +20,7 @@ from .forms import (
     StudentRegistrationForm, UserRegistrationForm, UserUpdateForm,
     CustomPasswordResetForm, CustomSetPasswordForm
 )
+from . import mail
 from .models import User
 
 logger = logging.getLogger(__name__)
@@ -180,14 +180,13 @@ class CustomPasswordResetView(PasswordResetView):
         # Render HTML email
         html_message = render_to_string(email_template_name, context)
         
-        # Send HTML email
-        send_mail(
+        # Queue HTML email for the mail worker
+        mail.enqueue(
+            to_email,
             subject=subject,
-            message=strip_tags(html_message),  # Plain text fallback
+            body=strip_tags(html_message),  # Plain text fallback
+            html_body=html_message,
             from_email=from_email,
-            recipient_list=[to_email],
-            html_message=html_message,  # HTML version
-            fail_silently=False,
         )
 
 
@@ -230,45 +229,19 @@ def profile_view(request):
 @never_cache
 def home_view(request):
     """Home page view - ONLY shows login form, NEVER dashboard content"""
-    # CRITICAL: Force clear all sessions/cookies to prevent stale redirects
-    # This ensures home page ALWAYS shows login form, not cached dashboards
-    from django.contrib.sessions.models import Session
-    import time
-    
-    # ALWAYS clear session cookie on home page - start fresh
-    # This prevents stale cookies from causing redirects to dashboards
-    session_key = request.COOKIES.get('sessionid')
-    if session_key:
-        try:
-            Session.objects.filter(session_key=session_key).delete()
-        except:
-            pass
-    
-    # CRITICAL FIX: Only redirect if user is VALIDLY authenticated
-    # Check authentication with database validation
-    if request.user.is_authenticated:
-        try:
-            # Force database check - refresh user from database
-            user = request.user
-            user.refresh_from_db()  # Refresh from database to validate
-            
-            # Only redirect if user exists, is active, and has valid session
-            if user.is_active and hasattr(user, 'role'):
-                if user.is_admin:
-                    return redirect('reports:admin_dashboard')
-                elif user.is_student:
-                    return redirect('reports:student_dashboard')
-                elif user.is_evaluator:
-                    return redirect('reports:evaluator_dashboard')
-        except Exception as e:
-            # User doesn't exist or session is invalid - clear everything
-            from django.contrib.auth import logout
-            logout(request)
-            request.session.flush()
-            logger.warning(f"Cleared invalid session on home page: {e}")
-    
-    # At this point, we're showing login page - ensure clean state
-    # Don't delete cookies here as they may be needed for CSRF
+    # Anonymous visitors must cost no database work here: without a session
+    # cookie request.user is resolved without a query, and a cookie naming a
+    # missing or expired session is removed by SessionMiddleware. A valid
+    # session has already been checked against the user's password hash and
+    # active flag when request.user was loaded, so it needs no refresh.
+    user = request.user
+    if user.is_authenticated:
+        if user.is_admin:
+            return redirect('reports:admin_dashboard')
+        elif user.is_student:
+            return redirect('reports:student_dashboard')
+        elif user.is_evaluator:
+            return redirect('reports:evaluator_dashboard')
     
     # Handle login form submission on home page (ONLY for unauthenticated users)
     if request.method == 'POST':
@@ -309,19 +282,4 @@ def home_view(request):
         form = AuthenticationForm()
     
     # Render home page with login form ONLY (no dashboard content)
-    response = render(request, 'accounts/home.html', {'form': form})
-    
-    # Add comprehensive no-cache headers to prevent browser caching
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0, private'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
-    response['X-Frame-Options'] = 'DENY'
-    
-    # Only delete session cookie if user is not authenticated (stale cookie)
-    if not request.user.is_authenticated:
-        response.delete_cookie('sessionid', path='/', domain=None)
-    
-    # Add timestamp to prevent caching
-    response['Last-Modified'] = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime())
-    
-    return response
+    return render(request, 'accounts/home.html', {'form': form})
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Benchmark landing page requests per second for each session backend.
+
+Builds a throwaway test database with one student, then drives the WSGI
+application directly with GET requests for the home page: without a
+session cookie, with a cookie naming no session (an expired or logged out
+visitor) and with the student's valid session, which is redirected to the
+dashboard. For every session backend it prints the requests per second and
+the database queries each request made.
+
+Run it on an older checkout to compare; the script only changes
+SESSION_ENGINE, which every version reads.
+
+Usage:
+    python benchmarks/landing_page.py
+    python benchmarks/landing_page.py --requests 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_report_system.settings')
+
+try:
+    import pymysql
+    pymysql.install_as_MySQLdb()
+except ImportError:
+    pass
+
+import django
+from django.conf import settings
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000, help='Requests timed per backend and visitor')
+    return parser.parse_args()
+
+
+def visitors(student):
+    """(label, Cookie header) of each kind of visitor, for the current SESSION_ENGINE"""
+    from django.test import Client
+
+    client = Client()
+    client.force_login(student)
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return [
+        ('anonymous', ''),
+        ('stale cookie', f'{settings.SESSION_COOKIE_NAME}=0123456789abcdefghijklmnopqrstuv'),
+        ('logged in', f'{settings.SESSION_COOKIE_NAME}={session}'),
+    ]
+
+
+def request(application, environ):
+    status_line = {}
+
+    def start_response(status, headers, exc_info=None):
+        status_line['status'] = status
+
+    result = application(dict(environ), start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        result.close()
+    return status_line['status']
+
+
+def run(application, environ, count):
+    from django.db import connection
+
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    # Warm up, and count the queries of a steady-state request (the query
+    # log is reset when a request starts, so it cannot be used here)
+    request(application, environ)
+    with connection.execute_wrapper(count_query):
+        status = request(application, environ)
+    started = time.perf_counter()
+    for _ in range(count):
+        request(application, environ)
+    elapsed = time.perf_counter() - started
+    return status, count / elapsed, len(queries)
+
+
+def main():
+    args = parse_args()
+    django.setup()
+    from django.core.cache import cache
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.urls import reverse
+    from accounts.models import User
+
+    original_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        student = User.objects.create_user('bench-student', password='!', role='student')
+        url = reverse('accounts:home')
+        print(f'{args.requests} requests per backend and visitor\n')
+        print(f'{"backend":<16} {"visitor":<14} {"status":<18} {"req/s":>9} {"queries":>8}')
+        for backend, engine in ENGINES.items():
+            settings.SESSION_ENGINE = engine
+            cache.clear()
+            # Middleware reads SESSION_ENGINE when it is created
+            application = get_wsgi_application()
+            for label, cookie in visitors(student):
+                environ = RequestFactory().get(url, HTTP_COOKIE=cookie).environ
+                status, rate, queries = run(application, environ, args.requests)
+                print(f'{backend:<16} {label:<14} {status:<18} {rate:>9.0f} {queries:>8}')
+    finally:
+        connection.creation.destroy_test_db(original_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Benchmark worker time per report download for each delivery backend.
+
+Builds a throwaway test database with one student and one report of the
+given size, then drives the WSGI application directly the way gunicorn
+does, including a ``wsgi.file_wrapper`` that transmits with os.sendfile.
+The body is written to a pipe drained by a separate process, standing in
+for the client socket. For every REPORT_FILE_DELIVERY backend it
+prints the median wall and CPU time the worker spends per download, for
+full downloads and for a 1 MB range request.
+
+With ``x-accel-redirect`` and ``x-sendfile`` the worker only runs the
+access checks and writes headers; the proxy moves the bytes.
+
+Usage:
+    python benchmarks/report_delivery.py                # 5 MB file
+    python benchmarks/report_delivery.py --size-mb 50 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_report_system.settings')
+
+try:
+    import pymysql
+    pymysql.install_as_MySQLdb()
+except ImportError:
+    pass
+
+import django
+from django.conf import settings
+
+BACKENDS = ('django', 'sendfile', 'x-accel-redirect', 'x-sendfile')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size-mb', type=int, default=5, help='Size of the report file')
+    parser.add_argument('--repeat', type=int, default=20, help='Downloads timed per backend')
+    return parser.parse_args()
+
+
+class SendfileWrapper:
+    """wsgi.file_wrapper that, like gunicorn's, hands the file descriptor to os.sendfile"""
+
+    def __init__(self, filelike, block_size=8192):
+        self.filelike = filelike
+
+    def close(self):
+        self.filelike.close()
+
+
+def setup(size_mb):
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='benchmark_delivery_')
+    django.setup()
+    from django.core.files.base import ContentFile
+    from django.db import connection
+    from django.test import Client
+    from accounts.models import User
+    from reports.models import ProjectReport
+
+    original_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    student = User.objects.create_user('bench-student', password='!', role='student')
+    report = ProjectReport(title='Benchmark report', student=student, original_filename='report.pdf')
+    report.report_file.save('report.pdf', ContentFile(b'%PDF-1.4 ' + os.urandom(size_mb * 1024 * 1024)), save=False)
+    report.save()
+
+    client = Client()
+    client.force_login(student)
+    cookie = '; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items())
+    return connection, original_name, report, cookie
+
+
+def download(application, environ, sink):
+    """Run one request through the WSGI application and write its body to the sink"""
+    status_headers = {}
+
+    def start_response(status, headers, exc_info=None):
+        status_headers['status'] = status
+        status_headers['headers'] = dict(headers)
+
+    environ = dict(environ, **{'wsgi.file_wrapper': SendfileWrapper})
+    result = application(environ, start_response)
+    try:
+        if isinstance(result, SendfileWrapper):
+            fd = result.filelike.fileno()
+            offset = os.lseek(fd, 0, os.SEEK_CUR)
+            remaining = int(status_headers['headers']['Content-Length'])
+            while remaining:
+                sent = os.sendfile(sink, fd, offset, remaining)
+                if not sent:
+                    break
+                offset += sent
+                remaining -= sent
+        else:
+            for chunk in result:
+                os.write(sink, chunk)
+    finally:
+        result.close()
+    return status_headers['status']
+
+
+def run(application, environ, repeat, sink):
+    wall, cpu = [], []
+    for _ in range(repeat):
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        status = download(application, environ, sink)
+        wall.append(time.perf_counter() - wall_started)
+        cpu.append(time.process_time() - cpu_started)
+    return status, statistics.median(wall) * 1000, statistics.median(cpu) * 1000
+
+
+def main():
+    args = parse_args()
+    connection, original_name, report, cookie = setup(args.size_mb)
+    from django.core.wsgi import get_wsgi_application
+    from django.test import RequestFactory
+    from django.urls import reverse
+
+    application = get_wsgi_application()
+    url = reverse('reports:download_report', args=[report.id])
+    requests = [
+        ('full', RequestFactory().get(url, HTTP_COOKIE=cookie).environ),
+        ('1 MB range', RequestFactory().get(url, HTTP_COOKIE=cookie, HTTP_RANGE='bytes=0-1048575').environ),
+    ]
+    drain = subprocess.Popen(['cat'], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    sink = drain.stdin.fileno()
+    try:
+        print(f'{args.size_mb} MB report, median of {args.repeat} downloads\n')
+        print(f'{"backend":<18} {"request":<12} {"status":<18} {"wall ms":>9} {"cpu ms":>9}')
+        for backend in BACKENDS:
+            settings.REPORT_FILE_DELIVERY = backend
+            for label, environ in requests:
+                status, wall, cpu = run(application, environ, args.repeat, sink)
+                print(f'{backend:<18} {label:<12} {status:<18} {wall:>9.2f} {cpu:>9.2f}')
+    finally:
+        drain.stdin.close()
+        drain.wait()
+        connection.creation.destroy_test_db(original_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
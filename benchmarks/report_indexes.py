@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Benchmark the report filter indexes on a synthetic dataset.
+
+Builds a throwaway test database, fills it with synthetic reports,
+assignments and feedback, then runs the queries behind the dashboards and
+listings twice: once with the Meta.indexes of the report models dropped and
+once with them in place. For each query it prints the database query plan
+and the median run time.
+
+Usage:
+    python benchmarks/report_indexes.py                 # 1,000,000 reports
+    python benchmarks/report_indexes.py --rows 100000
+    python benchmarks/report_indexes.py --keepdb        # reuse data from a previous run
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_report_system.settings')
+
+try:
+    import pymysql
+    pymysql.install_as_MySQLdb()
+except ImportError:
+    pass
+
+import django
+from django.conf import settings
+
+DEPARTMENTS = ['Computer Science', 'Information Technology', 'Electronics', 'Mechanical', 'Civil', 'Electrical']
+BATCHES = [str(year) for year in range(2015, 2027)]
+STATUSES = ['submitted', 'under_review', 'evaluated', 'rejected']
+BATCH_SIZE = 5000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Number of synthetic reports')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+    parser.add_argument('--keepdb', action='store_true', help='Keep and reuse the benchmark database')
+    return parser.parse_args()
+
+
+def setup_database(keepdb):
+    test_settings = settings.DATABASES['default'].setdefault('TEST', {})
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        # A file database so --keepdb can reuse the generated rows
+        test_settings.setdefault('NAME', str(settings.BASE_DIR / 'benchmark_indexes.sqlite3'))
+    django.setup()
+    from django.db import connection
+    original_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    return connection, original_name
+
+
+def populate(rows):
+    from django.utils import timezone
+    from accounts.models import User
+    from reports.models import ProjectReport, ReportAssignment, Feedback, EvaluatorStudentAssignment
+
+    if ProjectReport.objects.exists():
+        print(f'Reusing {ProjectReport.objects.count():,} existing reports')
+        return
+
+    rng = random.Random(42)
+    students = max(rows // 50, 10)
+    evaluators = max(rows // 5000, 5)
+    print(f'Generating {students:,} students, {evaluators:,} evaluators and {rows:,} reports...')
+
+    User.objects.bulk_create(
+        [User(username=f'student{i}', role='student', password='!', department=rng.choice(DEPARTMENTS),
+              batch=rng.choice(BATCHES)) for i in range(students)]
+        + [User(username=f'evaluator{i}', role='evaluator', password='!', department=rng.choice(DEPARTMENTS))
+           for i in range(evaluators)],
+        batch_size=BATCH_SIZE,
+    )
+    admin = User.objects.create(username='bench-admin', role='admin', password='!')
+    student_ids = list(User.objects.filter(role='student').values_list('id', flat=True))
+    evaluator_ids = list(User.objects.filter(role='evaluator').values_list('id', flat=True))
+
+    EvaluatorStudentAssignment.objects.bulk_create(
+        [EvaluatorStudentAssignment(evaluator_id=rng.choice(evaluator_ids), student_id=student_id,
+                                    is_active=rng.random() > 0.1) for student_id in student_ids],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+    now = timezone.now()
+    for start in range(0, rows, BATCH_SIZE):
+        count = min(BATCH_SIZE, rows - start)
+        reports = ProjectReport.objects.bulk_create([
+            ProjectReport(
+                title=f'Report {start + i}', student_id=rng.choice(student_ids),
+                department=rng.choice(DEPARTMENTS), batch=rng.choice(BATCHES), status=rng.choice(STATUSES),
+                report_file=f'reports/{start + i}.pdf', uuid_name=f'{start + i}.pdf',
+            )
+            for i in range(count)
+        ])
+        if not reports[0].pk:
+            # Backends without RETURNING support: fetch the ids just inserted
+            reports = list(ProjectReport.objects.order_by('-id')[:count])
+        # auto_now_add ignores explicit values, so spread submission dates afterwards
+        for report in reports:
+            report.submitted_at = now - timedelta(minutes=rng.randrange(5 * 365 * 24 * 60))
+        ProjectReport.objects.bulk_update(reports, ['submitted_at'])
+        ReportAssignment.objects.bulk_create(
+            [ReportAssignment(report_id=report.pk, evaluator_id=rng.choice(evaluator_ids), assigned_by=admin,
+                              is_active=rng.random() > 0.1) for report in reports],
+            ignore_conflicts=True,
+        )
+        Feedback.objects.bulk_create(
+            [Feedback(report_id=report.pk, evaluator_id=rng.choice(evaluator_ids), comments='-', grade=50)
+             for report in reports if rng.random() < 0.5],
+            ignore_conflicts=True,
+        )
+        print(f'  {start + count:,} reports', end='\r', flush=True)
+    print()
+
+
+def benchmark_queries():
+    from accounts.models import User
+    from reports.models import ProjectReport, ReportAssignment, Feedback, EvaluatorStudentAssignment
+
+    student = User.objects.filter(role='student').order_by('id').first()
+    evaluator = User.objects.filter(role='evaluator').order_by('id').first()
+    return [
+        ('student_dashboard: own reports',
+         ProjectReport.objects.filter(student=student).order_by('-submitted_at')),
+        ('all_reports: unfiltered page',
+         ProjectReport.objects.order_by('-submitted_at')[:20]),
+        ('all_reports: status filter',
+         ProjectReport.objects.filter(status='evaluated').order_by('-submitted_at')[:20]),
+        ('all_reports: department filter',
+         ProjectReport.objects.filter(department='Civil').order_by('-submitted_at')[:20]),
+        ('admin_dashboard: department + pending',
+         ProjectReport.objects.filter(department='Civil', status__in=['submitted', 'under_review'])
+         .order_by('-submitted_at')[:20]),
+        ('all_reports: department + batch',
+         ProjectReport.objects.filter(department='Civil', batch='2024').order_by('-submitted_at')[:20]),
+        ('evaluator: active assignments',
+         ReportAssignment.objects.filter(evaluator=evaluator, is_active=True).order_by().values('report_id')),
+        ('evaluator: own feedback',
+         Feedback.objects.filter(evaluator=evaluator).order_by().values('report_id')),
+        ('evaluator: mapped students',
+         EvaluatorStudentAssignment.objects.filter(evaluator=evaluator, is_active=True).values('student_id')),
+    ]
+
+
+def run(queries, repeat):
+    results = {}
+    for label, queryset in queries:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append(time.perf_counter() - started)
+        results[label] = (queryset.explain(), statistics.median(timings) * 1000)
+    return results
+
+
+def toggle_indexes(connection, create):
+    from reports.models import ProjectReport, ReportAssignment, Feedback, EvaluatorStudentAssignment
+
+    with connection.schema_editor() as editor:
+        for model in (ProjectReport, ReportAssignment, Feedback, EvaluatorStudentAssignment):
+            for index in model._meta.indexes:
+                if create:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+        else:
+            tables = ', '.join(model._meta.db_table for model in (ProjectReport, ReportAssignment, Feedback, EvaluatorStudentAssignment))
+            cursor.execute(f'ANALYZE TABLE {tables}')
+
+
+def main():
+    args = parse_args()
+    connection, original_name = setup_database(args.keepdb)
+    try:
+        populate(args.rows)
+        queries = benchmark_queries()
+
+        toggle_indexes(connection, create=False)
+        before = run(queries, args.repeat)
+        toggle_indexes(connection, create=True)
+        after = run(queries, args.repeat)
+
+        for label, _ in queries:
+            plan_before, ms_before = before[label]
+            plan_after, ms_after = after[label]
+            print('=' * 78)
+            print(f'{label}: {ms_before:.2f} ms -> {ms_after:.2f} ms')
+            print('-- before:')
+            print(plan_before)
+            print('-- after:')
+            print(plan_after)
+    finally:
+        connection.creation.destroy_test_db(original_name, verbosity=0, keepdb=args.keepdb)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,18 @@
 from django.contrib import admin
-from .models import ProjectReport, Feedback, ReportAssignment
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+from .models import ProjectReport, ReportBlob, ReportText, ReportSimilarity, Feedback, ReportAssignment
+from . import assignments, search
+
+
+class RankedChangeList(ChangeList):
+    """Changelist keeping full-text matches in relevance order unless a column sort is chosen"""
+    
+    def get_ordering(self, request, queryset):
+        if self.query and ORDER_VAR not in self.params:
+            return ['search_rank', '-pk']
+        return super().get_ordering(request, queryset)
 
 
 @admin.register(ProjectReport)
@@ -8,18 +21,19 @@ class ProjectReportAdmin(admin.ModelAdmin):
     
     list_display = ('title', 'student', 'department', 'batch', 'status', 
                    'submitted_at', 'file_size')
-    list_filter = ('status', 'department', 'batch', 'submitted_at')
+    list_filter = ('status', 'department', 'batch', 'submitted_at', 'file_missing')
     search_fields = ('title', 'student__username', 'student__first_name', 
                     'student__last_name', 'department', 'batch')
-    readonly_fields = ('submitted_at', 'updated_at', 'file_size')
+    readonly_fields = ('submitted_at', 'updated_at', 'file_size', 'sha256', 'content_type', 'file_missing')
     ordering = ('-submitted_at',)
+    actions = ['auto_assign_evaluators']
     
     fieldsets = (
         ('Report Information', {
             'fields': ('title', 'description', 'student', 'department', 'batch', 'supervisor')
         }),
         ('File Information', {
-            'fields': ('report_file', 'file_size')
+            'fields': ('report_file', 'file_size', 'sha256', 'content_type', 'file_missing')
         }),
         ('Status', {
             'fields': ('status',)
@@ -33,6 +47,33 @@ class ProjectReportAdmin(admin.ModelAdmin):
     def file_size(self, obj):
         return obj.file_size
     file_size.short_description = 'File Size'
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index instead of icontains scans over the joined tables"""
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        result = search.search(search_term)
+        if result.timed_out:
+            # Every match, unranked, rather than an empty page that reads as "no matches"
+            return search.filter_reports(queryset, search_term).annotate(search_rank=Value(0)), False
+        report_ids = result.report_ids
+        # The default and output_field keep Case valid when nothing matched
+        ranking = Case(
+            *[When(id=report_id, then=position) for position, report_id in enumerate(report_ids)],
+            default=Value(len(report_ids)), output_field=IntegerField(),
+        )
+        return queryset.filter(id__in=report_ids).annotate(search_rank=ranking), False
+    
+    def get_changelist(self, request, **kwargs):
+        return RankedChangeList
+    
+    @admin.action(description='Auto-assign evaluators to selected reports')
+    def auto_assign_evaluators(self, request, queryset):
+        result = assignments.auto_assign_reports(queryset.only('id', 'student_id', 'department'), assigned_by=request.user)
+        self.message_user(
+            request,
+            f"{result.created} assignments created, {result.reactivated} reactivated, {result.skipped} already in place."
+        )
 
 
 @admin.register(Feedback)
@@ -81,4 +122,57 @@ class ReportAssignmentAdmin(admin.ModelAdmin):
             'fields': ('assigned_at',),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ReportBlob)
+class ReportBlobAdmin(admin.ModelAdmin):
+    """Read-only view of stored report files and how many reports share each"""
+    
+    list_display = ('name', 'size_bytes', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size_bytes', 'ref_count', 'created_at')
+    ordering = ('-ref_count',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReportText)
+class ReportTextAdmin(admin.ModelAdmin):
+    """Admin for text extracted from report files"""
+    
+    list_display = ('report', 'status', 'page_count', 'word_count', 'attempts', 'extracted_at')
+    list_filter = ('status',)
+    search_fields = ('report__title',)
+    readonly_fields = ('report', 'status', 'text', 'page_count', 'word_count', 'attempts', 'next_attempt_at',
+                       'error', 'extracted_at')
+    actions = ['retry_extraction']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def retry_extraction(self, request, queryset):
+        """Queue the selected reports for another extraction attempt"""
+        updated = queryset.exclude(status='done').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} reports were queued for text extraction.')
+    retry_extraction.short_description = "Retry text extraction now"
+
+
+@admin.register(ReportSimilarity)
+class ReportSimilarityAdmin(admin.ModelAdmin):
+    """Read-only list of likely near-duplicate reports"""
+    
+    list_display = ('report', 'similar', 'score', 'detected_at')
+    search_fields = ('report__title', 'similar__title')
+    readonly_fields = ('report', 'similar', 'score', 'detected_at')
+    list_select_related = ('report', 'similar')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,140 @@
+"""
+Set-based evaluator assignment.
+
+Existing rows are read and locked in one query, missing rows are written
+with a single bulk_create and inactive rows are reactivated with a single
+update, all in one transaction. Only rows actually inserted or reactivated
+are counted: when a concurrent request inserts some of the same pairs
+first, the insert fails and the rows are read again. Bulk writes bypass the
+model signals, so the visibility index and evaluator counters are
+maintained here explicitly.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import IntegrityError, transaction
+
+from accounts.models import User
+from . import stats, visibility
+from .models import ReportAssignment, EvaluatorStudentAssignment
+
+BATCH_SIZE = 1000
+# Reads and inserts retried when concurrent requests insert the same pairs
+INSERT_ATTEMPTS = 3
+
+
+@dataclass
+class AssignmentResult:
+    """Counts of an assignment run"""
+    created: int = 0
+    reactivated: int = 0
+    skipped: int = 0
+
+    @property
+    def assigned(self):
+        return self.created + self.reactivated
+
+
+def _diff(model, target, pairs):
+    """Split pairs into missing pairs, active row count and inactive rows, locking the existing rows"""
+    missing = set(pairs)
+    active = 0
+    inactive = {}
+    existing = model.objects.select_for_update().filter(
+        evaluator_id__in={evaluator_id for evaluator_id, _ in pairs},
+        **{f'{target}_id__in': {target_id for _, target_id in pairs}},
+    ).values_list('id', 'evaluator_id', f'{target}_id', 'is_active')
+    for row_id, evaluator_id, target_id, is_active in existing:
+        pair = (evaluator_id, target_id)
+        if pair not in missing:
+            continue
+        missing.discard(pair)
+        if is_active:
+            active += 1
+        else:
+            inactive[row_id] = pair
+    return missing, active, inactive
+
+
+def _bulk_assign(model, target, pairs, assigned_by):
+    """
+    Ensure an active ``model`` row exists for every (evaluator_id, target_id) pair.
+
+    Returns the result counts and the list of pairs that became active.
+    """
+    pairs = set(pairs)
+    result = AssignmentResult()
+    if not pairs:
+        return result, []
+    for attempt in range(INSERT_ATTEMPTS):
+        missing, result.skipped, inactive = _diff(model, target, pairs)
+        try:
+            # Without ignore_conflicts, so every pair counted below was inserted here
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [
+                        model(evaluator_id=evaluator_id, assigned_by=assigned_by, is_active=True,
+                              **{f'{target}_id': target_id})
+                        for evaluator_id, target_id in missing
+                    ],
+                    batch_size=BATCH_SIZE,
+                )
+            break
+        except IntegrityError:
+            # A concurrent request inserted some of the pairs after they were read
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+    # The rows are locked by _diff, so the count is exact
+    result.reactivated = model.objects.filter(id__in=inactive, is_active=False).update(is_active=True) if inactive else 0
+    result.created = len(missing)
+    return result, list(missing) + list(inactive.values())
+
+
+def assign_report_pairs(pairs, assigned_by):
+    """Assign reports to evaluators from (evaluator_id, report_id) pairs"""
+    with transaction.atomic():
+        result, activated = _bulk_assign(ReportAssignment, 'report', pairs, assigned_by)
+        visibility.grant_assignments(activated)
+        per_evaluator = defaultdict(int)
+        for evaluator_id, _ in activated:
+            per_evaluator[evaluator_id] += 1
+        for evaluator_id, count in per_evaluator.items():
+            stats.adjust_evaluator(evaluator_id, assigned=count)
+    return result
+
+
+def assign_students(evaluator, students, assigned_by):
+    """Map students to an evaluator"""
+    pairs = [(evaluator.id, student.id) for student in students]
+    with transaction.atomic():
+        result, activated = _bulk_assign(EvaluatorStudentAssignment, 'student', pairs, assigned_by)
+        visibility.grant_student_mappings(activated)
+    return result
+
+
+def auto_assign_reports(reports, assigned_by):
+    """
+    Assign each report to the evaluators mapped to its student, or to the
+    evaluators of the report's department when the student has no mapping.
+    """
+    reports = [(report.id, report.student_id, report.department) for report in reports]
+    mapped = defaultdict(set)
+    for student_id, evaluator_id in EvaluatorStudentAssignment.objects.filter(
+        student_id__in={student_id for _, student_id, _ in reports}, is_active=True
+    ).values_list('student_id', 'evaluator_id'):
+        mapped[student_id].add(evaluator_id)
+
+    unmapped_departments = {department for _, student_id, department in reports if student_id not in mapped}
+    by_department = defaultdict(set)
+    if unmapped_departments:
+        for department, evaluator_id in User.objects.filter(
+            role='evaluator', department__in=unmapped_departments
+        ).values_list('department', 'id'):
+            by_department[department].add(evaluator_id)
+
+    pairs = [
+        (evaluator_id, report_id)
+        for report_id, student_id, department in reports
+        for evaluator_id in (mapped.get(student_id) or by_department.get(department, ()))
+    ]
+    return assign_report_pairs(pairs, assigned_by)
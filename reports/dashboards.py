@@ -0,0 +1,125 @@
+"""
+Server-side cache of the student, evaluator and admin dashboards.
+
+A dashboard's computed statistics and its rendered content are cached under
+a key made of the viewer and version tokens of the scopes it shows:
+
+    student:<id>    the student's own reports
+    evaluator:<id>  the reports visible to the evaluator
+    students        student accounts awaiting approval
+    admin           everything the admin dashboard counts and lists
+    all             bumped by rebuild commands; part of every key
+
+reports.signals and reports.visibility give the scopes a change touches new
+tokens once its transaction commits, so the next view of an affected
+dashboard misses and recomputes while every other dashboard keeps its
+entries; superseded entries are never read again and expire after
+DASHBOARD_CACHE_SECONDS. Tokens are random rather than counters so a token
+lost from the cache can never come back with an old value.
+
+Tokens live in the default cache, which must be shared by every process
+(file or Redis) unless the site runs in a single process.
+
+The same key gives the dashboard pages weak ETags (see etag), which
+browsers revalidate when PAGE_CACHE_MODE is etag (see
+student_report_system.middleware).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.core.cache import cache
+from django.db import transaction
+
+TOKEN_PREFIX = 'dashboard-version:'
+GLOBAL_SCOPE = 'all'
+ADMIN_SCOPE = 'admin'
+PENDING_STUDENTS_SCOPE = 'students'
+
+
+def student_scope(user_id):
+    return f'student:{user_id}'
+
+
+def evaluator_scope(user_id):
+    return f'evaluator:{user_id}'
+
+
+def timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_SECONDS', 300)
+
+
+def scopes_for(user):
+    """Scopes whose changes show on the user's dashboard"""
+    if user.is_admin:
+        return [ADMIN_SCOPE]
+    if user.is_evaluator:
+        return [evaluator_scope(user.pk), PENDING_STUDENTS_SCOPE]
+    if user.is_student:
+        return [student_scope(user.pk)]
+    return []
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def versions(scopes):
+    """Current token of each scope, creating missing ones"""
+    keys = [TOKEN_PREFIX + scope for scope in scopes]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # Another process may have created it first; keep whichever won
+            cache.add(key, _new_token(), None)
+            tokens[key] = cache.get(key) or _new_token()
+    return [tokens[key] for key in keys]
+
+
+def key(user, *parts):
+    """Cache key of a user's dashboard as of now; parts distinguish variants such as filters"""
+    tokens = versions([GLOBAL_SCOPE] + scopes_for(user))
+    variant = hashlib.md5(repr(parts).encode()).hexdigest()[:12] if parts else ''
+    return f'dashboard:{user.role}:{user.pk}:{"-".join(tokens)}:{variant}'
+
+
+def cached(cache_key, compute):
+    """Value cached under cache_key, computed and stored on a miss"""
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, timeout())
+    return value
+
+
+def invalidate(*scopes):
+    """Replace the tokens of the given scopes once the current transaction commits"""
+    scopes = set(scopes)
+    if scopes:
+        transaction.on_commit(
+            lambda: cache.set_many({TOKEN_PREFIX + scope: _new_token() for scope in scopes}, None)
+        )
+
+
+def invalidate_evaluators(evaluator_ids):
+    invalidate(ADMIN_SCOPE, *(evaluator_scope(evaluator_id) for evaluator_id in evaluator_ids))
+
+
+def invalidate_all():
+    invalidate(GLOBAL_SCOPE)
+
+
+def etag(request, *args, **kwargs):
+    """Weak ETag of a dashboard page as the viewer's session sees it, or None while messages wait to be shown"""
+    if len(get_messages(request)):
+        # The messages are part of the page and are only shown once
+        return None
+    # Creates the CSRF secret if the browser has none yet; the page's forms embed it
+    get_token(request)
+    page = key(
+        request.user, request.get_full_path(), request.user.updated_at.isoformat(), request.session.session_key,
+        request.META['CSRF_COOKIE'],
+    )
+    return f'W/"{hashlib.md5(page.encode()).hexdigest()}"'
@@ -0,0 +1,248 @@
+"""
+HTTP delivery of report files.
+
+Responses carry a strong ETag (the SHA-256 recorded at upload) and
+Last-Modified, so revalidation costs a 304 instead of a re-download, and
+honour single and multiple byte ranges (206 Partial Content) for PDF
+viewers. Access checks stay in the views; this module only serves bytes.
+
+REPORT_FILE_DELIVERY picks who moves the bytes once the checks pass:
+
+``django``
+    Stream from the worker (the default, works everywhere).
+``sendfile``
+    Like ``django`` but full and single-range bodies are handed to the
+    server's ``wsgi.file_wrapper`` as bounded file objects, which gunicorn
+    and uWSGI transmit with ``os.sendfile``.
+``x-accel-redirect``
+    Return an empty response with ``X-Accel-Redirect`` pointing into the
+    internal nginx location REPORT_FILE_ACCEL_PREFIX, which maps onto
+    MEDIA_ROOT (see deploy/nginx/student_report_system.conf).
+``x-sendfile``
+    Return an empty response with ``X-Sendfile`` set to the absolute path,
+    for Apache mod_xsendfile or lighttpd.
+
+With the two proxy modes the proxy serves ranges itself.
+"""
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from . import files
+
+CHUNK_SIZE = 64 * 1024
+# More ranges than this are answered with the whole file
+MAX_RANGES = 16
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+BACKENDS = ('django', 'sendfile', 'x-accel-redirect', 'x-sendfile')
+
+
+def get_backend():
+    backend = getattr(settings, 'REPORT_FILE_DELIVERY', 'django')
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"REPORT_FILE_DELIVERY must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    return backend
+
+
+class FileSlice:
+    """
+    Read-only view of ``length`` bytes of a file starting at ``start``.
+
+    Exposes fileno() with the descriptor positioned at ``start``, so WSGI
+    servers using os.sendfile transmit exactly Content-Length bytes from it.
+    """
+
+    def __init__(self, path, start, length):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(report, stat):
+    """Strong ETag from the upload checksum, or from size and mtime for rows without one"""
+    if report.sha256:
+        return quote_etag(report.sha256)
+    return quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+
+
+def parse_ranges(header, size):
+    """
+    Parse a ``Range: bytes=...`` header into sorted (start, end) inclusive pairs.
+
+    Returns None when the header should be ignored (absent, malformed,
+    another unit, too many or overlapping ranges) and [] when no range is
+    satisfiable, as is every range of an empty file.
+    """
+    if not header:
+        return None
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs:
+        return None
+    ranges = []
+    for spec in specs.split(','):
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0 or size == 0:
+                # Nothing to return; an empty file has no satisfiable range
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+            if start >= size:
+                continue
+        ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+    ranges.sort()
+    for (_, previous_end), (start, _) in zip(ranges, ranges[1:]):
+        if start <= previous_end:
+            return None
+    return ranges
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(last_modified) <= since
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _multipart(path, ranges, size, content_type, boundary):
+    for start, end in ranges:
+        yield (
+            f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode()
+        yield from _read_range(path, start, end)
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+def _multipart_length(ranges, size, content_type, boundary):
+    length = len(f'\r\n--{boundary}--\r\n')
+    for start, end in ranges:
+        length += len(
+            f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ) + end - start + 1
+    return length
+
+
+def _range_response(request, path, size, etag, stat, content_type, as_attachment, filename, zero_copy):
+    """Serve the file from this process, honouring Range headers"""
+    ranges = None
+    if request.method in ('GET', 'HEAD') and _if_range_passes(request, etag, stat.st_mtime):
+        ranges = parse_ranges(request.META.get('HTTP_RANGE'), size)
+
+    if ranges is None:
+        return FileResponse(open(path, 'rb'), as_attachment=as_attachment, filename=filename, content_type=content_type)
+    if not ranges:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        if zero_copy:
+            response = FileResponse(FileSlice(path, start, end - start + 1), status=206, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(_read_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+    boundary = uuid.uuid4().hex
+    response = StreamingHttpResponse(
+        _multipart(path, ranges, size, content_type, boundary),
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}',
+    )
+    response['Content-Length'] = str(_multipart_length(ranges, size, content_type, boundary))
+    return response
+
+
+def serve(request, report, as_attachment=False):
+    """Response for a report file honouring conditional and range requests"""
+    if report.file_missing:
+        # Quarantined by gc_media
+        raise Http404("File missing")
+    path = report.report_file.path
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404("File not found")
+    size = stat.st_size
+    etag = file_etag(report, stat)
+    content_type = report.content_type or files.content_type_for(report.filename)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        # Cached copies must be revalidated so access checks run on every use
+        'Cache-Control': 'private, no-cache',
+    }
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        for name, value in headers.items():
+            conditional[name] = value
+        return conditional
+
+    backend = get_backend()
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'REPORT_FILE_ACCEL_PREFIX', '/protected-media/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(report.report_file.name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _range_response(request, path, size, etag, stat, content_type, as_attachment, report.filename,
+                                   zero_copy=backend == 'sendfile')
+
+    if response.status_code == 206 or as_attachment or backend.startswith('x-'):
+        response['Content-Disposition'] = content_disposition_header(as_attachment, report.filename)
+    for name, value in headers.items():
+        response[name] = value
+    return response
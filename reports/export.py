@@ -0,0 +1,169 @@
+"""
+Bulk export of reports as a ZIP archive built while it is sent.
+
+The archive is written into a sink that is emptied after every chunk, so an
+export holds one chunk of one file at a time whatever the number of
+reports: files are read CHUNK_SIZE bytes at a time, rows are fetched
+BATCH_SIZE at a time by id, and nothing is written to a temporary archive.
+Entries use data descriptors (sizes and checksums after the data), which
+every unzip tool reads from the central directory. Report files are stored
+uncompressed since PDF, DOCX and XLSX are already compressed; manifest.csv,
+written last, lists every exported report with its metadata and grades.
+"""
+import csv
+import io
+import logging
+import os
+import zipfile
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Feedback, ProjectReport, ReportAssignment
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 500
+MANIFEST_NAME = 'manifest.csv'
+MANIFEST_FIELDS = [
+    'report_id', 'path', 'included', 'title', 'student', 'student_name', 'department', 'batch', 'supervisor',
+    'status', 'submitted_at', 'original_filename', 'content_type', 'size_bytes', 'sha256',
+    'evaluators', 'grades', 'average_grade_percent',
+]
+
+
+class _Sink:
+    """Write-only file object collecting what the archive writes until it is taken"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def _batches(reports, batch_size=BATCH_SIZE):
+    """Reports in id order, one batch per query, so no cursor stays open while the archive is sent"""
+    reports = reports.order_by('id')
+    last_id = 0
+    while True:
+        batch = list(reports.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+
+
+def archive_path(report):
+    """Path of a report inside the archive: department/batch/<id>-<original name>"""
+    name = report.original_filename or os.path.basename(report.report_file.name)
+    return '/'.join([
+        get_valid_filename(report.department) or 'department',
+        get_valid_filename(report.batch) or 'batch',
+        f'{report.id}-{get_valid_filename(name) or "report"}',
+    ])
+
+
+def _zip_time(value):
+    # ZIP timestamps are local time with two-second precision, from 1980
+    return max(timezone.localtime(value).timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def _manifest_rows(reports, missing):
+    for batch in _batches(reports.select_related('student')):
+        ids = [report.id for report in batch]
+        grades, evaluators = {}, {}
+        for feedback in Feedback.objects.filter(report_id__in=ids).select_related('evaluator').order_by('id'):
+            grades.setdefault(feedback.report_id, []).append(feedback)
+        for report_id, username in ReportAssignment.objects.filter(
+            report_id__in=ids, is_active=True
+        ).order_by('id').values_list('report_id', 'evaluator__username'):
+            evaluators.setdefault(report_id, []).append(username)
+
+        for report in batch:
+            feedbacks = grades.get(report.id, [])
+            graded = [f for f in feedbacks if f.grade is not None and f.max_grade]
+            average = sum(f.grade_percentage for f in graded) / len(graded) if graded else None
+            yield [
+                report.id, archive_path(report), 'no' if report.id in missing else 'yes', report.title,
+                report.student.username, report.student.get_full_name(), report.department, report.batch,
+                report.supervisor or '', report.status, timezone.localtime(report.submitted_at).isoformat(),
+                report.original_filename, report.content_type, report.size_bytes or '', report.sha256,
+                '; '.join(evaluators.get(report.id, [])),
+                '; '.join(f'{f.evaluator.username}: {f.grade}/{f.max_grade}' for f in graded),
+                f'{average:.2f}' if average is not None else '',
+            ]
+
+
+def stream(reports):
+    """Yield a ZIP archive of the given ProjectReport queryset, its files followed by manifest.csv"""
+    sink = _Sink()
+    missing = set()
+    try:
+        with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+            for batch in _batches(reports.exclude(report_file='').exclude(file_missing=True).only(
+                'id', 'department', 'batch', 'report_file', 'original_filename', 'submitted_at'
+            )):
+                for report in batch:
+                    try:
+                        source = open(report.report_file.path, 'rb')
+                    except OSError as e:
+                        logger.error(f"Report {report.id} left out of export: {str(e)}")
+                        missing.add(report.id)
+                        continue
+                    with source:
+                        info = zipfile.ZipInfo(archive_path(report), _zip_time(report.submitted_at))
+                        info.compress_type = zipfile.ZIP_STORED
+                        # Lets zipfile decide up front whether the entry needs ZIP64 sizes
+                        info.file_size = os.fstat(source.fileno()).st_size
+                        with archive.open(info, 'w') as entry:
+                            while chunk := source.read(CHUNK_SIZE):
+                                entry.write(chunk)
+                                yield sink.take()
+                    yield sink.take()
+            # Reports without a file, or whose file gc_media found missing, are listed but have nothing to include
+            missing.update(reports.filter(Q(report_file='') | Q(file_missing=True)).values_list('id', flat=True))
+
+            info = zipfile.ZipInfo(MANIFEST_NAME, _zip_time(timezone.now()))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, 'w') as entry:
+                manifest = io.TextIOWrapper(entry, encoding='utf-8', newline='', write_through=True)
+                writer = csv.writer(manifest)
+                writer.writerow(MANIFEST_FIELDS)
+                for row in _manifest_rows(reports, missing):
+                    writer.writerow(row)
+                    if len(sink.buffer) >= CHUNK_SIZE:
+                        yield sink.take()
+                # Leave closing the entry to the with block
+                manifest.detach()
+        yield sink.take()
+    except Exception as e:
+        logger.error(f"Error exporting reports: {str(e)}")
+        raise
+
+
+def export_filename():
+    return f'reports-{timezone.localtime().strftime("%Y%m%d-%H%M%S")}.zip'
+
+
+def exportable(user, reports=None):
+    """The reports a user may export: all for admins, actively assigned ones for evaluators"""
+    if reports is None:
+        reports = ProjectReport.objects.all()
+    if user.is_admin:
+        return reports
+    if user.is_evaluator:
+        # Same rule as download_report
+        return reports.filter(assignments__evaluator=user, assignments__is_active=True)
+    return reports.none()
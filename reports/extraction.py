@@ -0,0 +1,167 @@
+"""
+Background text extraction for uploaded reports.
+
+Every new upload gets a pending ReportText row (see signals.report_saved).
+The run_extraction_worker command claims pending rows and extracts each file
+in its own child process (reports.extractors), a few at a time on a thread
+pool, with REPORT_EXTRACTION_TIMEOUT seconds of wall time and
+REPORT_EXTRACTION_MEMORY_MB of address space per file. Text and counts are
+stored in ReportText and the report's search document, so search,
+similarity checks and previews never reopen files; new text is compared with
+earlier reports by reports.similarity as soon as it is stored.
+"""
+import json
+import logging
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import search, similarity, thumbnails
+from .extractors import EXTRACTORS
+from .models import ReportText
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(minutes=5)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Longest error message kept on the row
+MAX_ERROR_CHARS = 2000
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def queue(report):
+    """Schedule extraction of a report's current file, reusing the text of identical files"""
+    similarity.forget(report)
+    if report.content_type not in EXTRACTORS:
+        ReportText.objects.filter(report=report).delete()
+        return
+    done = ReportText.objects.filter(
+        status='done', report__sha256=report.sha256
+    ).exclude(report=report).only('text', 'page_count', 'word_count').first() if report.sha256 else None
+    if done is not None:
+        ReportText.objects.update_or_create(report=report, defaults={
+            'status': 'done', 'text': done.text, 'page_count': done.page_count, 'word_count': done.word_count,
+            'attempts': 0, 'error': '', 'extracted_at': timezone.now(),
+        })
+        _check_similarity(report, done.text, reuse=done.report_id)
+        return
+    ReportText.objects.update_or_create(report=report, defaults={
+        'status': 'pending', 'text': '', 'page_count': None, 'word_count': None,
+        'attempts': 0, 'error': '', 'next_attempt_at': timezone.now(), 'extracted_at': None,
+    })
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Reserve up to batch_size due rows for this worker, as accounts.mail.claim does for emails"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            ReportText.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'report_id')
+            .values_list('report_id', flat=True)[:batch_size]
+        )
+        ReportText.objects.filter(report_id__in=ids).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return list(ReportText.objects.filter(report_id__in=ids).select_related('report').order_by('report_id'))
+
+
+def run_sandboxed(*arguments):
+    """Run a reports.extractors command in a child process under the configured time and memory limits, returning its output"""
+    timeout = getattr(settings, 'REPORT_EXTRACTION_TIMEOUT', 30)
+    memory_mb = getattr(settings, 'REPORT_EXTRACTION_MEMORY_MB', 512)
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'reports.extractors', str(memory_mb), str(int(timeout) + 1), *arguments],
+            capture_output=True,
+            timeout=timeout,
+            cwd=settings.BASE_DIR,
+        )
+    except subprocess.TimeoutExpired:
+        raise ExtractionError(f'Timed out after {timeout}s')
+    if completed.returncode != 0:
+        error = completed.stderr.decode(errors='replace').strip().splitlines()
+        raise ExtractionError(error[-1] if error else f'Exited with status {completed.returncode}')
+    return completed.stdout
+
+
+def run_extractor(path, content_type):
+    """Extract a file's text in a sandboxed child process"""
+    return json.loads(run_sandboxed('text', path, content_type))
+
+
+def _extract(row):
+    try:
+        return run_extractor(row.report.report_file.path, row.report.content_type), None
+    except (ExtractionError, ValueError, OSError) as e:
+        return None, str(e)[:MAX_ERROR_CHARS]
+
+
+def _record(row, result, error):
+    if result is not None:
+        row.status = 'done'
+        row.text, row.page_count, row.word_count = result['text'], result['page_count'], result['word_count']
+        row.error = ''
+        row.extracted_at = timezone.now()
+    elif row.attempts >= MAX_ATTEMPTS:
+        row.status = 'failed'
+        row.error = error
+        logger.error(f"Giving up on text extraction for report {row.report_id} after {row.attempts} attempts: {error}")
+    else:
+        row.next_attempt_at = timezone.now() + RETRY_DELAY * row.attempts
+        row.error = error
+        logger.warning(f"Text extraction for report {row.report_id} failed, retrying at {row.next_attempt_at}: {error}")
+    with transaction.atomic():
+        row.save()
+        if row.status == 'done':
+            search.index_report(row.report)
+
+
+def process(batch_size=BATCH_SIZE, workers=None):
+    """Extract one claimed batch, returning (done, failed)"""
+    rows = claim(batch_size)
+    if not rows:
+        return 0, 0
+    workers = workers or getattr(settings, 'REPORT_EXTRACTION_WORKERS', 2)
+    # Threads only wait on the child processes; database writes stay on this thread
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_extract, rows))
+    done = 0
+    for row, (result, error) in zip(rows, results):
+        _record(row, result, error)
+        if result is not None:
+            done += 1
+            _check_similarity(row.report, row.text)
+            _prerender_thumbnail(row)
+    return done, len(rows) - done
+
+
+def _check_similarity(report, text, reuse=None):
+    """Compare new text with earlier reports; a failure here never loses the extraction"""
+    try:
+        similarity.index(report, text, reuse=reuse)
+    except Exception as e:
+        logger.error(f"Error checking report {report.pk} for near-duplicates: {str(e)}")
+
+
+def _prerender_thumbnail(row):
+    """Draw the thumbnail now that its text exists, so the first view is a cache hit"""
+    source = thumbnails.source_for(row.report, row.text)
+    if source is None or thumbnails.cached(source.key):
+        return
+    try:
+        thumbnails.store(source)
+    except Exception as e:
+        logger.error(f"Error rendering thumbnail for report {row.report_id}: {str(e)}")
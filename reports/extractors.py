@@ -0,0 +1,137 @@
+"""
+Plain-text extraction from PDF, DOCX and XLSX report files, and PDF covers.
+
+Runs in a child process,
+``python -m reports.extractors <memory MB> <CPU seconds> <command> <args>``,
+which applies the limits to itself before parsing anything, so a malformed
+or hostile upload can only exhaust its own process. The commands are:
+
+- ``text <path> <content type>`` prints a JSON object with ``text``,
+  ``page_count`` and ``word_count``.
+- ``cover <path> <width> <height>`` prints the largest image on the first
+  page of a PDF, scaled to fit width x height, as PNG, or nothing if the
+  page has none (see reports.thumbnails).
+
+Django is not imported.
+"""
+import io
+import json
+import re
+import sys
+import zipfile
+from xml.etree import ElementTree
+
+from reports.files import CONTENT_TYPES
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; the parent's timeout still applies
+    resource = None
+
+# Text kept per report; the counts cover the whole file
+MAX_CHARS = 1_000_000
+# Largest embedded image decoded for a PDF cover
+MAX_PIXELS = 25_000_000
+WORD_RE = re.compile(r'\w+')
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+APP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+
+
+def extract_pdf(path):
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [page.extract_text() or '' for page in reader.pages], len(reader.pages)
+
+
+def extract_docx(path):
+    paragraphs = []
+    with zipfile.ZipFile(path) as archive:
+        with archive.open('word/document.xml') as document:
+            for _, element in ElementTree.iterparse(document):
+                if element.tag == f'{WORD_NS}p':
+                    paragraphs.append(''.join(node.text or '' for node in element.iter(f'{WORD_NS}t')))
+                    element.clear()
+        # Word records the page count it last laid out; the XML has no pages
+        page_count = None
+        if 'docProps/app.xml' in archive.namelist():
+            pages = ElementTree.fromstring(archive.read('docProps/app.xml')).find(f'{APP_NS}Pages')
+            if pages is not None and (pages.text or '').isdigit():
+                page_count = int(pages.text)
+    return paragraphs, page_count
+
+
+def extract_xlsx(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        lines = [
+            ' '.join(str(value) for value in row if value is not None)
+            for sheet in workbook.worksheets for row in sheet.iter_rows(values_only=True)
+        ]
+        # Worksheets stand in for pages
+        return lines, len(workbook.worksheets)
+    finally:
+        workbook.close()
+
+
+EXTRACTORS = {
+    CONTENT_TYPES['.pdf']: extract_pdf,
+    CONTENT_TYPES['.docx']: extract_docx,
+    CONTENT_TYPES['.xlsx']: extract_xlsx,
+}
+
+
+def extract(path, content_type):
+    parts, page_count = EXTRACTORS[content_type](path)
+    text = '\n'.join(part for part in parts if part.strip())
+    return {
+        'text': text[:MAX_CHARS],
+        'page_count': page_count,
+        'word_count': len(WORD_RE.findall(text)),
+    }
+
+
+def cover(path, width, height):
+    """PNG of the largest image drawn on the first page of a PDF, if any, never decoding one above MAX_PIXELS"""
+    from pypdf import PdfReader
+
+    page = PdfReader(path).pages[0]
+    xobjects = page.get('/Resources', {}).get_object().get('/XObject', {}).get_object()
+    best, best_pixels = None, 0
+    for name, xobject in xobjects.items():
+        xobject = xobject.get_object()
+        if xobject.get('/Subtype') != '/Image':
+            continue
+        pixels = int(xobject.get('/Width', 0)) * int(xobject.get('/Height', 0))
+        if best_pixels < pixels <= MAX_PIXELS:
+            best, best_pixels = name, pixels
+    if best is None:
+        return b''
+    image = page.images[best].image.convert('RGB')
+    image.thumbnail((width, height))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def limit_resources(memory_mb, cpu_seconds):
+    if resource is None:
+        return
+    memory = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+
+
+if __name__ == '__main__':
+    limit_resources(int(sys.argv[1]), int(sys.argv[2]))
+    command, arguments = sys.argv[3], sys.argv[4:]
+    if command == 'text':
+        json.dump(extract(*arguments), sys.stdout)
+    elif command == 'cover':
+        sys.stdout.buffer.write(cover(arguments[0], int(arguments[1]), int(arguments[2])))
+    else:
+        sys.exit(f'Unknown command {command}')
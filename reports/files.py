@@ -0,0 +1,175 @@
+"""
+Report file metadata.
+
+Size, SHA-256 and content type are computed in a single pass over the
+file's chunks when a report is uploaded and stored on the row, so listings
+and downloads never stat the storage backend.
+
+Uploads are also sniffed: the first SNIFF_BYTES must carry a PDF header or
+a ZIP local file header, and DOCX/XLSX files must list the parts of their
+format in the ZIP central directory, which is read from the end of the
+file without reading any entry.
+"""
+import hashlib
+import os
+import re
+import struct
+import uuid
+import zipfile
+from dataclasses import dataclass
+
+CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.txt': 'text/plain',
+}
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+
+# Leading bytes of the formats reports are accepted in
+PDF_MAGIC = b'%PDF-'
+ZIP_MAGIC = b'PK\x03\x04'
+OOXML_EXTENSIONS = ('.docx', '.xlsx')
+
+# Bytes of an upload checked before anything else is read
+SNIFF_BYTES = 8 * 1024
+# PDF readers accept the header anywhere in the first 1024 bytes
+PDF_HEADER_RE = re.compile(rb'%PDF-[12]\.[0-9]')
+PDF_HEADER_WINDOW = 1024
+ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+# Parts every document of the format has
+OOXML_PARTS = {
+    '.docx': ('[Content_Types].xml', 'word/document.xml'),
+    '.xlsx': ('[Content_Types].xml', 'xl/workbook.xml'),
+}
+# Office documents have tens of parts; far more is a crafted archive
+MAX_ZIP_ENTRIES = 10_000
+
+# Uploads live in reports/ab/cd/<uuid>.<ext>, two levels keyed on the UUID,
+# so no directory grows past a few hundred entries
+REPORTS_DIR = 'reports'
+SHARDED_NAME_RE = re.compile(r'^reports/[0-9a-f]{2}/[0-9a-f]{2}/[^/]+$')
+# Content-addressed names: reports/ab/cd/<sha256>.<ext>, see reports.storage
+BLOB_NAME_RE = re.compile(r'^reports/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[^./]+)?$')
+
+
+@dataclass
+class FileInfo:
+    size: int
+    sha256: str
+    content_type: str
+
+
+def content_type_for(filename):
+    """Content type implied by a filename's extension"""
+    return CONTENT_TYPES.get(os.path.splitext(filename or '')[1].lower(), DEFAULT_CONTENT_TYPE)
+
+
+def detect_content_type(head, filename):
+    """Content type from the first bytes of a file, using the extension to tell OOXML formats apart"""
+    if head.startswith(PDF_MAGIC):
+        return CONTENT_TYPES['.pdf']
+    extension = os.path.splitext(filename or '')[1].lower()
+    if head.startswith(ZIP_MAGIC):
+        return CONTENT_TYPES[extension] if extension in OOXML_EXTENSIONS else 'application/zip'
+    if extension in ('.pdf',) + OOXML_EXTENSIONS:
+        # The extension promises a format the content does not have
+        return DEFAULT_CONTENT_TYPE
+    return content_type_for(filename)
+
+
+def inspect(file, filename=None):
+    """Size, SHA-256 and content type of a Django File in one pass over its chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    for chunk in file.chunks():
+        if not size:
+            head = chunk[:16]
+        digest.update(chunk)
+        size += len(chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return FileInfo(size, digest.hexdigest(), detect_content_type(head, filename or file.name))
+
+
+def _format_name(extension):
+    return 'PDF' if extension == '.pdf' else extension[1:].upper()
+
+
+def sniff_head(head, filename):
+    """Why the first bytes of a file do not match its extension, or None if they do"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    invalid = f'The file is not a valid {_format_name(extension)} document.'
+    if extension == '.pdf':
+        start = head.find(PDF_MAGIC, 0, PDF_HEADER_WINDOW)
+        if start < 0 or not PDF_HEADER_RE.match(head, start):
+            return invalid
+    elif extension in OOXML_EXTENSIONS:
+        if len(head) < ZIP_LOCAL_HEADER.size or not head.startswith(ZIP_MAGIC):
+            return invalid
+        name_length = ZIP_LOCAL_HEADER.unpack_from(head)[9]
+        if not name_length or ZIP_LOCAL_HEADER.size + name_length > len(head):
+            return invalid
+    return None
+
+
+def sniff(file, filename=None):
+    """
+    Why a file's content does not match its extension, or None if it does.
+
+    Reads SNIFF_BYTES from the start and, for DOCX/XLSX, the ZIP central
+    directory from the end; the file is left at position 0.
+    """
+    filename = filename or file.name
+    file.seek(0)
+    error = sniff_head(file.read(SNIFF_BYTES), filename)
+    extension = os.path.splitext(filename or '')[1].lower()
+    if error is None and extension in OOXML_EXTENSIONS:
+        error = f'The file is not a valid {_format_name(extension)} document.'
+        try:
+            file.seek(0)
+            # Only the end-of-archive record and the central directory are read
+            with zipfile.ZipFile(file) as archive:
+                names = archive.namelist()
+            if len(names) <= MAX_ZIP_ENTRIES and set(OOXML_PARTS[extension]) <= set(names):
+                error = None
+        except (zipfile.BadZipFile, EOFError, ValueError, OSError):
+            pass
+    file.seek(0)
+    return error
+
+
+def sharded_name(file_uuid, extension):
+    """Storage name for a report file in the sharded layout"""
+    prefix = file_uuid.hex
+    return f'{REPORTS_DIR}/{prefix[:2]}/{prefix[2:4]}/{file_uuid}{extension}'
+
+
+def blob_name(sha256, extension):
+    """Content-addressed storage name for a file with the given SHA-256"""
+    return f'{REPORTS_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def is_blob_name(name):
+    return bool(BLOB_NAME_RE.match(name))
+
+
+def resharded_name(name):
+    """
+    Sharded storage name for a file stored under an older layout.
+
+    UUID basenames are kept; any other name gets a UUID derived from the old
+    path, so repeated runs of a move agree on the target.
+    """
+    stem, extension = os.path.splitext(os.path.basename(name))
+    try:
+        file_uuid = uuid.UUID(stem)
+    except ValueError:
+        file_uuid = uuid.uuid5(uuid.NAMESPACE_URL, name)
+    return sharded_name(file_uuid, extension)
+
+
+def format_size(size):
+    return f"{size / 1024:.1f} KB"
@@ -1,13 +1,10 @@
 from django import forms
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.urls import reverse
-from django.utils import timezone
 import secrets
 import string
-from .models import ProjectReport, Feedback, ReportAssignment, EvaluatorStudentAssignment
+from .models import ProjectReport, Feedback, ReportAssignment, EvaluatorStudentAssignment, max_upload_mb
+from . import search
+from accounts import mail
 from accounts.models import User
-from django.conf import settings
 
 
 class ProjectReportForm(forms.ModelForm):
@@ -46,9 +43,9 @@ class ProjectReportForm(forms.ModelForm):
             if f'.{ext}' not in valid_extensions:
                 raise forms.ValidationError('Only PDF, DOCX, and XLSX files are allowed.')
             
-            # Check file size (5MB max)
-            if file.size > 5 * 1024 * 1024:
-                raise forms.ValidationError('File size must be less than 5MB.')
+            # Check file size (REPORT_MAX_UPLOAD_MB)
+            if file.size > max_upload_mb() * 1024 * 1024:
+                raise forms.ValidationError(f'File size must be less than {max_upload_mb()}MB.')
         
         return file
     
@@ -133,7 +130,39 @@ class ReportFilterForm(forms.Form):
     status = forms.ChoiceField(choices=STATUS_CHOICES, required=False,
                               widget=forms.Select(attrs={'class': 'form-control'}))
     student = forms.CharField(max_length=100, required=False,
-                             widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Student name'}))
+                             widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Student, title or supervisor'}))
+
+    def filter_queryset(self, reports):
+        """Apply the cleaned filters to a ProjectReport queryset"""
+        department = self.cleaned_data.get('department')
+        batch = self.cleaned_data.get('batch')
+        status = self.cleaned_data.get('status')
+        student = self.cleaned_data.get('student')
+
+        if department:
+            reports = reports.filter(department=department)
+        if batch:
+            reports = reports.filter(batch__istartswith=batch)
+        if status:
+            reports = reports.filter(status=status)
+        if student:
+            reports = search.filter_reports(reports, student)
+        return reports
+
+
+class ReportExportForm(ReportFilterForm):
+    """Report filters plus the evaluator whose assigned reports are exported"""
+
+    evaluator = forms.ModelChoiceField(queryset=User.objects.filter(role='evaluator'), required=False,
+                                       empty_label='All Evaluators',
+                                       widget=forms.Select(attrs={'class': 'form-control'}))
+
+    def filter_queryset(self, reports):
+        reports = super().filter_queryset(reports)
+        evaluator = self.cleaned_data.get('evaluator')
+        if evaluator:
+            reports = reports.filter(assignments__evaluator=evaluator, assignments__is_active=True)
+        return reports
 
 
 class CreateEvaluatorForm(forms.ModelForm):
@@ -179,36 +208,9 @@ class CreateEvaluatorForm(forms.ModelForm):
             # Send email after saving user - ALWAYS store password for display
             user._temp_password = password
             if user.email:
-                try:
-                    from django.urls import reverse
-                    site_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')
-                    login_url = f"{site_url}{reverse('accounts:login')}"
-                    # Render HTML email template
-                    html_message = render_to_string('emails/credentials_template.html', {
-                        'username': user.username,
-                        'password': password,
-                        'role': 'Evaluator',
-                        'user_type': 'Evaluator',
-                        'first_name': user.first_name or user.username,
-                        'login_url': login_url,
-                        'year': timezone.now().year,
-                    })
-                    send_mail(
-                        subject='Your Evaluator Account Credentials - Student Report System',
-                        message=f"Hello {user.first_name or user.username},\n\nYour evaluator account has been created.\nUsername: {user.username}\nPassword: {password}\n\nPlease log in at {login_url} and change your password.",
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        html_message=html_message,
-                        fail_silently=False,
-                    )
-                    user._email_sent = True
-                except Exception as e:
-                    # Log error but don't fail user creation
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Failed to send email to {user.email}: {str(e)}", exc_info=True)
-                    user._email_sent = False
-                    user._email_error = str(e)
+                # Delivered by the mail worker, the request never waits on SMTP
+                mail.enqueue_credentials([(user, password)])
+                user._email_sent = True
             else:
                 user._email_sent = False
                 user._email_error = "No email address provided"
@@ -239,35 +241,9 @@ class CreateStudentForm(forms.ModelForm):
             # ALWAYS store password for display
             user._temp_password = password
             if user.email:
-                try:
-                    site_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')
-                    login_url = f"{site_url}{reverse('accounts:login')}"
-                    # Render HTML email template
-                    html_message = render_to_string('emails/credentials_template.html', {
-                        'username': user.username,
-                        'password': password,
-                        'role': 'Student',
-                        'user_type': 'Student',
-                        'first_name': user.first_name or user.username,
-                        'login_url': login_url,
-                        'year': timezone.now().year,
-                    })
-                    send_mail(
-                        subject='Your Student Account Credentials - Student Report System',
-                        message=f"Hello {user.first_name or user.username},\n\nYour student account has been created.\nUsername: {user.username}\nPassword: {password}\n\nPlease log in at {login_url} and change your password.",
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        html_message=html_message,
-                        fail_silently=False,
-                    )
-                    user._email_sent = True
-                except Exception as e:
-                    # Log error but don't fail user creation
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Failed to send email to {user.email}: {str(e)}", exc_info=True)
-                    user._email_sent = False
-                    user._email_error = str(e)
+                # Delivered by the mail worker, the request never waits on SMTP
+                mail.enqueue_credentials([(user, password)])
+                user._email_sent = True
             else:
                 user._email_sent = False
                 user._email_error = "No email address provided"
@@ -284,3 +260,20 @@ class AssignStudentsToEvaluatorForm(forms.Form):
     students = forms.ModelMultipleChoiceField(queryset=User.objects.filter(role='student'), widget=forms.SelectMultiple(attrs={'class': 'form-control', 'size': 12}))
 
 
+class ImportUsersForm(forms.Form):
+    """Admin uploads a CSV or XLSX roster of users to create"""
+    roster = forms.FileField(
+        help_text='CSV or XLSX with a header row: username, first_name, last_name, email, role, student_id, department, batch, phone_number',
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+    send_emails = forms.BooleanField(required=False, initial=True, label='Queue credential emails for new users',
+                                     help_text='Sent by the mail worker after the import; nothing is sent during it.',
+                                     widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
+    dry_run = forms.BooleanField(required=False, label='Only validate the roster',
+                                 widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
+
+    def clean_roster(self):
+        roster = self.cleaned_data['roster']
+        if not roster.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Upload a .csv or .xlsx file.')
+        return roster
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from reports import files
+from reports.models import ProjectReport
+
+
+class Command(BaseCommand):
+    help = 'Record size, SHA-256 and content type for reports uploaded before they were stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reports read and updated per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = ProjectReport.objects.filter(size_bytes__isnull=True).exclude(report_file='').only(
+            'id', 'report_file', 'original_filename'
+        ).order_by('id')
+        updated = missing = 0
+        last_id = 0
+        while True:
+            # Page by id rather than holding a cursor open over rows being updated
+            reports = list(pending.filter(id__gt=last_id)[:batch_size])
+            if not reports:
+                break
+            last_id = reports[-1].id
+            batch = []
+            for report in reports:
+                try:
+                    with report.report_file.open('rb') as stored:
+                        info = files.inspect(stored, report.original_filename or report.report_file.name)
+                except OSError as e:
+                    missing += 1
+                    self.stderr.write(f'Report {report.id}: cannot read {report.report_file.name}: {e}')
+                    continue
+                report.size_bytes, report.sha256, report.content_type = info.size, info.sha256, info.content_type
+                batch.append(report)
+            ProjectReport.objects.bulk_update(batch, ['size_bytes', 'sha256', 'content_type'])
+            updated += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Recorded metadata for {updated} reports, {missing} files missing.'))
@@ -0,0 +1,87 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from reports import files
+from reports.models import ProjectReport, ReportBlob
+
+
+class Command(BaseCommand):
+    help = 'Move reports uploaded before content addressing into shared blobs, keeping one copy of identical files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Distinct checksums processed per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be freed without changing anything')
+
+    def handle(self, *args, **options):
+        storage = ProjectReport._meta.get_field('report_file').storage
+        # Rows already pointing at a blob are done, so an interrupted run resumes where it stopped
+        pending = ProjectReport.objects.exclude(sha256='').exclude(report_file='').exclude(
+            report_file__regex=files.BLOB_NAME_RE.pattern
+        )
+        adopted = removed = freed = missing = 0
+        last_sha = ''
+        while True:
+            checksums = list(
+                pending.filter(sha256__gt=last_sha).order_by('sha256').values_list('sha256', flat=True)
+                .distinct()[:options['batch_size']]
+            )
+            if not checksums:
+                break
+            last_sha = checksums[-1]
+            reports = pending.filter(sha256__in=checksums).only('id', 'sha256', 'report_file', 'size_bytes')
+            groups = {}
+            for report in reports.order_by('sha256', 'id'):
+                groups.setdefault(report.sha256, []).append(report)
+
+            for sha256, group in groups.items():
+                if options['dry_run']:
+                    adopted += len(group)
+                    removed += len(group) - 1
+                    freed += (len(group) - 1) * (group[0].size_bytes or 0)
+                    continue
+                blob = self.adopt(storage, sha256, group)
+                if blob is None:
+                    missing += len(group)
+                    self.stderr.write(f'No stored copy of {sha256} found for reports {[r.id for r in group]}')
+                    continue
+                with transaction.atomic():
+                    ProjectReport.objects.filter(id__in=[r.id for r in group]).update(
+                        report_file=blob.name, uuid_name=os.path.basename(blob.name)
+                    )
+                    ReportBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + len(group))
+                # Files are only removed once no row references them
+                for report in group:
+                    if report.report_file.name != blob.name and storage.exists(report.report_file.name):
+                        storage.delete(report.report_file.name)
+                        removed += 1
+                        freed += blob.size_bytes
+                adopted += len(group)
+
+        verb = 'would be' if options['dry_run'] else 'were'
+        self.stdout.write(self.style.SUCCESS(
+            f'{adopted} reports {verb} moved to shared blobs; {removed} duplicate files ({files.format_size(freed)}) '
+            f'{verb} removed; {missing} reports have no stored file.'
+        ))
+
+    def adopt(self, storage, sha256, group):
+        """The blob for sha256, created from the first report whose file still exists"""
+        blob = ReportBlob.objects.filter(sha256=sha256).first()
+        if blob is not None:
+            return blob
+        for report in group:
+            name = files.blob_name(sha256, os.path.splitext(report.report_file.name)[1])
+            target = storage.path(name)
+            # Already there if an earlier run stopped between the move and creating the blob
+            if not storage.exists(name):
+                if not storage.exists(report.report_file.name):
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(storage.path(report.report_file.name), target)
+            blob, _ = ReportBlob.objects.get_or_create(
+                sha256=sha256, defaults={'name': name, 'size_bytes': report.size_bytes or os.path.getsize(target)}
+            )
+            return blob
+        return None
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reports import uploads
+
+
+class Command(BaseCommand):
+    help = 'Remove resumable uploads untouched for REPORT_UPLOAD_EXPIRY_HOURS, with their partial files'
+
+    def handle(self, *args, **options):
+        expired = uploads.expire()
+        self.stdout.write(self.style.SUCCESS(f'Removed {expired} abandoned uploads.'))
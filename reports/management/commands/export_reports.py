@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from reports import export, files
+from reports.forms import ReportExportForm
+from reports.models import ProjectReport
+
+
+class Command(BaseCommand):
+    help = 'Write reports and a manifest of their metadata and grades to a ZIP archive, with the all-reports filters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Path of the ZIP archive to write, or '-' for standard output")
+        parser.add_argument('--department', default='', help='Exact department')
+        parser.add_argument('--batch', default='', help='Batch prefix')
+        parser.add_argument('--status', default='', help='Report status')
+        parser.add_argument('--student', default='', help='Student, title or supervisor search')
+        parser.add_argument('--evaluator', default='', help='Username of an evaluator; only reports assigned to them')
+
+    def handle(self, *args, **options):
+        data = {name: options[name] for name in ('department', 'batch', 'status', 'student')}
+        if options['evaluator']:
+            evaluator = User.objects.filter(username=options['evaluator'], role='evaluator').first()
+            if evaluator is None:
+                raise CommandError(f"No evaluator named {options['evaluator']}")
+            data['evaluator'] = evaluator.pk
+        form = ReportExportForm(data)
+        if not form.is_valid():
+            raise CommandError('; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()))
+        reports = form.filter_queryset(ProjectReport.objects.all())
+
+        to_stdout = options['output'] == '-'
+        output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        written = 0
+        try:
+            for chunk in export.stream(reports):
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if not to_stdout:
+                output.close()
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {reports.count()} reports to {options['output']} ({files.format_size(written)})"
+            ))
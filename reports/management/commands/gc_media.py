@@ -0,0 +1,163 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from reports import dashboards, files
+from reports.models import ProjectReport, ReportBlob
+
+
+def scan(directory):
+    """(path, size, mtime) of every file below directory"""
+    found = []
+    for path, dirs, names in os.walk(directory):
+        for name in names:
+            full = os.path.join(path, name)
+            try:
+                stat = os.stat(full)
+            except OSError:
+                # Deleted while walking
+                continue
+            found.append((full, stat.st_size, stat.st_mtime))
+    return found
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Find report files no row references and rows whose file is missing; delete and flag them with --apply'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true',
+                            help='Delete orphaned files and flag reports with missing files (default: report only)')
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Hours a file must be untouched before it counts as orphaned (protects uploads in flight)')
+        parser.add_argument('--workers', type=int, default=8, help='Threads walking directories and checking files')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Paths checked against the database per query')
+
+    def handle(self, *args, **options):
+        self.apply = options['apply']
+        self.batch_size = options['batch_size']
+        self.workers = options['workers']
+        self.storage = ProjectReport._meta.get_field('report_file').storage
+        self.root = self.storage.path(files.REPORTS_DIR)
+        cutoff = time.time() - options['min_age'] * 3600
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            orphans, orphan_bytes, recent = self.collect_orphans(pool, cutoff)
+            missing, restored = self.flag_missing(pool)
+        if self.apply and (missing or restored):
+            # The flags were set with bulk updates, which cached dashboards do not see
+            dashboards.invalidate_all()
+
+        mode = 'Deleted' if self.apply else 'Found'
+        self.stdout.write(self.style.SUCCESS(
+            f'{mode} {orphans} orphaned files ({files.format_size(orphan_bytes)}), skipped {recent} newer than '
+            f'--min-age; {missing} reports reference missing files, {restored} previously missing files found again.'
+        ))
+        if not self.apply and (orphans or missing):
+            self.stdout.write('Dry run: nothing was changed. Re-run with --apply to delete and flag.')
+
+    def walk(self, pool):
+        """Stream the files under MEDIA_ROOT/reports, walking subdirectories in parallel"""
+        if not os.path.isdir(self.root):
+            return
+        subdirs = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    # Files of the flat, pre-sharding layout
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+        # Keep only a few directories' listings in memory at once
+        pending = deque()
+        for directory in subdirs:
+            pending.append(pool.submit(scan, directory))
+            if len(pending) >= self.workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+    def collect_orphans(self, pool, cutoff):
+        orphans = orphan_bytes = recent = 0
+        emptied = set()
+        media_root = self.storage.path('')
+        for chunk in chunked(self.walk(pool), self.batch_size):
+            names = {os.path.relpath(path, media_root).replace(os.sep, '/'): (path, size, mtime)
+                     for path, size, mtime in chunk}
+            referenced = set(
+                ProjectReport.objects.filter(report_file__in=list(names)).values_list('report_file', flat=True)
+            )
+            referenced.update(ReportBlob.objects.filter(name__in=list(names)).values_list('name', flat=True))
+            for name, (path, size, mtime) in names.items():
+                if name in referenced:
+                    continue
+                if mtime > cutoff:
+                    recent += 1
+                    continue
+                orphans += 1
+                orphan_bytes += size
+                if self.apply:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    emptied.add(os.path.dirname(path))
+                else:
+                    self.stdout.write(f'orphan: {name} ({files.format_size(size)})')
+        self.prune(emptied)
+        return orphans, orphan_bytes, recent
+
+    def prune(self, directories):
+        """Remove directories emptied by deletions, and parents left empty in turn"""
+        for directory in sorted(directories, key=len, reverse=True):
+            while directory != self.root and directory.startswith(self.root):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    # Not empty, or already removed
+                    break
+                directory = os.path.dirname(directory)
+
+    def flag_missing(self, pool):
+        """Flag reports whose file is gone, and clear the flag where it has reappeared"""
+        missing = restored = 0
+        rows = ProjectReport.objects.exclude(report_file='').order_by('id').values_list(
+            'id', 'report_file', 'file_missing'
+        )
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:self.batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            exists = pool.map(os.path.exists, [self.storage.path(name) for _, name, _ in batch])
+            newly_missing, found_again = [], []
+            for (report_id, name, flagged), present in zip(batch, exists):
+                if not present:
+                    missing += 1
+                    if not flagged:
+                        newly_missing.append(report_id)
+                    if not self.apply:
+                        self.stdout.write(f'missing: report {report_id} ({name})')
+                elif flagged:
+                    found_again.append(report_id)
+            restored += len(found_again)
+            if self.apply:
+                # Bulk updates: saving rows would re-run upload handling and signals for nothing
+                ProjectReport.objects.filter(id__in=newly_missing).update(file_missing=True)
+                ProjectReport.objects.filter(id__in=found_again).update(file_missing=False)
+        return missing, restored
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from reports import similarity
+from reports.models import ReportLSHBand, ReportSignature, ReportSimilarity, ReportText
+
+
+class Command(BaseCommand):
+    help = 'Sign extracted report text for near-duplicate detection, e.g. for reports extracted before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Reports loaded per query')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop all signatures and matches first, e.g. after changing the threshold')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            ReportSimilarity.objects.all().delete()
+            ReportLSHBand.objects.all().delete()
+            ReportSignature.objects.all().delete()
+
+        # Reports are signed in id order; each is compared with those signed before it, so every pair is found once
+        rows = ReportText.objects.filter(status='done', report__signature__isnull=True).select_related(
+            'report'
+        ).order_by('report_id')
+        signed = flagged = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(report_id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].report_id
+            for row in batch:
+                matches = similarity.index(row.report, row.text)
+                signed += 1
+                flagged += len(matches)
+        self.stdout.write(self.style.SUCCESS(f'Signed {signed} reports; found {flagged} likely near-duplicate pairs.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from reports import visibility
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the evaluator report visibility index from report and student assignments'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding evaluator report visibility index...')
+        written = visibility.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Visibility index rebuilt with {written} rows.'))
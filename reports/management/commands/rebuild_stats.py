@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reports import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard statistics rollups to repair drift'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding report statistics...')
+        rollups, evaluators = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Statistics rebuilt: {rollups} department/batch/status rows, {evaluators} evaluator rows.'
+        ))
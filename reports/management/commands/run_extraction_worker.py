@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports import extraction
+
+
+class Command(BaseCommand):
+    help = 'Extract text, page and word counts from uploaded reports in the background'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no report is waiting for extraction')
+        parser.add_argument('--batch-size', type=int, default=extraction.BATCH_SIZE, help='Reports claimed per batch')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Files extracted in parallel (default: REPORT_EXTRACTION_WORKERS)')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when nothing is waiting')
+
+    def handle(self, *args, **options):
+        total_done = total_failed = 0
+        try:
+            while True:
+                done, failed = extraction.process(batch_size=options['batch_size'], workers=options['workers'])
+                total_done += done
+                total_failed += failed
+                if done or failed:
+                    self.stdout.write(f'Extracted {done} reports, {failed} failed')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Extraction worker stopped: {total_done} extracted, {total_failed} failed.'
+        ))
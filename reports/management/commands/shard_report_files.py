@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from reports import files
+from reports.models import ProjectReport
+
+
+def move(source, target):
+    """
+    Move one file into place, returning False when it cannot be found.
+
+    A file already at its target counts as moved, so a batch interrupted
+    between the moves and the database update is picked up by the next run.
+    """
+    if not os.path.exists(source):
+        return os.path.exists(target)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(source, target)
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Move report files from the flat reports/ directory into the sharded reports/ab/cd/ layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reports moved and updated per batch')
+        parser.add_argument('--workers', type=int, default=8, help='Threads moving files in parallel')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would move without changing anything')
+
+    def handle(self, *args, **options):
+        storage = ProjectReport._meta.get_field('report_file').storage
+        batch_size = options['batch_size']
+        # Rows already in the sharded layout are done, so an interrupted run resumes where it stopped
+        pending = ProjectReport.objects.exclude(report_file='').exclude(
+            report_file__regex=files.SHARDED_NAME_RE.pattern
+        ).only('id', 'report_file', 'uuid_name').order_by('id')
+        moved = missing = 0
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                reports = list(pending.filter(id__gt=last_id)[:batch_size])
+                if not reports:
+                    break
+                last_id = reports[-1].id
+                targets = [files.resharded_name(report.report_file.name) for report in reports]
+                if options['dry_run']:
+                    for report, target in zip(reports, targets):
+                        self.stdout.write(f'{report.report_file.name} -> {target}')
+                    moved += len(reports)
+                    continue
+
+                results = pool.map(
+                    move,
+                    [storage.path(report.report_file.name) for report in reports],
+                    [storage.path(target) for target in targets],
+                )
+                batch = []
+                for report, target, found in zip(reports, targets, results):
+                    if not found:
+                        missing += 1
+                        self.stderr.write(f'Report {report.id}: {report.report_file.name} not found')
+                        continue
+                    report.report_file.name = target
+                    report.uuid_name = os.path.basename(target)
+                    batch.append(report)
+                ProjectReport.objects.bulk_update(batch, ['report_file', 'uuid_name'])
+                moved += len(batch)
+                self.stdout.write(f'Moved {moved} files (up to report {last_id})')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{moved} files would move.'))
+            return
+        self.prune_empty_directories(storage.path(files.REPORTS_DIR))
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} files, {missing} files missing.'))
+
+    def prune_empty_directories(self, root):
+        """Remove directories left empty by the move, such as stray reports/None/"""
+        for path, dirs, filenames in os.walk(root, topdown=False):
+            if path != root and not os.listdir(path):
+                os.rmdir(path)
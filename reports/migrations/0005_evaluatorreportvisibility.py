@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_visibility(apps, schema_editor):
+    """Backfill the visibility index from existing assignments"""
+    Visibility = apps.get_model('reports', 'EvaluatorReportVisibility')
+    ReportAssignment = apps.get_model('reports', 'ReportAssignment')
+    EvaluatorStudentAssignment = apps.get_model('reports', 'EvaluatorStudentAssignment')
+    ProjectReport = apps.get_model('reports', 'ProjectReport')
+
+    rows = [
+        Visibility(evaluator_id=evaluator_id, report_id=report_id, source='assignment', submitted_at=submitted_at)
+        for evaluator_id, report_id, submitted_at in ReportAssignment.objects.filter(is_active=True).values_list(
+            'evaluator_id', 'report_id', 'report__submitted_at'
+        )
+    ]
+    for evaluator_id, student_id in EvaluatorStudentAssignment.objects.filter(is_active=True).values_list(
+        'evaluator_id', 'student_id'
+    ):
+        rows.extend(
+            Visibility(evaluator_id=evaluator_id, report_id=report_id, source='student_mapping', submitted_at=submitted_at)
+            for report_id, submitted_at in ProjectReport.objects.filter(student_id=student_id).values_list(
+                'id', 'submitted_at'
+            )
+        )
+    Visibility.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0004_alter_projectreport_report_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluatorReportVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('assignment', 'Report Assignment'), ('student_mapping', 'Evaluator-Student Assignment')], max_length=20)),
+                ('submitted_at', models.DateTimeField()),
+                ('evaluator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_reports', to=settings.AUTH_USER_MODEL)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluator_visibility', to='reports.projectreport')),
+            ],
+            options={
+                'verbose_name': 'Evaluator Report Visibility',
+                'verbose_name_plural': 'Evaluator Report Visibility',
+                'indexes': [models.Index(fields=['evaluator', '-submitted_at'], name='reports_vis_eval_sub_idx')],
+                'unique_together': {('evaluator', 'report', 'source')},
+            },
+        ),
+        migrations.RunPython(populate_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    """Backfill the rollups from existing reports, assignments and feedback"""
+    ProjectReport = apps.get_model('reports', 'ProjectReport')
+    Feedback = apps.get_model('reports', 'Feedback')
+    ReportAssignment = apps.get_model('reports', 'ReportAssignment')
+    ReportStatsRollup = apps.get_model('reports', 'ReportStatsRollup')
+    EvaluatorStats = apps.get_model('reports', 'EvaluatorStats')
+
+    ReportStatsRollup.objects.bulk_create([
+        ReportStatsRollup(department=row['department'], batch=row['batch'], status=row['status'], count=row['count'])
+        for row in ProjectReport.objects.order_by().values('department', 'batch', 'status').annotate(count=Count('id'))
+    ])
+    assigned = dict(
+        ReportAssignment.objects.filter(is_active=True).order_by().values('evaluator_id')
+        .annotate(count=Count('id')).values_list('evaluator_id', 'count')
+    )
+    evaluated = dict(
+        Feedback.objects.order_by().values('evaluator_id')
+        .annotate(count=Count('id')).values_list('evaluator_id', 'count')
+    )
+    EvaluatorStats.objects.bulk_create([
+        EvaluatorStats(
+            evaluator_id=evaluator_id,
+            assigned_count=assigned.get(evaluator_id, 0),
+            evaluated_count=evaluated.get(evaluator_id, 0),
+        )
+        for evaluator_id in assigned.keys() | evaluated.keys()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_approval_date_user_approval_status_and_more'),
+        ('reports', '0005_evaluatorreportvisibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluatorStats',
+            fields=[
+                ('evaluator', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='report_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('assigned_count', models.IntegerField(default=0)),
+                ('evaluated_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Evaluator Statistics',
+                'verbose_name_plural': 'Evaluator Statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(max_length=100)),
+                ('batch', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('under_review', 'Under Review'), ('evaluated', 'Evaluated'), ('rejected', 'Rejected')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Report Statistics Rollup',
+                'verbose_name_plural': 'Report Statistics Rollups',
+                'unique_together': {('department', 'batch', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluatorstudentassignment',
+            index=models.Index(fields=['evaluator', 'is_active'], name='reports_mapping_eval_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluatorstudentassignment',
+            index=models.Index(fields=['student', 'is_active'], name='reports_mapping_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['evaluator', 'report'], name='reports_feedback_eval_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['-submitted_at'], name='reports_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['student', '-submitted_at'], name='reports_student_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['status', '-submitted_at'], name='reports_status_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['department', '-submitted_at'], name='reports_dept_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['department', 'status', '-submitted_at'], name='reports_dept_status_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['department', 'batch', '-submitted_at'], name='reports_dept_batch_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportassignment',
+            index=models.Index(fields=['evaluator', 'is_active'], name='reports_assign_eval_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportassignment',
+            index=models.Index(fields=['report', 'is_active'], name='reports_assign_report_idx'),
+        ),
+    ]
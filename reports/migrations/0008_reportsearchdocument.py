@@ -0,0 +1,97 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+DOCUMENT_TABLE = 'reports_reportsearchdocument'
+FTS_TABLE = 'reports_reportsearch_fts'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, student, supervisor, body,
+        content='{DOCUMENT_TABLE}', content_rowid='report_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, student, supervisor, body)
+        VALUES (new.report_id, new.title, new.student, new.supervisor, new.body);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, student, supervisor, body)
+        VALUES ('delete', old.report_id, old.title, old.student, old.supervisor, old.body);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, student, supervisor, body)
+        VALUES ('delete', old.report_id, old.title, old.student, old.supervisor, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, student, supervisor, body)
+        VALUES (new.report_id, new.title, new.student, new.supervisor, new.body);
+    END""",
+]
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+MYSQL_FORWARD = [
+    f"ALTER TABLE {DOCUMENT_TABLE} ADD FULLTEXT INDEX reports_search_fulltext (title, student, supervisor, body)",
+]
+MYSQL_REVERSE = [
+    f"ALTER TABLE {DOCUMENT_TABLE} DROP INDEX reports_search_fulltext",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def populate_documents(apps, schema_editor):
+    """Index existing reports"""
+    ProjectReport = apps.get_model('reports', 'ProjectReport')
+    ReportSearchDocument = apps.get_model('reports', 'ReportSearchDocument')
+    ReportSearchDocument.objects.bulk_create(
+        [
+            ReportSearchDocument(
+                report_id=report.id,
+                title=report.title,
+                student=' '.join(filter(None, [report.student.first_name, report.student.last_name, report.student.username])),
+                supervisor=report.supervisor or '',
+                body=report.description or '',
+            )
+            for report in ProjectReport.objects.select_related('student')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_report_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSearchDocument',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='reports.projectreport')),
+                ('title', models.CharField(max_length=200)),
+                ('student', models.CharField(blank=True, help_text='Student first name, last name and username', max_length=255)),
+                ('supervisor', models.CharField(blank=True, max_length=100)),
+                ('body', models.TextField(blank=True, help_text='Description and extracted report text')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Report Search Document',
+                'verbose_name_plural': 'Report Search Documents',
+            },
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'sqlite': SQLITE_FORWARD, 'mysql': MYSQL_FORWARD}),
+            run_vendor_sql({'sqlite': SQLITE_REVERSE, 'mysql': MYSQL_REVERSE}),
+        ),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_reportsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectreport',
+            name='content_type',
+            field=models.CharField(blank=True, help_text='MIME type detected at upload', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='projectreport',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 of the file recorded at upload', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='projectreport',
+            name='size_bytes',
+            field=models.PositiveBigIntegerField(blank=True, help_text='File size recorded at upload', null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:25
+
+import django.core.validators
+from django.db import migrations, models
+import reports.models
+import reports.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_report_file_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(help_text='Storage name of the file', max_length=255)),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Reports using this file')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Report Blob',
+                'verbose_name_plural': 'Report Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='projectreport',
+            name='report_file',
+            field=models.FileField(help_text='Upload PDF, DOCX, or XLSX files only (Max size: 5MB)', storage=reports.storage.ContentAddressedStorage(), upload_to=reports.models.upload_to_reports, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'docx', 'xlsx']), reports.models.validate_file_size]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0010_report_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectreport',
+            name='file_missing',
+            field=models.BooleanField(default=False, help_text='Stored file was not found by gc_media'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0011_projectreport_file_missing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportText',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='extracted_text', serialize=False, to='reports.projectreport')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('text', models.TextField(blank=True)),
+                ('page_count', models.PositiveIntegerField(blank=True, help_text='Pages, or worksheets for workbooks', null=True)),
+                ('word_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Report Text',
+                'verbose_name_plural': 'Report Texts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='projectreport',
+            index=models.Index(fields=['sha256'], name='reports_sha256_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporttext',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='reports_text_due_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0012_reporttext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSignature',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='reports.projectreport')),
+                ('minhash', models.BinaryField(help_text='Little-endian uint32 minimum hashes, one per permutation')),
+                ('shingle_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text="Estimated Jaccard similarity of the reports' word shingles")),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='reports.projectreport')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reports.projectreport')),
+            ],
+            options={
+                'verbose_name': 'Report Similarity',
+                'verbose_name_plural': 'Report Similarities',
+                'ordering': ['-score'],
+                'unique_together': {('report', 'similar')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportLSHBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_bands', to='reports.projectreport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'band'], name='reports_lsh_bucket_idx')],
+                'unique_together': {('report', 'band')},
+            },
+        ),
+    ]
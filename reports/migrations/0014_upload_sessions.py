@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:40
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import reports.models
+import reports.storage
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0013_report_similarity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectreport',
+            name='report_file',
+            field=models.FileField(help_text='Upload PDF, DOCX, or XLSX files only', storage=reports.storage.ContentAddressedStorage(), upload_to=reports.models.upload_to_reports, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'docx', 'xlsx']), reports.models.validate_file_size]),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size_bytes', models.PositiveBigIntegerField(help_text='Size of the whole file, declared when the upload starts')),
+                ('received_bytes', models.PositiveBigIntegerField(default=0, help_text='Bytes appended and verified so far')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['updated_at'], name='reports_upload_updated_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:43
+
+import django.core.validators
+from django.db import migrations, models
+import reports.models
+import reports.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0014_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectreport',
+            name='report_file',
+            field=models.FileField(help_text='Upload PDF, DOCX, or XLSX files only', storage=reports.storage.ContentAddressedStorage(), upload_to=reports.models.upload_to_reports, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'docx', 'xlsx']), reports.models.validate_file_size, reports.models.validate_file_content]),
+        ),
+    ]
@@ -1,28 +1,51 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
 import os
 import uuid
 
+from . import files
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
+def max_upload_mb():
+    """Largest report file accepted, in MB (REPORT_MAX_UPLOAD_MB)"""
+    return getattr(settings, 'REPORT_MAX_UPLOAD_MB', 5)
+
+
 def validate_file_size(value):
-    """Validate file size - max 5MB"""
-    max_size = 5 * 1024 * 1024  # 5MB in bytes
+    """Validate file size - max REPORT_MAX_UPLOAD_MB"""
+    max_size = max_upload_mb() * 1024 * 1024
     if value.size > max_size:
-        raise ValidationError(f'File size must be less than 5MB. Current size: {value.size / (1024 * 1024):.2f}MB')
+        raise ValidationError(
+            f'File size must be less than {max_upload_mb()}MB. Current size: {value.size / (1024 * 1024):.2f}MB'
+        )
+
+
+def validate_file_content(value):
+    """Validate that a new upload's content matches its extension"""
+    if getattr(value, '_committed', True):
+        # Already stored, and checked when it was uploaded
+        return
+    error = files.sniff(value.file, value.name)
+    if error:
+        raise ValidationError(error)
 
 
 def upload_to_reports(instance, filename):
-    """Generate upload path with UUID-based unique filename"""
-    # Get file extension
-    ext = filename.split('.')[-1]
-    # Generate UUID filename
-    uuid_filename = f"{uuid.uuid4()}.{ext}"
+    """Generate a sharded upload path (reports/ab/cd/<name>.<ext>) named after the content's SHA-256"""
+    extension = os.path.splitext(filename)[1]
+    if instance.sha256:
+        # Identical uploads get the same name and share one stored file
+        return files.blob_name(instance.sha256, extension)
     # Store original filename in uuid_name field will be handled in save method
-    return f'reports/{uuid_filename}'
+    return files.sharded_name(uuid.uuid4(), extension)
 
 
 class ProjectReport(models.Model):
@@ -43,33 +66,63 @@ class ProjectReport(models.Model):
     supervisor = models.CharField(max_length=100, blank=True, null=True)
     report_file = models.FileField(
         upload_to=upload_to_reports,
+        storage=ContentAddressedStorage(),
         validators=[
             FileExtensionValidator(allowed_extensions=['pdf', 'docx', 'xlsx']),
-            validate_file_size
+            validate_file_size,
+            validate_file_content,
         ],
-        help_text="Upload PDF, DOCX, or XLSX files only (Max size: 5MB)"
+        help_text="Upload PDF, DOCX, or XLSX files only"
     )
     uuid_name = models.CharField(max_length=255, blank=True, help_text="Unique UUID-based filename")
     original_filename = models.CharField(max_length=255, blank=True, help_text="Original filename uploaded by user")
+    size_bytes = models.PositiveBigIntegerField(null=True, blank=True, help_text="File size recorded at upload")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the file recorded at upload")
+    content_type = models.CharField(max_length=100, blank=True, help_text="MIME type detected at upload")
+    file_missing = models.BooleanField(default=False, help_text="Stored file was not found by gc_media")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='submitted')
     submitted_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def save(self, *args, **kwargs):
         """Override save to set uuid_name from filename"""
-        if self.report_file:
-            if not self.uuid_name:
-                # Extract UUID filename from report_file name
-                self.uuid_name = os.path.basename(self.report_file.name)
-            # Store original filename if provided
-            if hasattr(self, '_original_filename') and self._original_filename and not self.original_filename:
-                self.original_filename = self._original_filename
-        super().save(*args, **kwargs)
+        # Derived statistics and blob reference counts are updated in the same transaction
+        with transaction.atomic():
+            if self.report_file:
+                # Store original filename if provided
+                if hasattr(self, '_original_filename') and self._original_filename and not self.original_filename:
+                    self.original_filename = self._original_filename
+                if not self.report_file._committed:
+                    # New upload: record its metadata, then store it unless identical bytes already are
+                    info = files.inspect(self.report_file, self.original_filename or self.report_file.name)
+                    self.size_bytes, self.sha256, self.content_type = info.size, info.sha256, info.content_type
+                    ReportBlob.objects.store(self.report_file, info)
+                    self.uuid_name = ''
+                    self.file_missing = False
+                if not self.uuid_name:
+                    # Extract stored filename from report_file name
+                    self.uuid_name = os.path.basename(self.report_file.name)
+            super().save(*args, **kwargs)
+            previous, self._stored_file = self._stored_file, (self.sha256, self.report_file.name)
+            if previous[1] and previous != self._stored_file:
+                # The file was replaced: drop this report's reference to the old one
+                ReportBlob.objects.release(*previous)
     
     class Meta:
         ordering = ['-submitted_at']
         verbose_name = 'Project Report'
         verbose_name_plural = 'Project Reports'
+        # Match the filter + ordering combinations used by the dashboards and listings
+        indexes = [
+            models.Index(fields=['-submitted_at'], name='reports_submitted_idx'),
+            models.Index(fields=['student', '-submitted_at'], name='reports_student_sub_idx'),
+            models.Index(fields=['status', '-submitted_at'], name='reports_status_sub_idx'),
+            models.Index(fields=['department', '-submitted_at'], name='reports_dept_sub_idx'),
+            models.Index(fields=['department', 'status', '-submitted_at'], name='reports_dept_status_sub_idx'),
+            models.Index(fields=['department', 'batch', '-submitted_at'], name='reports_dept_batch_sub_idx'),
+            # Reports with identical files, e.g. to reuse their extracted text
+            models.Index(fields=['sha256'], name='reports_sha256_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.student.username}"
@@ -86,12 +139,146 @@ class ProjectReport(models.Model):
     
     @property
     def file_size(self):
+        if self.size_bytes is not None:
+            return files.format_size(self.size_bytes)
+        # Rows uploaded before metadata was recorded, see backfill_file_metadata
         try:
-            return f"{self.report_file.size / 1024:.1f} KB"
+            return files.format_size(self.report_file.size)
         except:
             return "Unknown"
 
 
+class ReportBlobManager(models.Manager):
+    """
+    Reference counting of stored files.
+
+    store and the deletion of a file with its last reference both lock the
+    blob row, so a file is never deleted while an upload of the same bytes
+    is taking a new reference to it. A row whose count dropped to zero stays
+    until its file is deleted after commit, and an upload arriving in the
+    meantime simply takes it over.
+    """
+
+    def store(self, field_file, info):
+        """Point an uncommitted upload at the stored copy of its bytes, writing them only if none exists"""
+        blob = self.select_for_update().filter(sha256=info.sha256).first()
+        if blob is None:
+            field_file.save(field_file.name, field_file.file, save=False)
+            blob, _ = self.get_or_create(sha256=info.sha256, defaults={'name': field_file.name, 'size_bytes': info.size})
+        self.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        field_file.name = blob.name
+        field_file._committed = True
+
+    def release(self, sha256, name):
+        """Drop one reference to a stored file and delete the file with its last reference"""
+        if not self.filter(sha256=sha256, name=name).update(ref_count=F('ref_count') - 1):
+            # Uploaded before content addressing; not shared
+            return
+        if self.filter(sha256=sha256, ref_count__lte=0).exists():
+            transaction.on_commit(lambda: self._delete_unreferenced(sha256))
+
+    def _delete_unreferenced(self, sha256):
+        with transaction.atomic():
+            # Skipped if the same bytes were uploaded again since the last reference went
+            blob = self.select_for_update().filter(sha256=sha256, ref_count__lte=0).first()
+            if blob is not None:
+                ProjectReport._meta.get_field('report_file').storage.delete(blob.name)
+                blob.delete()
+
+
+class ReportBlob(models.Model):
+    """A stored report file, shared by every report with the same content"""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, help_text="Storage name of the file")
+    size_bytes = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0, help_text="Reports using this file")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ReportBlobManager()
+
+    class Meta:
+        verbose_name = 'Report Blob'
+        verbose_name_plural = 'Report Blobs'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} reports)"
+
+
+class ReportText(models.Model):
+    """Plain text and counts extracted from a report's file in the background (see reports.extraction)"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    report = models.OneToOneField(ProjectReport, on_delete=models.CASCADE, primary_key=True, related_name='extracted_text')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    text = models.TextField(blank=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True, help_text="Pages, or worksheets for workbooks")
+    word_count = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='reports_text_due_idx'),
+        ]
+        verbose_name = 'Report Text'
+        verbose_name_plural = 'Report Texts'
+
+    def __str__(self):
+        return f"Text of report {self.report_id} ({self.status})"
+
+
+class ReportSignature(models.Model):
+    """MinHash signature of a report's extracted text (see reports.similarity)"""
+
+    report = models.OneToOneField(ProjectReport, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField(help_text="Little-endian uint32 minimum hashes, one per permutation")
+    shingle_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Signature of report {self.report_id}"
+
+
+class ReportLSHBand(models.Model):
+    """One locality-sensitive hashing bucket of a report's signature; reports sharing a bucket are candidates"""
+
+    report = models.ForeignKey(ProjectReport, on_delete=models.CASCADE, related_name='lsh_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['report', 'band']
+        indexes = [
+            models.Index(fields=['bucket', 'band'], name='reports_lsh_bucket_idx'),
+        ]
+
+
+class ReportSimilarity(models.Model):
+    """A likely near-duplicate of a report, stored in both directions"""
+
+    report = models.ForeignKey(ProjectReport, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(ProjectReport, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(help_text="Estimated Jaccard similarity of the reports' word shingles")
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['report', 'similar']
+        ordering = ['-score']
+        verbose_name = 'Report Similarity'
+        verbose_name_plural = 'Report Similarities'
+
+    def __str__(self):
+        return f"Report {self.report_id} resembles report {self.similar_id} ({self.score:.0%})"
+
+
 class Feedback(models.Model):
     """Model for storing evaluator feedback on reports"""
     
@@ -106,6 +293,14 @@ class Feedback(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['report', 'evaluator']
+        indexes = [
+            models.Index(fields=['evaluator', 'report'], name='reports_feedback_eval_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Derived statistics are updated by post_save handlers in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Feedback for {self.report.title} by {self.evaluator.username}"
@@ -129,6 +324,15 @@ class ReportAssignment(models.Model):
     class Meta:
         unique_together = ['report', 'evaluator']
         ordering = ['-assigned_at']
+        indexes = [
+            models.Index(fields=['evaluator', 'is_active'], name='reports_assign_eval_idx'),
+            models.Index(fields=['report', 'is_active'], name='reports_assign_report_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Visibility and statistics are updated by post_save handlers in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.report.title} assigned to {self.evaluator.username}"
@@ -144,8 +348,116 @@ class EvaluatorStudentAssignment(models.Model):
 
     class Meta:
         unique_together = ['evaluator', 'student']
+        indexes = [
+            models.Index(fields=['evaluator', 'is_active'], name='reports_mapping_eval_idx'),
+            models.Index(fields=['student', 'is_active'], name='reports_mapping_student_idx'),
+        ]
         verbose_name = 'Evaluator-Student Assignment'
         verbose_name_plural = 'Evaluator-Student Assignments'
 
+    def save(self, *args, **kwargs):
+        # Visibility is updated by post_save handlers in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.student.username} -> {self.evaluator.username}"
+
+
+class EvaluatorReportVisibility(models.Model):
+    """Materialized index of the reports each evaluator can see on their dashboard"""
+
+    SOURCE_CHOICES = [
+        ('assignment', 'Report Assignment'),
+        ('student_mapping', 'Evaluator-Student Assignment'),
+    ]
+
+    evaluator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_reports')
+    report = models.ForeignKey(ProjectReport, on_delete=models.CASCADE, related_name='evaluator_visibility')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    submitted_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['evaluator', 'report', 'source']
+        indexes = [
+            models.Index(fields=['evaluator', '-submitted_at'], name='reports_vis_eval_sub_idx'),
+        ]
+        verbose_name = 'Evaluator Report Visibility'
+        verbose_name_plural = 'Evaluator Report Visibility'
+
     def __str__(self):
-        return f"{self.student.username} -> {self.evaluator.username}"
\ No newline at end of file
+        return f"{self.report_id} visible to {self.evaluator_id} ({self.source})"
+
+
+class ReportStatsRollup(models.Model):
+    """Report counts per department, batch and status for the admin dashboard"""
+
+    department = models.CharField(max_length=100)
+    batch = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=ProjectReport.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['department', 'batch', 'status']
+        verbose_name = 'Report Statistics Rollup'
+        verbose_name_plural = 'Report Statistics Rollups'
+
+    def __str__(self):
+        return f"{self.department} / {self.batch} / {self.status}: {self.count}"
+
+
+class EvaluatorStats(models.Model):
+    """Per-evaluator assignment and feedback counters for the admin dashboard"""
+
+    evaluator = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='report_stats')
+    assigned_count = models.IntegerField(default=0)
+    evaluated_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Evaluator Statistics'
+        verbose_name_plural = 'Evaluator Statistics'
+
+    def __str__(self):
+        return f"{self.evaluator_id}: {self.assigned_count} assigned, {self.evaluated_count} evaluated"
+
+
+class ReportSearchDocument(models.Model):
+    """Denormalized searchable text of a report, full-text indexed by the database (see reports.search)"""
+
+    report = models.OneToOneField(ProjectReport, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.CharField(max_length=200)
+    student = models.CharField(max_length=255, blank=True, help_text="Student first name, last name and username")
+    supervisor = models.CharField(max_length=100, blank=True)
+    body = models.TextField(blank=True, help_text="Description and extracted report text")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Report Search Document'
+        verbose_name_plural = 'Report Search Documents'
+
+    def __str__(self):
+        return f"Search document for report {self.report_id}"
+
+
+class UploadSession(models.Model):
+    """A report file being uploaded in chunks (see reports.uploads)"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size_bytes = models.PositiveBigIntegerField(help_text="Size of the whole file, declared when the upload starts")
+    received_bytes = models.PositiveBigIntegerField(default=0, help_text="Bytes appended and verified so far")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='reports_upload_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.received_bytes}/{self.size_bytes} bytes)"
+
+    @property
+    def complete(self):
+        return self.received_bytes == self.size_bytes
@@ -0,0 +1,140 @@
+"""
+Keyset (cursor) pagination for long listings.
+
+Pages are fetched with a ``WHERE (key) < (last key seen)`` filter on an
+ordering ending in a unique column, so every page costs one index range
+scan of ``per_page`` rows no matter how deep it is. Cursors are signed,
+opaque tokens; tampered or stale tokens fall back to the first page.
+"""
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_SALT = 'reports.pagination'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def filter_querystring(request):
+    """The current query string without the cursor, for building page links"""
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    params.pop('page', None)
+    return params.urlencode()
+
+
+class CursorPage:
+    """One page of a CursorPaginator, iterable like a Django Page"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if self.has_next_page:
+            return self.paginator.encode(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_page:
+            return self.paginator.encode(self.object_list[0], PREVIOUS)
+
+    @property
+    def last_cursor(self):
+        return self.paginator.encode(None, PREVIOUS)
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` on ``ordering``, whose last field must be unique.
+
+    ``count_limit`` caps the optional total count: ``count`` stops at that
+    many rows and ``count_truncated`` tells whether there are more. Pass 0
+    to skip counting altogether.
+    """
+
+    def __init__(self, queryset, ordering=('-submitted_at', '-id'), per_page=20, count_limit=1000):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.count_limit = count_limit
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+    def encode(self, obj, direction):
+        values = None if obj is None else [field.value_to_string(obj) for field in self.fields]
+        return signing.dumps([direction, values], salt=CURSOR_SALT)
+
+    def decode(self, cursor):
+        """Return (direction, key values), or (NEXT, None) for the first page"""
+        try:
+            direction, values = signing.loads(cursor, salt=CURSOR_SALT)
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if values is not None:
+                if len(values) != len(self.fields):
+                    raise ValueError(values)
+                values = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return direction, values
+        except (signing.BadSignature, ValidationError, TypeError, ValueError):
+            return NEXT, None
+
+    def _after(self, values, reverse):
+        """Q matching rows strictly after the key ``values`` in (reversed) ordering"""
+        condition = Q()
+        for position, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = f"{name.lstrip('-')}__{'lt' if descending else 'gt'}"
+            equal = {field.lstrip('-'): value for field, value in zip(self.ordering[:position], values)}
+            condition |= Q(**equal, **{lookup: values[position]})
+        return condition
+
+    def get_page(self, cursor=None):
+        direction, values = self.decode(cursor) if cursor else (NEXT, None)
+        reverse = direction == PREVIOUS
+        ordering = [name.lstrip('-') if name.startswith('-') else f'-{name}' for name in self.ordering] if reverse else self.ordering
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            return CursorPage(rows, self, has_next=values is not None, has_previous=has_more)
+        return CursorPage(rows, self, has_next=has_more, has_previous=values is not None)
+
+    @property
+    def count(self):
+        """Total rows, counted up to count_limit"""
+        if not self.count_limit:
+            return None
+        if not hasattr(self, '_count'):
+            self._count = self.queryset.order_by().values('pk')[:self.count_limit + 1].count()
+        return min(self._count, self.count_limit)
+
+    @property
+    def count_truncated(self):
+        return self.count is not None and self._count > self.count_limit
@@ -0,0 +1,24 @@
+"""
+Query helpers for report listing pages
+"""
+from django.db.models import Count, Prefetch, Q
+
+from .models import ProjectReport, ReportAssignment
+
+
+def report_listing(queryset=None):
+    """
+    Prepare reports for a listing table.
+
+    Loads the student with the report, prefetches active assignments with
+    their evaluators into ``active_assignments`` and annotates
+    ``assignment_count`` so templates never query per row.
+    """
+    if queryset is None:
+        queryset = ProjectReport.objects.all()
+    active_assignments = ReportAssignment.objects.filter(is_active=True).select_related('evaluator')
+    return queryset.select_related('student').annotate(
+        assignment_count=Count('assignments', filter=Q(assignments__is_active=True), distinct=True),
+    ).prefetch_related(
+        Prefetch('assignments', queryset=active_assignments, to_attr='active_assignments'),
+    )
@@ -0,0 +1,188 @@
+"""
+Full-text search over project reports.
+
+Reports are denormalized into ReportSearchDocument rows (title, student,
+supervisor and body text) which the database indexes natively: an FTS5
+virtual table kept in sync by triggers on SQLite, and a FULLTEXT index on
+MySQL. Other databases fall back to a plain ``icontains`` scan.
+
+Use ``search()`` for ranked hits and ``filter_reports()`` to narrow a
+ProjectReport queryset. Only ``search()`` is capped at REPORT_SEARCH_LIMIT
+hits and bounded by REPORT_SEARCH_BUDGET_MS; ``filter_reports()`` adds the
+match as a subquery, so every matching report is kept and the query runs
+as part of the listing it narrows.
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection, OperationalError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import ReportSearchDocument, ReportText
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'reports_reportsearch_fts'
+MAX_TERMS = 8
+# Extracted report text indexed per report
+MAX_BODY_CHARS = 200_000
+
+
+@dataclass
+class SearchResult:
+    """Ranked search hits, best match first"""
+    hits: list = field(default_factory=list)  # [(report_id, score)]
+    timed_out: bool = False
+
+    @property
+    def report_ids(self):
+        return [report_id for report_id, _ in self.hits]
+
+
+def terms(query):
+    """Split a user query into lowercase word terms"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def student_text(user):
+    return ' '.join(filter(None, [user.first_name, user.last_name, user.username]))
+
+
+def document_fields(report):
+    """Searchable text of a report, including the text extracted from its file once available"""
+    extracted = ReportText.objects.filter(report_id=report.pk, status='done').values_list('text', flat=True).first()
+    return {
+        'title': report.title,
+        'student': student_text(report.student),
+        'supervisor': report.supervisor or '',
+        'body': '\n'.join(filter(None, [report.description, (extracted or '')[:MAX_BODY_CHARS]])),
+    }
+
+
+class SearchBackend:
+    """icontains fallback used when the database has no native full-text index"""
+
+    def matching(self, words):
+        """Subquery of the ids of every report matching all words"""
+        query = Q()
+        for word in words:
+            query &= Q(title__icontains=word) | Q(student__icontains=word) | Q(supervisor__icontains=word) | Q(body__icontains=word)
+        return ReportSearchDocument.objects.filter(query).values('report_id')
+
+    def search(self, words, limit, budget_ms):
+        report_ids = self.matching(words).order_by('-report_id').values_list('report_id', flat=True)[:limit]
+        return SearchResult(hits=[(report_id, 0.0) for report_id in report_ids])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """SQLite FTS5 with bm25 ranking; the budget is enforced with a progress handler"""
+
+    # Relative bm25 weights of the title, student, supervisor and body columns
+    WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+    def match(self, words):
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def matching(self, words):
+        return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self.match(words)])
+
+    def search(self, words, limit, budget_ms):
+        match = self.match(words)
+        sql = (
+            f"SELECT rowid, bm25({FTS_TABLE}, {', '.join(map(str, self.WEIGHTS))}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s"
+        )
+        connection.ensure_connection()
+        deadline = time.monotonic() + budget_ms / 1000
+        raw = connection.connection
+        raw.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [match, limit])
+                rows = cursor.fetchall()
+        except OperationalError as e:
+            if 'interrupted' not in str(e):
+                raise
+            return SearchResult(timed_out=True)
+        finally:
+            raw.set_progress_handler(None, 0)
+        return SearchResult(hits=[(report_id, -rank) for report_id, rank in rows])
+
+
+class MySQLFullTextBackend(SearchBackend):
+    """InnoDB FULLTEXT in boolean mode; the budget is enforced with MAX_EXECUTION_TIME"""
+
+    QUERY_TIMEOUT_ERROR = 3024
+
+    def match(self, words):
+        return ' '.join(f'+{word}*' for word in words)
+
+    def matching(self, words):
+        return RawSQL(
+            f"SELECT report_id FROM {ReportSearchDocument._meta.db_table} "
+            f"WHERE MATCH(title, student, supervisor, body) AGAINST (%s IN BOOLEAN MODE)",
+            [self.match(words)],
+        )
+
+    def search(self, words, limit, budget_ms):
+        match = self.match(words)
+        table = ReportSearchDocument._meta.db_table
+        sql = (
+            f"SELECT /*+ MAX_EXECUTION_TIME({int(budget_ms)}) */ report_id, "
+            f"MATCH(title, student, supervisor, body) AGAINST (%s IN BOOLEAN MODE) AS score "
+            f"FROM {table} WHERE MATCH(title, student, supervisor, body) AGAINST (%s IN BOOLEAN MODE) "
+            f"ORDER BY score DESC LIMIT %s"
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [match, match, limit])
+                rows = cursor.fetchall()
+        except OperationalError as e:
+            if not e.args or e.args[0] != self.QUERY_TIMEOUT_ERROR:
+                raise
+            return SearchResult(timed_out=True)
+        return SearchResult(hits=[(report_id, float(score)) for report_id, score in rows])
+
+
+def get_backend():
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'mysql':
+        return MySQLFullTextBackend()
+    return SearchBackend()
+
+
+def search(query, limit=None, budget_ms=None):
+    """Return ranked hits for query within the time budget"""
+    words = terms(query)
+    if not words:
+        return SearchResult()
+    limit = limit or getattr(settings, 'REPORT_SEARCH_LIMIT', 500)
+    budget_ms = budget_ms or getattr(settings, 'REPORT_SEARCH_BUDGET_MS', 250)
+    result = get_backend().search(words, limit, budget_ms)
+    if result.timed_out:
+        logger.warning(f"Report search for {query!r} exceeded its {budget_ms}ms budget")
+    return result
+
+
+def filter_reports(queryset, query):
+    """Restrict a ProjectReport queryset to all reports matching query, unranked and without a hit limit"""
+    words = terms(query)
+    if not words:
+        return queryset
+    return queryset.filter(id__in=get_backend().matching(words))
+
+
+def index_report(report):
+    """Create or refresh the search document of a report"""
+    ReportSearchDocument.objects.update_or_create(report=report, defaults=document_fields(report))
+
+
+def reindex_student(user):
+    """Refresh the student column of all documents of a student after a name change"""
+    text = student_text(user)
+    ReportSearchDocument.objects.filter(report__student=user).exclude(student=text).update(student=text)
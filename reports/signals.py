@@ -0,0 +1,136 @@
+"""
+Signal handlers keeping derived report tables in sync with their sources
+"""
+from django.conf import settings
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import dashboards, extraction, search, stats, visibility
+from .models import ProjectReport, ReportBlob, Feedback, ReportAssignment, EvaluatorStudentAssignment
+
+
+@receiver(post_init, sender=ProjectReport)
+def remember_report_state(sender, instance, **kwargs):
+    instance._stats_key = stats.report_key(instance)
+    # The file a saved row references, read raw so deferred fields are not loaded
+    stored = instance.__dict__.get('report_file') if instance.pk else None
+    instance._stored_file = (instance.__dict__.get('sha256'), getattr(stored, 'name', stored))
+
+
+@receiver(post_save, sender=ProjectReport)
+def report_saved(sender, instance, created, raw=False, **kwargs):
+    """Expose new reports to mapped evaluators, keep the statistics rollup and search index current and queue text extraction"""
+    if raw:
+        return
+    search.index_report(instance)
+    if instance.report_file and instance.report_file.name != instance._stored_file[1]:
+        # New or replaced file: extract its text in the background
+        extraction.queue(instance)
+    new_key = stats.report_key(instance)
+    if created:
+        visibility.grant_new_report(instance)
+        stats.adjust_report_count(new_key, 1)
+    elif None not in instance._stats_key and instance._stats_key != new_key:
+        stats.adjust_report_count(instance._stats_key, -1)
+        stats.adjust_report_count(new_key, 1)
+    instance._stats_key = new_key
+    dashboards.invalidate(dashboards.student_scope(instance.student_id))
+    dashboards.invalidate_evaluators(visibility.evaluators_of([instance.pk]))
+
+
+@receiver(pre_delete, sender=ProjectReport)
+def report_deleting(sender, instance, **kwargs):
+    # The visibility rows are deleted with the report
+    instance._evaluator_ids = visibility.evaluators_of([instance.pk])
+
+
+@receiver(post_delete, sender=ProjectReport)
+def report_deleted(sender, instance, **kwargs):
+    stats.adjust_report_count(instance._stats_key, -1)
+    if instance._stored_file[1]:
+        ReportBlob.objects.release(*instance._stored_file)
+    dashboards.invalidate(dashboards.student_scope(instance.student_id))
+    dashboards.invalidate_evaluators(getattr(instance, '_evaluator_ids', []))
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.adjust_evaluator(instance.evaluator_id, evaluated=1)
+    dashboards.invalidate_evaluators(visibility.evaluators_of([instance.report_id]))
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    stats.adjust_evaluator(instance.evaluator_id, evaluated=-1)
+    dashboards.invalidate_evaluators(visibility.evaluators_of([instance.report_id]))
+
+
+@receiver(post_init, sender=ReportAssignment)
+def remember_assignment_state(sender, instance, **kwargs):
+    instance._stats_state = (instance.__dict__.get('evaluator_id'), instance.__dict__.get('is_active'))
+
+
+@receiver(post_save, sender=ReportAssignment)
+def report_assignment_saved(sender, instance, created, raw=False, **kwargs):
+    """Grant or revoke evaluator visibility and counters as the assignment is (de)activated"""
+    if raw:
+        return
+    pair = [(instance.evaluator_id, instance.report_id)]
+    if instance.is_active:
+        visibility.grant_assignments(pair)
+    else:
+        visibility.revoke_assignments(pair)
+
+    old_evaluator, was_active = (None, False) if created else instance._stats_state
+    if (old_evaluator, bool(was_active)) != (instance.evaluator_id, instance.is_active):
+        if was_active:
+            stats.adjust_evaluator(old_evaluator, assigned=-1)
+        if instance.is_active:
+            stats.adjust_evaluator(instance.evaluator_id, assigned=1)
+    instance._stats_state = (instance.evaluator_id, instance.is_active)
+
+
+@receiver(post_delete, sender=ReportAssignment)
+def report_assignment_deleted(sender, instance, **kwargs):
+    visibility.revoke_assignments([(instance.evaluator_id, instance.report_id)])
+    if instance._stats_state[1]:
+        stats.adjust_evaluator(instance._stats_state[0], assigned=-1)
+
+
+@receiver(post_save, sender=EvaluatorStudentAssignment)
+def student_mapping_saved(sender, instance, raw=False, **kwargs):
+    """Grant or revoke visibility of all the student's reports"""
+    if raw:
+        return
+    pair = [(instance.evaluator_id, instance.student_id)]
+    if instance.is_active:
+        visibility.grant_student_mappings(pair)
+    else:
+        visibility.revoke_student_mappings(pair)
+
+
+@receiver(post_delete, sender=EvaluatorStudentAssignment)
+def student_mapping_deleted(sender, instance, **kwargs):
+    visibility.revoke_student_mappings([(instance.evaluator_id, instance.student_id)])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Keep student names in the search index and on dashboards in step with the account"""
+    if raw or update_fields == frozenset({'last_login'}):
+        # Logging in changes nothing shown
+        return
+    dashboards.invalidate(dashboards.ADMIN_SCOPE)
+    if instance.is_student:
+        dashboards.invalidate(dashboards.PENDING_STUDENTS_SCOPE)
+        if not created:
+            search.reindex_student(instance)
+            dashboards.invalidate_evaluators(visibility.evaluators_of_student(instance.pk))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    dashboards.invalidate(dashboards.ADMIN_SCOPE, dashboards.PENDING_STUDENTS_SCOPE)
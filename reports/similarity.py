@@ -0,0 +1,159 @@
+"""
+Near-duplicate detection over extracted report text.
+
+Each report's text is cut into overlapping SHINGLE_WORDS-word shingles and
+summarised by a MinHash signature of NUM_PERM minimum hashes, computed with
+NumPy a block of shingles at a time. The share of equal positions in two
+signatures estimates the Jaccard similarity of the reports' shingle sets.
+
+Signatures are split into BANDS bands of ROWS hashes and each band is hashed
+to a bucket stored in ReportLSHBand. A new report is only compared with the
+reports sharing at least one bucket with it, found through the bucket index,
+so checking it does not grow with the number of reports stored. With 32
+bands of 4 rows, pairs around 0.4 similar become candidates about half the
+time and pairs above 0.6 almost always; candidates are then kept if their
+estimated similarity reaches REPORT_SIMILARITY_THRESHOLD.
+"""
+import hashlib
+import logging
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ReportLSHBand, ReportSignature, ReportSimilarity
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+# Texts with fewer distinct shingles (cover pages, empty scans) match too easily to be flagged
+MIN_SHINGLES = 20
+# Shingles hashed per step, bounding the NUM_PERM x block matrix to 4 MB
+BLOCK = 4096
+# Reports sharing the most buckets that are compared with a new one
+MAX_CANDIDATES = 500
+WORD_RE = re.compile(r'\w+')
+
+# Fixed seed: signatures stored by one process must compare with those of any other
+_random = np.random.default_rng(1_000_003)
+# Multiply-shift hashing; the multipliers must be odd
+_MULTIPLIERS = _random.integers(1, 2 ** 64, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_INCREMENTS = _random.integers(0, 2 ** 64, size=NUM_PERM, dtype=np.uint64)
+_SHINGLE_BASE = np.uint64(1_099_511_628_211)
+_SHIFT = np.uint64(32)
+
+
+def shingles(text):
+    """Distinct 64-bit hashes of the text's word shingles"""
+    words = WORD_RE.findall(text.lower())
+    count = len(words) - SHINGLE_WORDS + 1
+    if count < 1:
+        return np.empty(0, dtype=np.uint64)
+    codes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    # Polynomial hash of each window; uint64 arithmetic wraps, which is what we want
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(SHINGLE_WORDS):
+        hashes = hashes * _SHINGLE_BASE + codes[offset:offset + count]
+    return np.unique(hashes)
+
+
+def minhash(values):
+    """MinHash signature (NUM_PERM uint32 values) of a set of shingle hashes"""
+    signature = np.full(NUM_PERM, 2 ** 32 - 1, dtype=np.uint64)
+    for start in range(0, len(values), BLOCK):
+        block = values[start:start + BLOCK]
+        hashed = (_MULTIPLIERS[:, None] * block[None, :] + _INCREMENTS[:, None]) >> _SHIFT
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def buckets(signature):
+    """LSH bucket of each band of a signature"""
+    rows = signature.astype('<u4').reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for band in rows
+    ]
+
+
+def estimate(signature, others):
+    """Estimated Jaccard similarity of a signature to each row of a signature matrix"""
+    return (others == signature).mean(axis=1)
+
+
+def _decode(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def threshold():
+    return getattr(settings, 'REPORT_SIMILARITY_THRESHOLD', 0.5)
+
+
+def candidates(report, report_buckets):
+    """Other students' reports sharing a bucket with report, those sharing most bands first"""
+    wanted = set(enumerate(report_buckets))
+    shared = Counter()
+    rows = ReportLSHBand.objects.filter(bucket__in=report_buckets).exclude(report_id=report.pk).exclude(
+        report__student_id=report.student_id
+    ).values_list('report_id', 'band', 'bucket')
+    for report_id, band, bucket in rows:
+        if (band, bucket) in wanted:
+            shared[report_id] += 1
+    return [report_id for report_id, _ in shared.most_common(MAX_CANDIDATES)]
+
+
+def find_similar(report, signature, report_buckets):
+    """(report id, estimated similarity) of the stored reports likely to be near-duplicates of report"""
+    ids = candidates(report, report_buckets)
+    if not ids:
+        return []
+    stored = list(ReportSignature.objects.filter(report_id__in=ids).values_list('report_id', 'minhash'))
+    others = np.stack([_decode(data) for _, data in stored])
+    scores = estimate(signature, others)
+    limit = threshold()
+    return sorted(
+        ((report_id, float(score)) for (report_id, _), score in zip(stored, scores) if score >= limit),
+        key=lambda match: -match[1],
+    )
+
+
+def forget(report):
+    """Drop a report's signature, buckets and matches, e.g. when its file is replaced"""
+    ReportSignature.objects.filter(report=report).delete()
+    ReportLSHBand.objects.filter(report=report).delete()
+    ReportSimilarity.objects.filter(Q(report=report) | Q(similar=report)).delete()
+
+
+def index(report, text, reuse=None):
+    """Sign a report's text and record its likely near-duplicates; reuse names a report with the same text"""
+    stored = ReportSignature.objects.filter(report_id=reuse).first() if reuse else None
+    if stored is not None:
+        signature, shingle_count = _decode(stored.minhash), stored.shingle_count
+    else:
+        values = shingles(text)
+        signature, shingle_count = (minhash(values) if len(values) >= MIN_SHINGLES else None), len(values)
+
+    with transaction.atomic():
+        forget(report)
+        if signature is None:
+            return []
+        report_buckets = buckets(signature)
+        matches = find_similar(report, signature, report_buckets)
+        ReportSignature.objects.create(report=report, minhash=signature.astype('<u4').tobytes(), shingle_count=shingle_count)
+        ReportLSHBand.objects.bulk_create([
+            ReportLSHBand(report=report, band=band, bucket=bucket) for band, bucket in enumerate(report_buckets)
+        ])
+        ReportSimilarity.objects.bulk_create(
+            [ReportSimilarity(report=report, similar_id=other, score=score) for other, score in matches]
+            + [ReportSimilarity(report_id=other, similar=report, score=score) for other, score in matches]
+        )
+    if matches:
+        logger.info(f"Report {report.pk} resembles reports {[other for other, _ in matches]}")
+    return matches
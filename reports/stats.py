@@ -0,0 +1,78 @@
+"""
+Incrementally maintained statistics for the admin dashboard.
+
+ReportStatsRollup holds report counts per (department, batch, status) and
+EvaluatorStats holds per-evaluator counters. Signal handlers call the
+adjust_* helpers on every change; rebuild() recomputes both from scratch.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import dashboards
+from .models import ProjectReport, Feedback, ReportAssignment, ReportStatsRollup, EvaluatorStats
+
+
+def report_key(report):
+    """Rollup key of a report, read without triggering deferred field loads"""
+    values = report.__dict__
+    return (values.get('department'), values.get('batch'), values.get('status'))
+
+
+def _adjust(model, lookup, deltas):
+    """Add deltas to the counters of the row matching lookup, creating it on increments"""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    with transaction.atomic():
+        if model.objects.filter(**lookup).update(**changes):
+            return
+        if any(delta < 0 for delta in deltas.values()):
+            # Nothing to decrement (e.g. the evaluator row is being cascade-deleted)
+            return
+        row, created = model.objects.get_or_create(defaults=deltas, **lookup)
+        if not created:
+            model.objects.filter(**lookup).update(**changes)
+
+
+def adjust_report_count(key, delta):
+    department, batch, status = key
+    if None in key:
+        return
+    _adjust(ReportStatsRollup, {'department': department, 'batch': batch, 'status': status}, {'count': delta})
+
+
+def adjust_evaluator(evaluator_id, assigned=0, evaluated=0):
+    if evaluator_id is None:
+        return
+    _adjust(EvaluatorStats, {'evaluator_id': evaluator_id}, {'assigned_count': assigned, 'evaluated_count': evaluated})
+
+
+def rebuild():
+    """Recompute all rollups and evaluator counters. Returns (rollup rows, evaluator rows)."""
+    with transaction.atomic():
+        rollups = [
+            ReportStatsRollup(department=row['department'], batch=row['batch'], status=row['status'], count=row['count'])
+            for row in ProjectReport.objects.order_by().values('department', 'batch', 'status').annotate(count=Count('id'))
+        ]
+        assigned = dict(
+            ReportAssignment.objects.filter(is_active=True).order_by().values('evaluator_id')
+            .annotate(count=Count('id')).values_list('evaluator_id', 'count')
+        )
+        evaluated = dict(
+            Feedback.objects.order_by().values('evaluator_id')
+            .annotate(count=Count('id')).values_list('evaluator_id', 'count')
+        )
+        evaluators = [
+            EvaluatorStats(
+                evaluator_id=evaluator_id,
+                assigned_count=assigned.get(evaluator_id, 0),
+                evaluated_count=evaluated.get(evaluator_id, 0),
+            )
+            for evaluator_id in assigned.keys() | evaluated.keys()
+        ]
+        ReportStatsRollup.objects.all().delete()
+        EvaluatorStats.objects.all().delete()
+        ReportStatsRollup.objects.bulk_create(rollups, batch_size=1000)
+        EvaluatorStats.objects.bulk_create(evaluators, batch_size=1000)
+        dashboards.invalidate(dashboards.ADMIN_SCOPE)
+    return len(rollups), len(evaluators)
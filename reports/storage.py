@@ -0,0 +1,36 @@
+"""
+Content-addressed storage for report files.
+
+upload_to_reports names a new upload after its SHA-256
+(reports/ab/cd/<sha256>.<ext>), so identical bytes map to one name and are
+stored once; ReportBlob counts the reports sharing each file. This storage
+keeps those names as they are instead of adding a suffix, and always writes
+through a temporary file renamed into place: an existing file of that name
+may be about to be deleted with its last reference, and concurrent uploads
+of the same content still leave one complete copy.
+"""
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+from . import files
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        if files.is_blob_name(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not files.is_blob_name(name):
+            return super()._save(name, content)
+        partial = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(partial), self.path(name))
+        if os.path.exists(self.path(partial)):
+            # rename() does nothing when both names already link one file, as a
+            # retried upload's left over copy does (see reports.uploads)
+            os.remove(self.path(partial))
+        return name
@@ -1,3 +1,1295 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import numpy as np
+from PIL import Image
+
+from accounts.models import User
+from .models import (
+    ProjectReport,
+    ReportBlob,
+    ReportText,
+    ReportSignature,
+    ReportSimilarity,
+    Feedback,
+    ReportAssignment,
+    EvaluatorStudentAssignment,
+    EvaluatorReportVisibility,
+    ReportStatsRollup,
+    EvaluatorStats,
+    UploadSession,
+)
+from . import assignments, dashboards, delivery, export, extraction, files, search, similarity, stats, thumbnails, uploads, visibility
+from .pagination import CursorPaginator
+
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='report-tests-')
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    REPORT_THUMBNAIL_DIR=os.path.join(MEDIA_ROOT, 'thumbnails'),
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    # Dashboards are recomputed on every request unless a test opts into caching
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+)
+class ReportTestCase(TestCase):
+    """Shared fixtures for report tests"""
+
+    def make_user(self, username, role, **extra):
+        user = User.objects.create_user(username=username, password='pass12345', role=role, **extra)
+        return user
+
+    def make_report(self, student, **extra):
+        fields = {
+            'title': f'Report by {student.username}',
+            'department': 'Computer Science',
+            'batch': '2024',
+            'report_file': SimpleUploadedFile('report.pdf', b'%PDF-1.4 test'),
+        }
+        fields.update(extra)
+        return ProjectReport.objects.create(student=student, **fields)
+
+
+class EvaluatorVisibilityTests(ReportTestCase):
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin')
+        self.evaluator = self.make_user('evaluator', 'evaluator')
+        self.student = self.make_user('student', 'student')
+        self.other_student = self.make_user('other', 'student')
+
+    def visible_ids(self):
+        return set(
+            EvaluatorReportVisibility.objects.filter(evaluator=self.evaluator).values_list('report_id', flat=True)
+        )
+
+    def test_signals_track_assignments_and_mappings(self):
+        mapped_report = self.make_report(self.student)
+        other_report = self.make_report(self.other_student)
+
+        mapping = EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=self.student)
+        self.assertEqual(self.visible_ids(), {mapped_report.id})
+
+        later_report = self.make_report(self.student)
+        assignment = ReportAssignment.objects.create(
+            report=other_report, evaluator=self.evaluator, assigned_by=self.admin
+        )
+        self.assertEqual(self.visible_ids(), {mapped_report.id, later_report.id, other_report.id})
+
+        assignment.is_active = False
+        assignment.save()
+        mapping.delete()
+        self.assertEqual(self.visible_ids(), set())
+
+    def test_rebuild_matches_dashboard(self):
+        report = self.make_report(self.student)
+        EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=self.student)
+        ReportAssignment.objects.create(report=report, evaluator=self.evaluator, assigned_by=self.admin)
+        EvaluatorReportVisibility.objects.all().delete()
+
+        self.assertEqual(visibility.rebuild(), 2)
+        self.client.force_login(self.evaluator)
+        response = self.client.get(reverse('reports:evaluator_dashboard'))
+        self.assertEqual(response.context['total_assigned'], 1)
+        self.assertEqual(list(response.context['assigned_reports']), [report])
+
+
+class ReportListingQueryTests(ReportTestCase):
+    """Listing pages must issue a fixed number of queries regardless of page size"""
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin')
+        self.evaluators = [self.make_user(f'evaluator{i}', 'evaluator') for i in range(2)]
+
+    def add_reports(self, count):
+        for i in range(count):
+            student = self.make_user(f'student{ProjectReport.objects.count()}', 'student')
+            report = self.make_report(student)
+            for evaluator in self.evaluators:
+                ReportAssignment.objects.create(report=report, evaluator=evaluator, assigned_by=self.admin)
+
+    def assert_constant_queries(self, url, user):
+        self.client.force_login(user)
+        for count in (2, 18):
+            self.add_reports(count)
+            with self.assertNumQueries(self.QUERY_BUDGET[url]):
+                response = self.client.get(reverse(url))
+            self.assertEqual(response.status_code, 200)
+
+    QUERY_BUDGET = {
+        'reports:all_reports': 5,
+        'reports:admin_dashboard': 11,
+    }
+
+    def test_all_reports_query_budget(self):
+        self.assert_constant_queries('reports:all_reports', self.admin)
+
+    def test_all_reports_query_budget_for_evaluator(self):
+        self.assert_constant_queries('reports:all_reports', self.evaluators[0])
+
+    def test_admin_dashboard_query_budget(self):
+        self.assert_constant_queries('reports:admin_dashboard', self.admin)
+
+
+class EvaluatorStudentRosterTests(ReportTestCase):
+
+    def setUp(self):
+        self.evaluator = self.make_user('evaluator', 'evaluator')
+        self.students = [self.make_user(f'student{i}', 'student') for i in range(3)]
+        for i, student in enumerate(self.students):
+            EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=student)
+            for _ in range(i):
+                self.make_report(student, status='evaluated')
+        self.make_report(self.students[0])
+        self.client.force_login(self.evaluator)
+
+    def test_roster_annotations_and_sorting(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('reports:evaluator_view_students'), {'sort': '-reports'})
+        roster = list(response.context['page_obj'])
+        self.assertEqual([s.username for s in roster], ['student2', 'student1', 'student0'])
+        self.assertEqual([s.reports_count for s in roster], [2, 1, 1])
+        self.assertEqual([s.evaluated_count for s in roster], [2, 1, 0])
+        self.assertIsNotNone(roster[0].latest_submission)
+
+    def test_unknown_sort_falls_back_to_default(self):
+        response = self.client.get(reverse('reports:evaluator_view_students'), {'sort': 'password'})
+        self.assertEqual(response.context['sort'], '-date_joined')
+
+
+class StatsRollupTests(ReportTestCase):
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin')
+        self.evaluator = self.make_user('evaluator', 'evaluator')
+        self.student = self.make_user('student', 'student')
+
+    def snapshot(self):
+        return (
+            set(ReportStatsRollup.objects.filter(count__gt=0).values_list('department', 'batch', 'status', 'count')),
+            set(EvaluatorStats.objects.values_list('evaluator_id', 'assigned_count', 'evaluated_count')),
+        )
+
+    def test_signals_match_rebuild(self):
+        report = self.make_report(self.student)
+        self.make_report(self.student, department='Civil')
+        assignment = ReportAssignment.objects.create(report=report, evaluator=self.evaluator, assigned_by=self.admin)
+        Feedback.objects.create(report=report, evaluator=self.evaluator, comments='Good', grade=80)
+        report.status = 'evaluated'
+        report.save()
+        assignment.is_active = False
+        assignment.save()
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental, (
+            {('Computer Science', '2024', 'evaluated', 1), ('Civil', '2024', 'submitted', 1)},
+            {(self.evaluator.id, 0, 1)},
+        ))
+        stats.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_dashboard_reads_rollups(self):
+        self.make_report(self.student)
+        self.make_report(self.student)
+        ProjectReport.objects.first().delete()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('reports:admin_dashboard'))
+        self.assertEqual(response.context['total_reports'], 1)
+        self.assertEqual(list(response.context['dept_stats']), [{'department': 'Computer Science', 'count': 1}])
+
+
+class BulkAssignmentTests(ReportTestCase):
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin')
+        self.evaluator = self.make_user('evaluator', 'evaluator', department='Computer Science')
+        self.students = [self.make_user(f'student{i}', 'student') for i in range(3)]
+
+    def derived_state(self):
+        return (
+            set(EvaluatorReportVisibility.objects.values_list('evaluator_id', 'report_id', 'source')),
+            set(EvaluatorStats.objects.values_list('evaluator_id', 'assigned_count', 'evaluated_count')),
+        )
+
+    def assert_derived_tables_match_rebuild(self):
+        incremental = self.derived_state()
+        visibility.rebuild()
+        stats.rebuild()
+        self.assertEqual(self.derived_state(), incremental)
+
+    def test_assign_students_counts(self):
+        for student in self.students:
+            self.make_report(student)
+        EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=self.students[0])
+        EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=self.students[1], is_active=False)
+
+        with self.assertNumQueries(9):
+            result = assignments.assign_students(self.evaluator, self.students, assigned_by=self.admin)
+        self.assertEqual((result.created, result.reactivated, result.skipped), (1, 1, 1))
+        self.assertEqual(EvaluatorStudentAssignment.objects.filter(is_active=True).count(), 3)
+        self.assertEqual(EvaluatorReportVisibility.objects.count(), 3)
+        self.assert_derived_tables_match_rebuild()
+
+    def test_concurrent_inserts_are_not_counted(self):
+        reports = [self.make_report(student) for student in self.students]
+        diff = assignments._diff
+
+        def racing_diff(*args):
+            result = diff(*args)
+            if not ReportAssignment.objects.exists():
+                # Another request assigns the first report between the read and the insert
+                ReportAssignment.objects.create(report=reports[0], evaluator=self.evaluator, assigned_by=self.admin)
+            return result
+
+        with mock.patch('reports.assignments._diff', side_effect=racing_diff):
+            result = assignments.assign_report_pairs(
+                [(self.evaluator.id, report.id) for report in reports], assigned_by=self.admin
+            )
+        self.assertEqual((result.created, result.skipped), (2, 1))
+        self.assertEqual(EvaluatorStats.objects.get(evaluator=self.evaluator).assigned_count, 3)
+        self.assert_derived_tables_match_rebuild()
+
+    def test_auto_assign_prefers_mappings_over_department(self):
+        department_evaluator = self.make_user('dept', 'evaluator', department='Computer Science')
+        EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=self.students[0])
+        mapped = self.make_report(self.students[0])
+        unmapped = self.make_report(self.students[1])
+
+        result = assignments.auto_assign_reports([mapped, unmapped], assigned_by=self.admin)
+        self.assertEqual((result.created, result.skipped), (3, 0))
+        self.assertEqual(
+            set(ReportAssignment.objects.values_list('report_id', 'evaluator_id')),
+            {(mapped.id, self.evaluator.id), (unmapped.id, self.evaluator.id), (unmapped.id, department_evaluator.id)},
+        )
+        self.assertEqual(assignments.auto_assign_reports([mapped], assigned_by=self.admin).skipped, 1)
+        self.assert_derived_tables_match_rebuild()
+
+
+class ReportSearchTests(ReportTestCase):
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin', is_staff=True, is_superuser=True)
+        self.student = self.make_user('jdoe', 'student', first_name='Jane', last_name='Doe')
+        self.other = self.make_user('asmith', 'student', first_name='Alan', last_name='Smith')
+        self.robotics = self.make_report(self.other, title='Robotics arm controller', description='Servo kinematics')
+        self.mention = self.make_report(self.student, title='Compiler design', description='Notes on robotics')
+
+    def test_ranked_prefix_search(self):
+        self.assertEqual(search.search('robot').report_ids, [self.robotics.id, self.mention.id])
+        self.assertEqual(search.search('jan').report_ids, [self.mention.id])
+        self.assertEqual(search.search('smith kinemat').report_ids, [self.robotics.id])
+        self.assertEqual(search.search('').report_ids, [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.student.last_name = 'Roe'
+        self.student.save()
+        self.assertEqual(search.search('roe').report_ids, [self.mention.id])
+        self.robotics.delete()
+        self.assertEqual(search.search('robot').report_ids, [self.mention.id])
+
+    def test_all_reports_student_filter_uses_index(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('reports:all_reports'), {'student': 'doe'})
+        self.assertEqual(list(response.context['page_obj']), [self.mention])
+        response = self.client.get(reverse('admin:reports_projectreport_changelist'), {'q': 'robotics'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.robotics, self.mention])
+
+    @override_settings(REPORT_SEARCH_LIMIT=1)
+    def test_filter_keeps_matches_past_the_hit_limit(self):
+        self.assertEqual(len(search.search('robot').report_ids), 1)
+        with self.assertNumQueries(0):
+            reports = search.filter_reports(ProjectReport.objects.order_by('id'), 'robot')
+        self.assertEqual(list(reports), [self.robotics, self.mention])
+        self.assertEqual(list(search.filter_reports(ProjectReport.objects.all(), 'nothing')), [])
+        with mock.patch('reports.search.get_backend', return_value=search.SearchBackend()):
+            self.assertEqual(list(search.filter_reports(ProjectReport.objects.order_by('id'), 'robot')),
+                             [self.robotics, self.mention])
+
+    def test_admin_search_falls_back_when_over_budget(self):
+        self.client.force_login(self.admin)
+        with mock.patch('reports.search.search', return_value=search.SearchResult(timed_out=True)):
+            response = self.client.get(reverse('admin:reports_projectreport_changelist'), {'q': 'robotics'})
+        self.assertEqual(set(response.context['cl'].result_list), {self.robotics, self.mention})
+
+    def test_admin_search_without_matches(self):
+        self.client.force_login(self.admin)
+        for query in ('zzzzz', '---', 'a b c'):
+            response = self.client.get(reverse('admin:reports_projectreport_changelist'), {'q': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['cl'].result_list), [])
+
+
+class CursorPaginationTests(ReportTestCase):
+
+    def setUp(self):
+        student = self.make_user('student', 'student')
+        for i in range(7):
+            self.make_report(student, title=f'Report {i}')
+        # Ties on submitted_at must be broken by id
+        first = ProjectReport.objects.order_by('id').first()
+        ProjectReport.objects.filter(id__lte=first.id + 3).update(submitted_at=first.submitted_at)
+        self.expected = list(ProjectReport.objects.order_by('-submitted_at', '-id'))
+
+    def walk(self, paginator, cursor, direction):
+        pages = []
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(list(page))
+            cursor = page.next_cursor if direction == 'next' else page.previous_cursor
+            if cursor is None:
+                return pages
+
+    def test_walk_forward_and_back(self):
+        paginator = CursorPaginator(ProjectReport.objects.all(), per_page=3)
+        forward = self.walk(paginator, None, 'next')
+        self.assertEqual([len(page) for page in forward], [3, 3, 1])
+        self.assertEqual(sum(forward, []), self.expected)
+        backward = self.walk(paginator, paginator.get_page().last_cursor, 'previous')
+        self.assertEqual(sum(reversed(backward), []), self.expected)
+
+    def test_count_is_capped_and_bad_cursor_restarts(self):
+        paginator = CursorPaginator(ProjectReport.objects.all(), per_page=3, count_limit=5)
+        self.assertEqual((paginator.count, paginator.count_truncated), (5, True))
+        page = paginator.get_page('not-a-cursor')
+        self.assertEqual(list(page), self.expected[:3])
+        self.assertFalse(page.has_previous())
+
+    def test_user_management_pages(self):
+        admin = self.make_user('admin', 'admin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('reports:user_management'), {'role': 'student'})
+        self.assertEqual(list(response.context['page_obj']), [User.objects.get(username='student')])
+        self.assertEqual(response.context['filter_query'], 'role=student')
+
+
+class FileMetadataTests(ReportTestCase):
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin', is_staff=True, is_superuser=True)
+        self.student = self.make_user('student', 'student')
+        self.report = self.make_report(self.student)
+
+    def test_metadata_recorded_at_upload(self):
+        self.assertEqual(self.report.size_bytes, len(b'%PDF-1.4 test'))
+        self.assertEqual(self.report.sha256, hashlib.sha256(b'%PDF-1.4 test').hexdigest())
+        self.assertEqual(self.report.content_type, 'application/pdf')
+
+        self.client.force_login(self.admin)
+        with mock.patch.object(FileSystemStorage, 'size', side_effect=AssertionError('storage stat')):
+            response = self.client.get(reverse('admin:reports_projectreport_changelist'))
+        self.assertContains(response, '0.0 KB')
+
+    def test_backfill_command(self):
+        ProjectReport.objects.update(size_bytes=None, sha256='', content_type='')
+        call_command('backfill_file_metadata', stdout=io.StringIO())
+        self.report.refresh_from_db()
+        self.assertEqual(
+            (self.report.size_bytes, self.report.sha256, self.report.content_type),
+            (13, hashlib.sha256(b'%PDF-1.4 test').hexdigest(), 'application/pdf'),
+        )
+
+
+class ShardedLayoutTests(ReportTestCase):
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student')
+
+    def make_legacy_report(self, name):
+        """A report as stored before sharding and content addressing"""
+        content = f'%PDF-1.4 {name}'.encode()
+        report = self.make_report(self.student, report_file=SimpleUploadedFile('report.pdf', content))
+        ReportBlob.objects.all().delete()
+        source = report.report_file.path
+        report.report_file.name = name
+        os.makedirs(os.path.dirname(report.report_file.path), exist_ok=True)
+        os.replace(source, report.report_file.path)
+        ProjectReport.objects.filter(pk=report.pk).update(report_file=name, uuid_name=os.path.basename(name))
+        return report, content
+
+    def test_uploads_are_sharded(self):
+        report = self.make_report(self.student)
+        self.assertRegex(report.report_file.name, files.SHARDED_NAME_RE)
+        self.assertEqual(report.report_file.name, f'reports/{report.sha256[:2]}/{report.sha256[2:4]}/{report.uuid_name}')
+
+    def test_move_command_is_resumable(self):
+        flat = self.make_legacy_report('reports/0b5ef4b6-9a53-4c1e-a0b8-3c6b0dd1ab2f.pdf')
+        legacy = self.make_legacy_report('reports/None/b1/report.pdf')
+        # An earlier run moved this file but stopped before updating the row
+        interrupted, content = self.make_legacy_report('reports/5f0e1cc3-2f39-4c8e-9d8a-6e1b9e3f7a10.pdf')
+        target = os.path.join(MEDIA_ROOT, files.resharded_name(interrupted.report_file.name))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(interrupted.report_file.path, target)
+
+        call_command('shard_report_files', workers=2, batch_size=2, stdout=io.StringIO())
+
+        for report, content in (flat, legacy, (interrupted, content)):
+            report.refresh_from_db()
+            self.assertRegex(report.report_file.name, files.SHARDED_NAME_RE)
+            self.assertEqual(report.uuid_name, os.path.basename(report.report_file.name))
+            with report.report_file.open('rb') as stored:
+                self.assertEqual(stored.read(), content)
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, 'reports', 'None')))
+
+        with self.assertNumQueries(1):
+            call_command('shard_report_files', stdout=io.StringIO())
+
+
+class ContentAddressedStorageTests(ReportTestCase):
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student')
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, name), MEDIA_ROOT)
+            for path, dirs, names in os.walk(os.path.join(MEDIA_ROOT, 'reports')) for name in names
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.make_report(self.student)
+        with mock.patch.object(FileSystemStorage, '_save', side_effect=AssertionError('stored twice')):
+            second = self.make_report(self.student, report_file=SimpleUploadedFile('copy.pdf', b'%PDF-1.4 test'))
+        other = self.make_report(self.student, report_file=SimpleUploadedFile('other.pdf', b'%PDF-1.4 other'))
+
+        self.assertEqual(first.report_file.name, second.report_file.name)
+        self.assertEqual(self.stored_files(), sorted([first.report_file.name, other.report_file.name]))
+        self.assertEqual(ReportBlob.objects.get(sha256=first.sha256).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(ReportBlob.objects.get(sha256=first.sha256).ref_count, 1)
+        with second.report_file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1.4 test')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(ReportBlob.objects.filter(sha256=first.sha256).exists())
+        self.assertEqual(self.stored_files(), [other.report_file.name])
+
+    def test_reupload_before_pending_delete_keeps_the_file(self):
+        first = self.make_report(self.student)
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        # The same bytes arrive before the deletion of the last reference has run
+        again = self.make_report(self.student, report_file=SimpleUploadedFile('again.pdf', b'%PDF-1.4 test'))
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(ReportBlob.objects.get(sha256=again.sha256).ref_count, 1)
+        with again.report_file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1.4 test')
+        self.addCleanup(os.remove, again.report_file.path)
+
+    def test_upload_rewrites_an_unreferenced_file(self):
+        first = self.make_report(self.student)
+        name = first.report_file.name
+        ProjectReport.objects.filter(pk=first.pk).delete()
+        ReportBlob.objects.all().delete()
+        # A leftover copy that a pending deletion is about to remove, or a damaged one
+        with open(os.path.join(MEDIA_ROOT, name), 'wb') as leftover:
+            leftover.write(b'damaged')
+
+        again = self.make_report(self.student)
+        self.assertEqual(again.report_file.name, name)
+        with again.report_file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1.4 test')
+        self.assertFalse([path for path in self.stored_files() if path.startswith(f'{name}.')])
+        self.addCleanup(os.remove, again.report_file.path)
+
+    def test_dedupe_command_adopts_existing_files(self):
+        reports = [self.make_report(self.student) for _ in range(3)]
+        ReportBlob.objects.all().delete()
+        # As uploaded before content addressing: one copy per report
+        shared = reports[0].report_file.path
+        for index, report in enumerate(reports):
+            name = f'reports/legacy-{index}.pdf'
+            shutil.copy(shared, os.path.join(MEDIA_ROOT, name))
+            ProjectReport.objects.filter(pk=report.pk).update(report_file=name)
+        os.remove(shared)
+
+        call_command('dedupe_report_files', stdout=io.StringIO())
+
+        blob = ReportBlob.objects.get()
+        self.assertEqual(blob.ref_count, 3)
+        self.assertEqual(set(ProjectReport.objects.values_list('report_file', flat=True)), {blob.name})
+        self.assertEqual(self.stored_files(), [blob.name])
+
+
+class MediaGarbageCollectionTests(ReportTestCase):
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student')
+        self.report = self.make_report(self.student)
+        self.orphan = os.path.join(MEDIA_ROOT, 'reports', 'None', 'b1', 'orphan.pdf')
+        self.recent = os.path.join(MEDIA_ROOT, 'reports', 'recent.pdf')
+        for path in (self.orphan, self.recent):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'orphaned')
+        # Older than --min-age
+        for path in (self.report.report_file.path, self.orphan):
+            os.utime(path, (0, 0))
+
+    def tearDown(self):
+        for path in (self.orphan, self.recent):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_dry_run_reports_without_changes(self):
+        out = io.StringIO()
+        call_command('gc_media', stdout=out)
+        self.assertIn('orphan: reports/None/b1/orphan.pdf', out.getvalue())
+        self.assertNotIn('recent.pdf', out.getvalue())
+        self.assertTrue(os.path.exists(self.orphan))
+
+    def test_apply_deletes_orphans_and_flags_missing_files(self):
+        missing = self.make_report(self.student, report_file=SimpleUploadedFile('gone.pdf', b'%PDF-1.4 gone'))
+        os.remove(missing.report_file.path)
+
+        call_command('gc_media', apply=True, workers=2, batch_size=2, stdout=io.StringIO())
+
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, 'reports', 'None')))
+        self.assertTrue(os.path.exists(self.recent))
+        self.assertTrue(os.path.exists(self.report.report_file.path))
+        self.assertEqual(list(ProjectReport.objects.filter(file_missing=True)), [missing])
+
+    def test_quarantined_reports_are_not_served(self):
+        admin = self.make_user('admin', 'admin')
+        ProjectReport.objects.filter(pk=self.report.pk).update(file_missing=True)
+        self.client.force_login(admin)
+
+        for name in ('view_report', 'download_report'):
+            response = self.client.get(reverse(f'reports:{name}', args=[self.report.id]))
+            self.assertEqual(response.status_code, 404)
+        with mock.patch('reports.thumbnails.schedule') as schedule:
+            response = self.client.get(reverse('reports:report_thumbnail', args=[self.report.id]))
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        schedule.assert_not_called()
+        self.assertContains(self.client.get(reverse('reports:all_reports')), 'The stored file could not be found')
+        self.assertNotContains(
+            self.client.get(reverse('reports:all_reports')), reverse('reports:view_report', args=[self.report.id])
+        )
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(export.stream(ProjectReport.objects.all())))) as archive:
+            self.assertEqual(archive.namelist(), [export.MANIFEST_NAME])
+            manifest = list(csv.DictReader(io.TextIOWrapper(archive.open(export.MANIFEST_NAME), encoding='utf-8')))
+        self.assertEqual([row['included'] for row in manifest], ['no'])
+
+
+def docx_bytes(*paragraphs, pages=None):
+    """A minimal DOCX document with the given paragraphs"""
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        # Fixed timestamps so the same paragraphs always give the same bytes
+        archive.writestr(zipfile.ZipInfo('[Content_Types].xml', date_time=(2024, 1, 1, 0, 0, 0)), (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>'
+        ))
+        archive.writestr(zipfile.ZipInfo('word/document.xml', date_time=(2024, 1, 1, 0, 0, 0)), (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>'
+        ))
+        if pages:
+            archive.writestr(zipfile.ZipInfo('docProps/app.xml', date_time=(2024, 1, 1, 0, 0, 0)), (
+                '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+                f'<Pages>{pages}</Pages></Properties>'
+            ))
+    return buffer.getvalue()
+
+
+class TextExtractionTests(ReportTestCase):
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student')
+
+    def upload(self, name, content):
+        return self.make_report(self.student, report_file=SimpleUploadedFile(name, content), original_filename=name)
+
+    def test_docx_and_xlsx_text_is_extracted_and_searchable(self):
+        from openpyxl import Workbook
+
+        document = self.upload('thesis.docx', docx_bytes('Photosynthesis in maize', 'Second paragraph', pages=3))
+        workbook = Workbook()
+        workbook.active.append(['Yield', 42])
+        workbook.create_sheet().append(['Rainfall'])
+        spreadsheet = io.BytesIO()
+        workbook.save(spreadsheet)
+        sheet = self.upload('data.xlsx', spreadsheet.getvalue())
+        self.assertEqual(ReportText.objects.get(report=document).status, 'pending')
+
+        self.assertEqual(extraction.process(workers=2), (2, 0))
+
+        text = ReportText.objects.get(report=document)
+        self.assertEqual((text.status, text.page_count, text.word_count), ('done', 3, 5))
+        self.assertIn('Photosynthesis in maize', text.text)
+        text = ReportText.objects.get(report=sheet)
+        self.assertEqual((text.page_count, text.word_count), (2, 3))
+        self.assertEqual(search.search('photosynthesis').report_ids, [document.id])
+        self.assertEqual(search.search('rainfall').report_ids, [sheet.id])
+
+        evaluator = self.make_user('evaluator', 'evaluator')
+        self.client.force_login(evaluator)
+        response = self.client.get(reverse('reports:report_detail', args=[document.id]))
+        self.assertContains(response, '3 pages &middot; 5 words')
+        self.assertContains(response, 'Photosynthesis in maize')
+
+        # Identical bytes reuse the stored text instead of extracting again
+        copy = self.upload('copy.docx', docx_bytes('Photosynthesis in maize', 'Second paragraph', pages=3))
+        self.assertEqual(ReportText.objects.get(report=copy).status, 'done')
+        self.assertEqual(extraction.claim(), [])
+
+    def test_failures_are_retried_then_given_up(self):
+        report = self.upload('broken.docx', b'PK\x03\x04 not really a zip')
+        self.assertEqual(extraction.process(), (0, 1))
+        text = ReportText.objects.get(report=report)
+        self.assertEqual(text.status, 'pending')
+        self.assertIn('zip', text.error.lower())
+
+        ReportText.objects.filter(report=report).update(attempts=extraction.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        self.assertEqual(extraction.process(), (0, 1))
+        self.assertEqual(ReportText.objects.get(report=report).status, 'failed')
+
+
+@override_settings(REPORT_THUMBNAIL_FORMAT='webp')
+class ThumbnailTests(ReportTestCase):
+
+    def setUp(self):
+        # Other tests' extractions pre-render into the same cache
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'thumbnails'), ignore_errors=True)
+        self.student = self.make_user('student', 'student')
+        self.report = self.make_report(self.student, title='Crop yields')
+        self.url = reverse('reports:report_thumbnail', args=[self.report.id])
+        self.client.force_login(self.student)
+
+    def tearDown(self):
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'thumbnails'), ignore_errors=True)
+
+    def test_miss_renders_in_background_then_hit_is_cacheable(self):
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        source = schedule.call_args.args[0]
+        self.assertEqual(source.key, thumbnails.cache_key(self.report))
+
+        thumbnails.store(source)
+        versioned = f'{self.url}?v={thumbnails.version(self.report)}'
+        response = self.client.get(versioned)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        image = Image.open(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (thumbnails.WIDTH, thumbnails.HEIGHT))
+        self.assertEqual(self.client.get(versioned, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.client.force_login(self.make_user('other', 'student'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_pdf_cover_image_is_used(self):
+        cover = io.BytesIO()
+        Image.new('RGB', (600, 400), (10, 120, 200)).save(cover, 'PDF')
+        report = self.make_report(self.student, report_file=SimpleUploadedFile('cover.pdf', cover.getvalue()))
+        image = thumbnails.render(thumbnails.source_for(report))
+        self.assertEqual(image.size, (240, 160))
+        # Pillow embeds the image as JPEG, so colours are close rather than exact
+        for channel, expected in zip(image.getpixel((120, 80)), (10, 120, 200)):
+            self.assertAlmostEqual(channel, expected, delta=3)
+
+    @override_settings(REPORT_EXTRACTION_TIMEOUT=30, REPORT_EXTRACTION_MEMORY_MB=512)
+    def test_pdf_cover_is_read_in_a_limited_child_process(self):
+        cover = io.BytesIO()
+        Image.new('RGB', (600, 400), (10, 120, 200)).save(cover, 'PDF')
+        report = self.make_report(self.student, report_file=SimpleUploadedFile('slow.pdf', cover.getvalue()))
+        source = thumbnails.source_for(report)
+        with mock.patch('reports.extraction.subprocess.run', side_effect=extraction.subprocess.TimeoutExpired('', 30)) as run:
+            image = thumbnails.render(source)
+        command = run.call_args.args[0]
+        self.assertEqual(command[2:], ['reports.extractors', '512', '31', 'cover', source.path, '240', '339'])
+        self.assertEqual(run.call_args.kwargs['timeout'], 30)
+        # The timed out cover falls back to the card
+        self.assertEqual(image.size, (thumbnails.WIDTH, thumbnails.HEIGHT))
+
+    def test_least_recently_used_thumbnails_are_evicted(self):
+        paths = []
+        for index in range(4):
+            path = thumbnails.cache_path(f'{index:02d}' * 32 + '-240.webp')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(path, (index, index))
+            paths.append(path)
+        # A hit makes the oldest thumbnail the most recently used
+        thumbnails.cached(os.path.basename(paths[0]))
+
+        self.assertEqual(thumbnails.evict(limit_bytes=250), 2)
+        self.assertEqual([os.path.exists(path) for path in paths], [True, False, False, True])
+
+
+class ReportDeliveryTests(ReportTestCase):
+
+    CONTENT = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student')
+        self.other = self.make_user('other', 'student')
+        self.report = self.make_report(
+            self.student, report_file=SimpleUploadedFile('report.pdf', self.CONTENT), original_filename='My Report.pdf'
+        )
+        self.client.force_login(self.student)
+        self.url = reverse('reports:view_report', args=[self.report.id])
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_response_and_revalidation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.CONTENT)
+        self.assertEqual(response['ETag'], f'"{self.report.sha256}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_single_and_suffix_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-14')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 5-14/{len(self.CONTENT)}')
+        self.assertEqual(self.body(response), self.CONTENT[5:15])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(self.body(response), self.CONTENT[-4:])
+
+        # A stale If-Range gets the whole, current file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_multiple_and_unsatisfiable_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3, 100-101')
+        self.assertEqual(response.status_code, 206)
+        body = self.body(response)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        boundary = response['Content-Type'].split('boundary=')[1]
+        parts = body.split(f'--{boundary}'.encode())[1:-1]
+        self.assertEqual([part.split(b'\r\n\r\n', 1)[1][:-2] for part in parts], [self.CONTENT[:4], self.CONTENT[100:102]])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_ranges_of_an_empty_file_are_unsatisfiable(self):
+        for header in ('bytes=-500', 'bytes=0-', 'bytes=0-0'):
+            self.assertEqual(delivery.parse_ranges(header, 0), [])
+
+    def test_access_checks_still_apply(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        download = self.client.get(reverse('reports:download_report', args=[self.report.id]), HTTP_RANGE='bytes=0-1')
+        self.assertEqual(download.status_code, 403)
+
+    @override_settings(REPORT_FILE_DELIVERY='x-accel-redirect', REPORT_FILE_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect_offload(self):
+        response = self.client.get(reverse('reports:download_report', args=[self.report.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.report.report_file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], f'"{self.report.sha256}"')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        self.client.force_login(self.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+
+    @override_settings(REPORT_FILE_DELIVERY='sendfile')
+    def test_sendfile_range_is_bounded_file(self):
+        # The test client rewraps streaming content, so call the backend directly
+        request = RequestFactory().get(self.url, HTTP_RANGE='bytes=5-14')
+        response = delivery.serve(request, self.report)
+        self.assertEqual(response.status_code, 206)
+        self.assertIsInstance(response.file_to_stream, delivery.FileSlice)
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.body(response), self.CONTENT[5:15])
+        response.close()
+
+
+class ReportExportTests(ReportTestCase):
+
+    def setUp(self):
+        self.admin = self.make_user('admin', 'admin')
+        self.evaluator = self.make_user('evaluator', 'evaluator')
+        self.student = self.make_user('student', 'student', first_name='Ada', last_name='Lovelace')
+        self.graded = self.make_report(
+            self.student, title='Graded', report_file=SimpleUploadedFile('graded.pdf', b'%PDF-1.4 graded'),
+            original_filename='Final Report.pdf',
+        )
+        self.other = self.make_report(
+            self.student, title='Other', department='Civil', report_file=SimpleUploadedFile('other.pdf', b'%PDF-1.4 other'),
+        )
+        ReportAssignment.objects.create(report=self.graded, evaluator=self.evaluator, assigned_by=self.admin)
+        Feedback.objects.create(report=self.graded, evaluator=self.evaluator, comments='Good', grade=80, max_grade=100)
+        self.url = reverse('reports:export_reports')
+
+    def archive(self, response):
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('attachment', response['Content-Disposition'])
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def manifest(self, archive):
+        return list(csv.DictReader(io.StringIO(archive.read('manifest.csv').decode())))
+
+    def test_admin_export_applies_filters(self):
+        self.client.force_login(self.admin)
+        archive = self.archive(self.client.get(self.url, {'department': 'Computer Science'}))
+        path = f'Computer_Science/2024/{self.graded.id}-Final_Report.pdf'
+        self.assertEqual(archive.namelist(), [path, 'manifest.csv'])
+        self.assertEqual(archive.read(path), b'%PDF-1.4 graded')
+        self.assertIsNone(archive.testzip())
+
+        [row] = self.manifest(archive)
+        self.assertEqual(row['path'], path)
+        self.assertEqual(row['student_name'], 'Ada Lovelace')
+        self.assertEqual(row['evaluators'], 'evaluator')
+        self.assertEqual(row['grades'], 'evaluator: 80.00/100.00')
+        self.assertEqual(row['average_grade_percent'], '80.00')
+        self.assertEqual(row['included'], 'yes')
+
+    def test_evaluators_export_only_assigned_reports(self):
+        self.client.force_login(self.evaluator)
+        archive = self.archive(self.client.get(self.url))
+        self.assertEqual([row['title'] for row in self.manifest(archive)], ['Graded'])
+
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_missing_files_are_listed_not_included(self):
+        os.remove(self.other.report_file.path)
+        self.client.force_login(self.admin)
+        archive = self.archive(self.client.get(self.url))
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertEqual({row['title']: row['included'] for row in self.manifest(archive)}, {'Graded': 'yes', 'Other': 'no'})
+
+    def test_stream_holds_one_chunk_at_a_time(self):
+        content = b'%PDF-1.4 ' + os.urandom(export.CHUNK_SIZE * 3)
+        self.make_report(self.student, report_file=SimpleUploadedFile('large.pdf', content))
+        chunks = list(export.stream(ProjectReport.objects.all()))
+        self.assertLess(max(len(chunk) for chunk in chunks), export.CHUNK_SIZE + 1024)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertIn(content, [archive.read(name) for name in archive.namelist()])
+
+    def test_command_writes_archive(self):
+        output = os.path.join(MEDIA_ROOT, 'export.zip')
+        call_command('export_reports', output, evaluator='evaluator', stdout=io.StringIO())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(len(archive.namelist()), 2)
+        os.remove(output)
+
+
+def essay(seed, words=400):
+    """Deterministic pseudo-random text"""
+    generator = random.Random(seed)
+    vocabulary = [f'term{n}' for n in range(2000)]
+    return ' '.join(generator.choice(vocabulary) for _ in range(words))
+
+
+def reworded(text, changes, seed=0):
+    """text with some words replaced"""
+    generator = random.Random(seed)
+    words = text.split()
+    for position in generator.sample(range(len(words)), changes):
+        words[position] = f'changed{position}'
+    return ' '.join(words)
+
+
+class SimilarityTests(ReportTestCase):
+
+    def setUp(self):
+        self.alice = self.make_user('alice', 'student')
+        self.bob = self.make_user('bob', 'student')
+        self.carol = self.make_user('carol', 'student')
+
+    def report_with_text(self, student, text):
+        report = self.make_report(student, report_file=SimpleUploadedFile('r.pdf', f'%PDF-1.4 {text}'.encode()))
+        ReportText.objects.update_or_create(report=report, defaults={'status': 'done', 'text': text})
+        report.refresh_from_db()
+        return report
+
+    def test_estimate_tracks_jaccard_similarity(self):
+        original = essay(1)
+        for changes in (5, 20, 60):
+            copy = reworded(original, changes)
+            first, second = similarity.shingles(original), similarity.shingles(copy)
+            jaccard = len(np.intersect1d(first, second)) / len(np.union1d(first, second))
+            estimated = similarity.estimate(similarity.minhash(first), similarity.minhash(second)[None, :])[0]
+            self.assertAlmostEqual(estimated, jaccard, delta=0.15)
+
+    def test_near_duplicates_of_other_students_are_flagged(self):
+        original = self.report_with_text(self.alice, essay(1))
+        unrelated = self.report_with_text(self.carol, essay(2))
+        own_draft = self.report_with_text(self.alice, reworded(essay(1), 5))
+        for report in (original, unrelated, own_draft):
+            self.assertEqual(similarity.index(report, report.extracted_text.text), [])
+
+        copy = self.report_with_text(self.bob, reworded(essay(1), 10))
+        matches = similarity.index(copy, copy.extracted_text.text)
+        self.assertEqual(sorted(report_id for report_id, _ in matches), sorted([original.id, own_draft.id]))
+        self.assertTrue(all(score > 0.6 for _, score in matches))
+        self.assertTrue(ReportSimilarity.objects.filter(report=original, similar=copy).exists())
+
+        # A new file replaces the old matches
+        similarity.forget(copy)
+        self.assertFalse(ReportSimilarity.objects.filter(similar=copy).exists())
+
+    def test_extraction_checks_new_uploads_and_detail_shows_matches(self):
+        text = essay(3)
+        first = self.make_report(self.alice, report_file=SimpleUploadedFile('a.docx', docx_bytes(text)))
+        second = self.make_report(self.bob, report_file=SimpleUploadedFile('b.docx', docx_bytes(reworded(text, 8))))
+        extraction.process()
+        # Identical bytes reuse the stored signature
+        third = self.make_report(self.carol, report_file=SimpleUploadedFile('c.docx', docx_bytes(text)))
+        self.assertEqual(ReportSignature.objects.count(), 3)
+        self.assertEqual(
+            set(ReportSimilarity.objects.filter(report=first).values_list('similar_id', flat=True)), {second.id, third.id}
+        )
+
+        evaluator = self.make_user('evaluator', 'evaluator')
+        self.client.force_login(evaluator)
+        response = self.client.get(reverse('reports:report_detail', args=[first.id]))
+        self.assertContains(response, 'Reports by other students')
+        self.assertContains(response, reverse('reports:report_detail', args=[second.id]))
+        self.client.force_login(self.alice)
+        self.assertNotContains(self.client.get(reverse('reports:report_detail', args=[first.id])), 'Reports by other students')
+
+    def test_backfill_command(self):
+        first = self.report_with_text(self.alice, essay(4))
+        second = self.report_with_text(self.bob, reworded(essay(4), 3))
+        out = io.StringIO()
+        call_command('index_similarity', stdout=out)
+        self.assertIn('Signed 2 reports; found 1', out.getvalue())
+        self.assertEqual(ReportSimilarity.objects.get(report=second).similar, first)
+
+
+@override_settings(REPORT_MAX_UPLOAD_MB=3, REPORT_UPLOAD_CHUNK_MB=1)
+class ChunkedUploadTests(ReportTestCase):
+
+    CONTENT = b'%PDF-1.4 ' + bytes(range(256)) * 10000
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student', department='Civil', batch='2025')
+        self.client.force_login(self.student)
+
+    def start(self, size=len(CONTENT), filename='Thesis.pdf'):
+        return self.client.post(reverse('reports:upload_start'), {'filename': filename, 'size': size})
+
+    def put(self, upload, offset, chunk, checksum=None):
+        return self.client.put(
+            upload['chunk_url'], chunk, content_type='application/octet-stream',
+            HTTP_X_UPLOAD_OFFSET=str(offset), HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def test_upload_in_chunks_and_complete(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        upload = response.json()
+        size = upload['chunk_size']
+        for offset in range(0, len(self.CONTENT), size):
+            response = self.put(upload, offset, self.CONTENT[offset:offset + size])
+            self.assertEqual(response.json()['received'], min(offset + size, len(self.CONTENT)))
+        self.assertEqual(self.client.get(upload['chunk_url']).json()['received'], len(self.CONTENT))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(upload['complete_url'], {'title': 'Thesis', 'department': 'Civil', 'batch': '2025'})
+        self.assertEqual(response.status_code, 200)
+        report = ProjectReport.objects.get(id=response.json()['report'])
+        self.addCleanup(os.remove, report.report_file.path)
+        self.assertEqual(report.sha256, hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual((report.original_filename, report.size_bytes), ('Thesis.pdf', len(self.CONTENT)))
+        with report.report_file.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, uploads.UPLOADS_DIR, f"{upload['id']}.part")))
+
+    def test_bad_chunks_are_rejected_and_upload_resumes(self):
+        upload = self.start().json()
+        chunk = self.CONTENT[:1000]
+        self.assertEqual(self.put(upload, 0, chunk, checksum='0' * 64).status_code, 422)
+        session = UploadSession.objects.get()
+        self.assertEqual(session.received_bytes, 0)
+        self.assertEqual(os.path.getsize(uploads.part_path(session)), 0)
+
+        self.assertEqual(self.put(upload, 0, chunk).status_code, 200)
+        # A repeated chunk is not appended twice; the client learns where to resume
+        response = self.put(upload, 0, chunk)
+        self.assertEqual((response.status_code, response.json()['received']), (409, 1000))
+        self.assertEqual(self.put(upload, 1000, b'x' * (upload['chunk_size'] + 1)).status_code, 413)
+        self.assertEqual(os.path.getsize(uploads.part_path(session)), 1000)
+
+        # Not finished yet
+        response = self.client.post(upload['complete_url'], {'title': 'Thesis', 'department': 'Civil', 'batch': '2025'})
+        self.assertEqual(response.status_code, 409)
+
+        other = self.make_user('other', 'student')
+        self.client.force_login(other)
+        self.assertEqual(self.put(upload, 1000, chunk).status_code, 404)
+
+    def test_failed_completion_keeps_the_upload_for_a_retry(self):
+        upload = self.start().json()
+        for offset in range(0, len(self.CONTENT), upload['chunk_size']):
+            self.put(upload, offset, self.CONTENT[offset:offset + upload['chunk_size']])
+        fields = {'title': 'Thesis', 'department': 'Civil', 'batch': '2025'}
+        with mock.patch('reports.views.assignments.auto_assign_reports', side_effect=RuntimeError('boom')):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(upload['complete_url'], fields)
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(ProjectReport.objects.exists())
+        session = UploadSession.objects.get()
+        self.assertEqual(os.path.getsize(uploads.part_path(session)), len(self.CONTENT))
+        # The link storage was given is gone; only the part file is left
+        names = os.listdir(os.path.dirname(uploads.part_path(session)))
+        self.assertEqual([name for name in names if name.startswith(str(session.pk))], [f'{session.pk}.part'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(upload['complete_url'], fields)
+        self.assertEqual(response.status_code, 200)
+        report = ProjectReport.objects.get()
+        self.addCleanup(os.remove, report.report_file.path)
+        with report.report_file.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertFalse(os.path.exists(uploads.part_path(session)))
+
+    def test_limits_apply_at_start(self):
+        self.assertEqual(self.start(size=3 * 1024 * 1024 + 1).status_code, 413)
+        self.assertEqual(self.start(filename='thesis.exe').status_code, 400)
+        self.client.force_login(self.make_user('evaluator', 'evaluator'))
+        self.assertEqual(self.start().status_code, 403)
+
+    def test_abandoned_uploads_expire(self):
+        upload = self.start().json()
+        self.put(upload, 0, self.CONTENT[:10])
+        session = UploadSession.objects.get()
+        self.assertEqual(uploads.expire(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(uploads.expire(now=timezone.now() + timezone.timedelta(days=2)), 1)
+        self.assertFalse(os.path.exists(uploads.part_path(session)))
+
+    def test_first_chunk_must_match_the_extension(self):
+        upload = self.start(filename='thesis.docx').json()
+        response = self.put(upload, 0, self.CONTENT[:1000])
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(os.path.getsize(uploads.part_path(UploadSession.objects.get())), 0)
+
+
+class ContentSniffingTests(ReportTestCase):
+
+    def setUp(self):
+        self.student = self.make_user('student', 'student', department='Civil', batch='2025')
+        self.client.force_login(self.student)
+
+    def sniff(self, name, content):
+        return files.sniff(io.BytesIO(content), name)
+
+    def test_headers_and_ooxml_parts_are_checked(self):
+        from openpyxl import Workbook
+
+        workbook = io.BytesIO()
+        Workbook().save(workbook)
+        self.assertIsNone(self.sniff('a.pdf', b'%PDF-1.7\n...'))
+        self.assertIsNone(self.sniff('a.docx', docx_bytes('Hello')))
+        self.assertIsNone(self.sniff('a.xlsx', workbook.getvalue()))
+
+        # Leading bytes before the header are tolerated, as PDF readers do
+        self.assertIsNone(self.sniff('a.pdf', b'\r\n%PDF-1.4'))
+        self.assertIn('not a valid PDF', self.sniff('a.pdf', docx_bytes('Hello')))
+        self.assertIn('not a valid PDF', self.sniff('a.pdf', b' ' * 2000 + b'%PDF-1.4'))
+        self.assertIn('not a valid DOCX', self.sniff('a.docx', b'%PDF-1.4 renamed'))
+        # A real ZIP, but a workbook renamed to .docx
+        self.assertIn('not a valid DOCX', self.sniff('a.docx', workbook.getvalue()))
+        # The right first bytes but no central directory
+        self.assertIn('not a valid DOCX', self.sniff('a.docx', docx_bytes('Hello')[:200]))
+
+    def submit(self, name, content):
+        return self.client.post(reverse('reports:submit_report'), {
+            'title': 'Thesis', 'department': 'Civil', 'batch': '2025',
+            'report_file': SimpleUploadedFile(name, content),
+        })
+
+    def test_mismatched_upload_is_stopped_while_streaming(self):
+        content = b'MZ' + os.urandom(200 * 1024)
+        with mock.patch('django.core.files.uploadhandler.TemporaryFileUploadHandler.receive_data_chunk') as spooled, \
+                mock.patch('django.core.files.uploadhandler.MemoryFileUploadHandler.receive_data_chunk') as buffered:
+            response = self.submit('thesis.pdf', content)
+        self.assertContains(response, 'The file is not a valid PDF document.')
+        spooled.assert_not_called()
+        buffered.assert_not_called()
+        self.assertFalse(ProjectReport.objects.exists())
+
+    def test_matching_upload_is_stored(self):
+        response = self.submit('thesis.docx', docx_bytes('Chapter one'))
+        self.assertRedirects(response, reverse('reports:student_dashboard'))
+        report = ProjectReport.objects.get()
+        self.addCleanup(os.remove, report.report_file.path)
+        self.assertEqual(report.content_type, files.CONTENT_TYPES['.docx'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dashboard-tests'}})
+class DashboardCacheTests(ReportTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = self.make_user('admin', 'admin')
+        self.evaluator = self.make_user('evaluator', 'evaluator')
+        self.other_evaluator = self.make_user('other_evaluator', 'evaluator')
+        self.student = self.make_user('student', 'student')
+        self.other_student = self.make_user('other', 'student')
+        self.report = self.make_report(self.student)
+        EvaluatorStudentAssignment.objects.create(evaluator=self.evaluator, student=self.student)
+
+    def view(self, user, name, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse(f'reports:{name}'), params)
+
+    def test_repeat_views_skip_the_database(self):
+        for user, name in ((self.student, 'student_dashboard'), (self.evaluator, 'evaluator_dashboard'),
+                           (self.admin, 'admin_dashboard')):
+            self.assertContains(self.view(user, name), self.report.title)
+            # Only the session and the user are loaded
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse(f'reports:{name}'))
+            self.assertContains(response, self.report.title)
+
+    def test_feedback_refreshes_only_affected_dashboards(self):
+        self.view(self.other_evaluator, 'evaluator_dashboard')
+        self.assertEqual(self.view(self.evaluator, 'evaluator_dashboard').context['evaluated_count'], 0)
+        other_key = dashboards.key(self.other_evaluator)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Feedback.objects.create(report=self.report, evaluator=self.evaluator, comments='Good', grade=80)
+        self.assertEqual(self.view(self.evaluator, 'evaluator_dashboard').context['evaluated_count'], 1)
+        self.assertEqual(dashboards.key(self.other_evaluator), other_key)
+
+    def test_report_changes_refresh_student_and_admin(self):
+        self.assertEqual(self.view(self.student, 'student_dashboard').context['total_reports'], 1)
+        self.assertEqual(self.view(self.admin, 'admin_dashboard').context['total_reports'], 1)
+        other_key = dashboards.key(self.other_student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_report(self.student, title='Second')
+        self.assertContains(self.view(self.student, 'student_dashboard'), 'Second')
+        self.assertEqual(self.view(self.admin, 'admin_dashboard').context['total_reports'], 2)
+        self.assertEqual(self.view(self.evaluator, 'evaluator_dashboard').context['total_assigned'], 2)
+        self.assertEqual(dashboards.key(self.other_student), other_key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.report.delete()
+        self.assertEqual(self.view(self.student, 'student_dashboard').context['total_reports'], 1)
+        self.assertEqual(self.view(self.evaluator, 'evaluator_dashboard').context['total_assigned'], 1)
+
+    def test_assignment_refreshes_evaluator(self):
+        other_report = self.make_report(self.other_student)
+        self.assertEqual(self.view(self.other_evaluator, 'evaluator_dashboard').context['total_assigned'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReportAssignment.objects.create(report=other_report, evaluator=self.other_evaluator, assigned_by=self.admin)
+        response = self.view(self.other_evaluator, 'evaluator_dashboard')
+        self.assertEqual(response.context['total_assigned'], 1)
+        self.assertContains(response, other_report.title)
+
+    def test_admin_filters_are_cached_separately(self):
+        self.make_report(self.other_student, department='Civil')
+        self.assertEqual(self.view(self.admin, 'admin_dashboard').context['total_reports'], 2)
+        response = self.view(self.admin, 'admin_dashboard', department='Civil')
+        self.assertNotContains(response, self.report.title)
+
+    def test_repeat_filtered_admin_view_skips_the_search(self):
+        filters = {'student': 'student', 'department': 'Computer Science'}
+        self.assertContains(self.view(self.admin, 'admin_dashboard', **filters), self.report.title)
+        with mock.patch('reports.search.get_backend') as backend, self.assertNumQueries(2):
+            response = self.client.get(reverse('reports:admin_dashboard'), filters)
+        self.assertContains(response, self.report.title)
+        backend.assert_not_called()
+
+    def test_pending_student_refreshes_evaluators(self):
+        self.assertEqual(self.view(self.evaluator, 'evaluator_dashboard').context['pending_students_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_user('newcomer', 'student', approval_status='pending')
+        self.assertEqual(self.view(self.evaluator, 'evaluator_dashboard').context['pending_students_count'], 1)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'revalidation-tests'}},
+    PAGE_CACHE_MODE='etag',
+)
+class DashboardRevalidationTests(ReportTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = self.make_user('student', 'student')
+        self.report = self.make_report(self.student)
+        self.client.force_login(self.student)
+        self.url = reverse('reports:student_dashboard')
+
+    def test_unchanged_page_is_not_rendered_again(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with mock.patch('reports.views.render') as render:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        render.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_report(self.student, title='Second')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Second')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_logout_invalidates_cached_pages(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.post(reverse('accounts:logout'))
+        self.assertEqual(response['Clear-Site-Data'], '"cache"')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 302)
+        # Another login of the same user gets a new session and so new ETags
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pending_messages_are_shown(self):
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch('reports.dashboards.get_messages', return_value=['Report submitted successfully!']):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+    @override_settings(PAGE_CACHE_MODE='no-store')
+    def test_default_mode_stores_nothing(self):
+        response = self.client.get(self.url)
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('Clear-Site-Data'))
@@ -0,0 +1,296 @@
+"""
+First-page thumbnails of reports.
+
+Thumbnails are rendered with Pillow, on a background thread pool, into an
+on-disk cache under REPORT_THUMBNAIL_DIR keyed by the file's SHA-256, so
+identical uploads share one thumbnail and a replaced file gets a new one.
+The cache is bounded by REPORT_THUMBNAIL_CACHE_MB: every hit refreshes the
+file's mtime and the least recently used thumbnails are evicted first.
+
+Pillow cannot rasterize PDF pages, so a PDF whose first page carries an
+image (a scanned or designed cover) uses that image; everything else gets a
+page-shaped card with the file type, title and the opening lines of the
+text extracted by reports.extraction. The cover is read from the upload in
+the same sandboxed child process as text extraction (reports.extractors),
+under its time and memory limits, so a hostile PDF cannot stall or exhaust
+the web process; a cover that cannot be read gets the card.
+"""
+import io
+import logging
+import os
+import textwrap
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models.functions import Substr
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from PIL import Image, ImageDraw, ImageFont
+
+from . import files
+from .models import ReportText
+
+logger = logging.getLogger(__name__)
+
+WIDTH = 240
+HEIGHT = 339  # A4 proportions
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'png': ('PNG', 'image/png')}
+# Colour and label of the band at the top of a card, by content type
+BANDS = {
+    files.CONTENT_TYPES['.pdf']: ((200, 35, 51), 'PDF'),
+    files.CONTENT_TYPES['.docx']: ((43, 87, 154), 'DOCX'),
+    files.CONTENT_TYPES['.xlsx']: ((33, 115, 70), 'XLSX'),
+}
+DEFAULT_BAND = ((108, 117, 125), 'FILE')
+# Extracted text drawn on a card
+CARD_TEXT_CHARS = 2000
+# Versioned thumbnail URLs (?v=<sha256 prefix>) change with the file
+VERSION_CHARS = 16
+# Evict down to this share of the limit, so the cache is only walked again
+# after the remaining share has been written
+EVICT_TO = 0.9
+
+_pool = None
+_pool_lock = threading.Lock()
+_rendering = set()
+_written_since_evict = 0
+_placeholders = {}
+
+
+@dataclass
+class Source:
+    """What a thumbnail is drawn from, gathered on the request thread so renders never touch the database"""
+    key: str
+    path: str
+    content_type: str
+    title: str
+    text: str
+
+
+def image_format():
+    name = getattr(settings, 'REPORT_THUMBNAIL_FORMAT', 'webp')
+    return FORMATS.get(name, FORMATS['webp'])
+
+
+def cache_dir():
+    return str(getattr(settings, 'REPORT_THUMBNAIL_DIR', settings.BASE_DIR / 'cache' / 'thumbnails'))
+
+
+def cache_key(report):
+    """Thumbnail name for a report's current file, or None if it has no checksum yet"""
+    if not report.sha256:
+        return None
+    return f'{report.sha256}-{WIDTH}.{getattr(settings, "REPORT_THUMBNAIL_FORMAT", "webp")}'
+
+
+def cache_path(key):
+    return os.path.join(cache_dir(), key[:2], key)
+
+
+def source_for(report, text=None):
+    """What to render for a report, reading the start of its extracted text unless given"""
+    key = cache_key(report)
+    if key is None:
+        return None
+    if text is None:
+        text = ReportText.objects.filter(report_id=report.pk, status='done').annotate(
+            start=Substr('text', 1, CARD_TEXT_CHARS)
+        ).values_list('start', flat=True).first()
+    return Source(key, report.report_file.path, report.content_type, report.title, (text or '')[:CARD_TEXT_CHARS])
+
+
+def version(report):
+    """Query string value that changes whenever the report's thumbnail does"""
+    return (report.sha256 or '')[:VERSION_CHARS]
+
+
+def cached(key):
+    """Path of a cached thumbnail, marked as just used, or None"""
+    path = cache_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has only the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def _first_page_image(path):
+    """Cover image of a PDF, at most WIDTH x HEIGHT, read in a sandboxed child process; None if it has none"""
+    # Imported here: reports.extraction imports this module
+    from .extraction import ExtractionError, run_sandboxed
+
+    try:
+        output = run_sandboxed('cover', path, str(WIDTH), str(HEIGHT))
+        if not output:
+            return None
+        image = Image.open(io.BytesIO(output))
+        if image.width > WIDTH or image.height > HEIGHT:
+            raise ValueError(f'Cover is {image.width}x{image.height}')
+        image.load()
+        return image
+    except (ExtractionError, OSError, ValueError) as e:
+        logger.warning(f"Cannot read images from {path}: {e}")
+        return None
+
+
+def _card(source):
+    image = Image.new('RGB', (WIDTH, HEIGHT), 'white')
+    draw = ImageDraw.Draw(image)
+    colour, label = BANDS.get(source.content_type, DEFAULT_BAND)
+    draw.rectangle([0, 0, WIDTH, 28], fill=colour)
+    draw.text((10, 7), label, fill='white', font=_font(14))
+    y = 40
+    for line in textwrap.wrap(source.title, 26)[:3]:
+        draw.text((10, y), line, fill=(33, 37, 41), font=_font(15))
+        y += 19
+    y += 8
+    body = _font(10)
+    lines = [line for paragraph in source.text.splitlines() for line in textwrap.wrap(paragraph, 44)]
+    for line in lines[:(HEIGHT - y - 8) // 13]:
+        draw.text((10, y), line, fill=(108, 117, 125), font=body)
+        y += 13
+    draw.rectangle([0, 0, WIDTH - 1, HEIGHT - 1], outline=(222, 226, 230))
+    return image
+
+
+def render(source):
+    """Thumbnail image of a report file"""
+    if source.content_type == files.CONTENT_TYPES['.pdf']:
+        cover = _first_page_image(source.path)
+        if cover is not None:
+            return cover.convert('RGB')
+    return _card(source)
+
+
+def store(source):
+    """Render and cache a thumbnail; written through a temporary file so readers never see a partial one"""
+    pillow_format, _ = image_format()
+    path = cache_path(source.key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    buffer = io.BytesIO()
+    render(source).save(buffer, pillow_format)
+    partial = f'{path}.{uuid.uuid4().hex}.part'
+    with open(partial, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(partial, path)
+    _note_written(buffer.tell())
+    return path
+
+
+def cache_limit():
+    return getattr(settings, 'REPORT_THUMBNAIL_CACHE_MB', 256) * 1024 * 1024
+
+
+def _note_written(size):
+    """Evict once enough has been written since the last eviction to possibly exceed the limit"""
+    global _written_since_evict
+    with _pool_lock:
+        _written_since_evict += size
+        due = _written_since_evict >= cache_limit() * (1 - EVICT_TO)
+        if due:
+            _written_since_evict = 0
+    if due:
+        evict()
+
+
+def evict(limit_bytes=None):
+    """Delete least recently used thumbnails until the cache fits its size limit; returns files removed"""
+    if limit_bytes is None:
+        limit_bytes = cache_limit()
+    entries = []
+    total = 0
+    for path, dirs, names in os.walk(cache_dir()):
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(path, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, os.path.join(path, name)))
+            total += stat.st_size
+    if total <= limit_bytes:
+        return 0
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit_bytes * EVICT_TO:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _render(source):
+    try:
+        store(source)
+    except Exception as e:
+        logger.error(f"Error rendering thumbnail {source.key}: {str(e)}")
+    finally:
+        with _pool_lock:
+            _rendering.discard(source.key)
+
+
+def schedule(source):
+    """Render a thumbnail on the background pool unless it is already being rendered"""
+    global _pool
+    with _pool_lock:
+        if source.key in _rendering:
+            return
+        _rendering.add(source.key)
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails'
+            )
+    _pool.submit(_render, source)
+
+
+def placeholder(content_type):
+    """Encoded blank card shown while a thumbnail is being rendered"""
+    if content_type not in _placeholders:
+        pillow_format, _ = image_format()
+        buffer = io.BytesIO()
+        _card(Source('', '', content_type, '', '')).save(buffer, pillow_format)
+        _placeholders[content_type] = buffer.getvalue()
+    return _placeholders[content_type]
+
+
+def serve(request, report):
+    """Thumbnail response for a report whose access has been checked; renders in the background on a miss"""
+    _, mime = image_format()
+    # Files quarantined by gc_media are not opened; they get the placeholder
+    source = source_for(report, text='') if not report.file_missing else None
+    path = cached(source.key) if source else None
+    if path is None:
+        if source:
+            schedule(source_for(report))
+        response = HttpResponse(placeholder(report.content_type), content_type=mime)
+        # Ask again next time; the real thumbnail should be ready by then
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+    etag = quote_etag(source.key)
+    # Versioned URLs never change content, so browsers can keep them without revalidating
+    if request.GET.get('v') == version(report):
+        cache_control = 'private, max-age=31536000, immutable'
+    else:
+        cache_control = 'private, no-cache'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(open(path, 'rb'), content_type=mime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
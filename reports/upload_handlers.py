@@ -0,0 +1,58 @@
+"""
+Upload handler that sniffs report files while the request body streams in.
+
+Listed first in FILE_UPLOAD_HANDLERS. As soon as the first SNIFF_BYTES of a
+report_file have arrived they are checked against the file's extension; a
+mismatch stops the rest of the file from reaching the memory and temporary
+file handlers, and the form receives only those first bytes, which
+validate_file_content then rejects with the reason.
+"""
+import io
+
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from . import files
+
+# Form fields carrying report files
+SNIFFED_FIELDS = ('report_file',)
+
+
+class ContentSniffingUploadHandler(FileUploadHandler):
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.sniffing = field_name in SNIFFED_FIELDS
+        self.head = b''
+        self.checked = self.rejected = False
+
+    def _check(self):
+        self.checked = True
+        self.rejected = files.sniff_head(self.head, self.file_name) is not None
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.sniffing:
+            return raw_data
+        if self.rejected:
+            return None
+        if not self.checked:
+            self.head += raw_data[:files.SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= files.SNIFF_BYTES:
+                self._check()
+                if self.rejected:
+                    return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.sniffing:
+            return None
+        if not self.checked:
+            # Smaller than SNIFF_BYTES
+            self._check()
+        if not self.rejected:
+            # Stored by the next handler as usual
+            return None
+        return InMemoryUploadedFile(
+            io.BytesIO(self.head), self.field_name, self.file_name, self.content_type, len(self.head), self.charset,
+            self.content_type_extra,
+        )
@@ -0,0 +1,173 @@
+"""
+Resumable chunked uploads of report files.
+
+A client starts an upload with the file's name and size, then appends it in
+chunks of at most REPORT_UPLOAD_CHUNK_MB, each sent with its byte offset
+and SHA-256. Chunks are streamed into MEDIA_ROOT/uploads/<id>.part with
+appends only, CHUNK_READ bytes at a time, and the session's received count
+only moves once a chunk's checksum matched; a bad or interrupted chunk is
+cut off again, so the client can always resume from received_bytes. The
+first chunk is refused unless its leading bytes match the extension. When
+every byte has arrived the part file becomes the report's file: a link to
+it is moved into the content-addressed store, not a copy, and the part file
+itself is only removed once the report is committed, so a submission that
+fails can simply be retried.
+
+Sessions untouched for REPORT_UPLOAD_EXPIRY_HOURS are removed with their
+part files by the expire_uploads command.
+"""
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from django.core.files.uploadedfile import UploadedFile
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import files
+from .models import ProjectReport, UploadSession, max_upload_mb
+
+UPLOADS_DIR = 'uploads'
+# Bytes read from the request and written per step
+CHUNK_READ = 64 * 1024
+ALLOWED_EXTENSIONS = ('.pdf', '.docx', '.xlsx')
+
+
+class UploadError(Exception):
+    """A request the upload protocol rejects, with the HTTP status to answer it with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AssembledFile(UploadedFile):
+    """A finished upload's part file, which storage moves into place like a large form upload"""
+
+    def __init__(self, session):
+        part = part_path(session)
+        # Storage moves a link, leaving the part file for a retry if the report is rolled back
+        self.path = f'{part}.{uuid.uuid4().hex}.link'
+        try:
+            os.link(part, self.path)
+        except OSError:
+            self.path = part
+        self.part = part
+        super().__init__(open(part, 'rb'), session.filename, files.content_type_for(session.filename),
+                         session.size_bytes)
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        super().close()
+        if self.path != self.part:
+            _remove(self.path)
+
+
+def chunk_limit():
+    return getattr(settings, 'REPORT_UPLOAD_CHUNK_MB', 4) * 1024 * 1024
+
+
+def part_path(session):
+    return ProjectReport._meta.get_field('report_file').storage.path(f'{UPLOADS_DIR}/{session.pk}.part')
+
+
+def start(user, filename, size):
+    """Open an upload session for a file of the given name and size"""
+    filename = os.path.basename(filename or '')
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise UploadError('Only PDF, DOCX, and XLSX files are allowed.')
+    if size <= 0:
+        raise UploadError('The file is empty.')
+    if size > max_upload_mb() * 1024 * 1024:
+        raise UploadError(f'File size must be less than {max_upload_mb()}MB.', status=413)
+    session = UploadSession.objects.create(user=user, filename=filename, size_bytes=size)
+    os.makedirs(os.path.dirname(part_path(session)), exist_ok=True)
+    # Created empty so every later write is an append
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def append(session_id, user, offset, checksum, stream):
+    """Append the chunk read from stream at offset if its SHA-256 matches checksum; returns the session"""
+    with transaction.atomic():
+        # Concurrent retries of one chunk are serialised on the session row
+        session = UploadSession.objects.select_for_update().filter(pk=session_id, user=user).first()
+        if session is None:
+            raise UploadError('Unknown upload.', status=404)
+        if offset != session.received_bytes:
+            # Already received, or a gap: the client resumes from received_bytes
+            raise UploadError(f'Expected offset {session.received_bytes}.', status=409)
+        path = part_path(session)
+        limit = min(chunk_limit(), session.size_bytes - session.received_bytes)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(path, 'ab') as part:
+                # Drop the tail of a chunk interrupted before it was recorded
+                part.truncate(session.received_bytes)
+                while piece := stream.read(CHUNK_READ):
+                    if not written and not session.received_bytes:
+                        # The start of the file: refuse content that does not match the extension
+                        error = files.sniff_head(piece[:files.SNIFF_BYTES], session.filename)
+                        if error:
+                            raise UploadError(error, status=415)
+                    written += len(piece)
+                    if written > limit:
+                        raise UploadError(f'Chunks may carry at most {limit} bytes here.', status=413)
+                    part.write(piece)
+                    digest.update(piece)
+            if not written:
+                raise UploadError('The chunk is empty.')
+            if digest.hexdigest() != checksum.lower():
+                raise UploadError('Chunk checksum does not match.', status=422)
+        except (UploadError, OSError):
+            # Nothing of a rejected chunk stays behind
+            os.truncate(path, session.received_bytes)
+            raise
+        session.received_bytes += written
+        session.save(update_fields=['received_bytes', 'updated_at'])
+    return session
+
+
+def status(session_id, user):
+    session = UploadSession.objects.filter(pk=session_id, user=user).first()
+    if session is None:
+        raise UploadError('Unknown upload.', status=404)
+    return session
+
+
+def assembled_file(session):
+    """The finished file of a session, ready to be assigned to ProjectReport.report_file"""
+    if not session.complete:
+        raise UploadError(f'Only {session.received_bytes} of {session.size_bytes} bytes have arrived.', status=409)
+    if os.path.getsize(part_path(session)) != session.size_bytes:
+        raise UploadError('The uploaded file is incomplete; please upload it again.', status=409)
+    return AssembledFile(session)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(session):
+    """Delete a session, and its part file once that is committed"""
+    path = part_path(session)
+    session.delete()
+    transaction.on_commit(lambda: _remove(path))
+
+
+def expire(now=None):
+    """Discard sessions untouched for REPORT_UPLOAD_EXPIRY_HOURS; returns how many"""
+    cutoff = (now or timezone.now()) - timedelta(hours=getattr(settings, 'REPORT_UPLOAD_EXPIRY_HOURS', 24))
+    expired = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+        discard(session)
+        expired += 1
+    return expired
@@ -11,17 +11,23 @@ urlpatterns = [
     
     # Report management
     path('submit/', views.submit_report, name='submit_report'),
+    path('uploads/', views.upload_start, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='upload_complete'),
     path('report/<int:report_id>/', views.report_detail, name='report_detail'),
     path('report/<int:report_id>/feedback/', views.give_feedback, name='give_feedback'),
     path('report/<int:report_id>/assign/', views.assign_evaluator, name='assign_evaluator'),
     path('report/<int:report_id>/download/', views.download_report, name='download_report'),
     path('report/<int:report_id>/view/', views.view_report, name='view_report'),
+    path('report/<int:report_id>/thumbnail/', views.report_thumbnail, name='report_thumbnail'),
     
     # Admin functions
     path('all-reports/', views.all_reports, name='all_reports'),
+    path('all-reports/export/', views.export_reports, name='export_reports'),
     path('users/', views.user_management, name='user_management'),
     path('users/add-evaluator/', views.admin_add_evaluator, name='admin_add_evaluator'),
     path('users/assign-students/', views.admin_assign_students, name='admin_assign_students'),
+    path('users/import/', views.admin_import_users, name='admin_import_users'),
     path('users/evaluator/<int:evaluator_id>/delete/', views.admin_delete_evaluator, name='admin_delete_evaluator'),
 
     # Evaluator functions
@@ -1,27 +1,48 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg
-from django.http import JsonResponse, Http404, FileResponse, HttpResponse, HttpResponseForbidden
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.cache import never_cache
+from django.db import transaction
+from django.db.models import Q, F, Count, Avg, Max, Sum
+from django.db.models.functions import Coalesce, Substr
+from django.http import JsonResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.views.decorators.http import condition, require_http_methods
+from django.template.loader import render_to_string
 from django.utils import timezone
 from django.conf import settings
-import os
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import content_disposition_header
 import logging
 
 logger = logging.getLogger(__name__)
-from .models import ProjectReport, Feedback, ReportAssignment, EvaluatorStudentAssignment
+from .models import (
+    ProjectReport,
+    ReportText,
+    ReportSimilarity,
+    Feedback,
+    ReportAssignment,
+    EvaluatorStudentAssignment,
+    EvaluatorReportVisibility,
+    ReportStatsRollup,
+    UploadSession,
+    max_upload_mb,
+)
 from .forms import (
     ProjectReportForm,
     FeedbackForm,
     ReportAssignmentForm,
     ReportFilterForm,
+    ReportExportForm,
     CreateEvaluatorForm,
     CreateStudentForm,
     AssignStudentsToEvaluatorForm,
+    ImportUsersForm,
 )
+from .queries import report_listing
+from .pagination import CursorPaginator, filter_querystring
+from . import assignments, dashboards, delivery, export, search, thumbnails, uploads
+from accounts import importer, mail
 from accounts.models import User
 
 
@@ -41,7 +62,7 @@ def dashboard_view(request):
 
 
 @login_required
-@never_cache
+@condition(etag_func=dashboards.etag)
 def student_dashboard(request):
     """Student dashboard showing their submitted reports"""
     if not request.user.is_student:
@@ -49,126 +70,151 @@ def student_dashboard(request):
     
     reports = ProjectReport.objects.filter(student=request.user).order_by('-submitted_at')
     
-    # Get statistics
-    total_reports = reports.count()
-    evaluated_reports = reports.filter(status='evaluated').count()
-    pending_reports = reports.filter(status__in=['submitted', 'under_review']).count()
+    # Statistics and the rendered page are cached until the student's reports change (see reports.dashboards)
+    dashboard_key = dashboards.key(request.user)
+    stats = dashboards.cached(f'{dashboard_key}:stats', lambda: reports.aggregate(
+        total_reports=Count('id'),
+        evaluated_reports=Count('id', filter=Q(status='evaluated')),
+        pending_reports=Count('id', filter=Q(status__in=['submitted', 'under_review'])),
+    ))
     
     context = {
         'reports': reports,
-        'total_reports': total_reports,
-        'evaluated_reports': evaluated_reports,
-        'pending_reports': pending_reports,
+        'dashboard_key': dashboard_key,
+        'dashboard_cache_seconds': dashboards.timeout(),
+        **stats,
     }
     return render(request, 'reports/student_dashboard.html', context)
 
 
 @login_required
-@never_cache
+@condition(etag_func=dashboards.etag)
 def evaluator_dashboard(request):
     """Evaluator dashboard showing assigned reports and pending students"""
     if not request.user.is_evaluator:
         raise Http404("Access denied")
     
     # Get assigned reports (either via ReportAssignment or EvaluatorStudentAssignment)
+    # from the materialized visibility index maintained by reports.signals
+    visible_report_ids = EvaluatorReportVisibility.objects.filter(
+        evaluator=request.user
+    ).values('report_id')
     assigned_reports = ProjectReport.objects.filter(
-        Q(assignments__evaluator=request.user, assignments__is_active=True)
-        | Q(student__in=User.objects.filter(student_evaluator_mappings__evaluator=request.user, student_evaluator_mappings__is_active=True))
-    ).distinct().order_by('-submitted_at')
-    
-    # Get pending students for approval
-    pending_students_count = User.objects.filter(role='student', approval_status='pending').count()
+        id__in=visible_report_ids
+    ).select_related('student').prefetch_related('feedbacks__evaluator').order_by('-submitted_at')
+    
+    def compute_stats():
+        # Get pending students for approval
+        pending_students_count = User.objects.filter(role='student', approval_status='pending').count()
+        total_assigned = visible_report_ids.distinct().count()
+        evaluated_count = Feedback.objects.filter(evaluator=request.user, report_id__in=visible_report_ids).count()
+        return {
+            'total_assigned': total_assigned,
+            'evaluated_count': evaluated_count,
+            'pending_count': total_assigned - evaluated_count,
+            'pending_students_count': pending_students_count,
+        }
     
-    # Get statistics
-    total_assigned = assigned_reports.count()
-    evaluated_count = assigned_reports.filter(feedbacks__evaluator=request.user).count()
-    pending_count = total_assigned - evaluated_count
+    # Statistics and the rendered page are cached until what the evaluator sees changes (see reports.dashboards)
+    dashboard_key = dashboards.key(request.user)
     
     context = {
         'assigned_reports': assigned_reports,
-        'total_assigned': total_assigned,
-        'evaluated_count': evaluated_count,
-        'pending_count': pending_count,
-        'pending_students_count': pending_students_count,
+        'dashboard_key': dashboard_key,
+        'dashboard_cache_seconds': dashboards.timeout(),
+        **dashboards.cached(f'{dashboard_key}:stats', compute_stats),
     }
     return render(request, 'reports/evaluator_dashboard.html', context)
 
 
-@login_required
-@never_cache
-def admin_dashboard(request):
-    """Admin dashboard with system overview"""
-    if not request.user.is_admin:
-        raise Http404("Access denied")
-    
-    # Get statistics
-    total_reports = ProjectReport.objects.count()
-    total_students = User.objects.filter(role='student').count()
-    total_evaluators = User.objects.filter(role='evaluator').count()
-    
-    # Filter parameters
-    filter_type = request.GET.get('filter', 'all')
-    evaluator_filter = request.GET.get('evaluator')
-    status_filter = request.GET.get('status')
-    department_filter = request.GET.get('department')
-    batch_filter = request.GET.get('batch')
-    student_filter = request.GET.get('student')
-    
-    # Get reports based on filter
+def _filtered_admin_reports(filter_type, evaluator_filter, status_filter, department_filter, batch_filter,
+                            student_filter):
+    """The first reports matching the admin dashboard's filters"""
     reports = ProjectReport.objects.all()
-    
+
     if filter_type == 'recent':
-        reports = reports.order_by('-submitted_at')[:20]
+        reports = reports.order_by('-submitted_at')
     elif filter_type == 'pending':
         reports = reports.filter(status__in=['submitted', 'under_review'])
     elif filter_type == 'approved':
         reports = reports.filter(status='evaluated')
     elif filter_type == 'needs_update':
         reports = reports.filter(status='rejected')
-    
+
     if evaluator_filter:
-        reports = reports.filter(assignments__evaluator_id=evaluator_filter)
+        reports = reports.filter(
+            id__in=ReportAssignment.objects.filter(evaluator_id=evaluator_filter).values('report_id')
+        )
     if status_filter:
         reports = reports.filter(status=status_filter)
     if department_filter:
         reports = reports.filter(department=department_filter)
     if batch_filter:
-        reports = reports.filter(batch__icontains=batch_filter)
+        reports = reports.filter(batch__istartswith=batch_filter)
     if student_filter:
-        reports = reports.filter(
-            Q(student__first_name__icontains=student_filter)
-            | Q(student__last_name__icontains=student_filter)
-            | Q(student__username__icontains=student_filter)
-        )
+        reports = search.filter_reports(reports, student_filter)
+    return list(report_listing(reports)[:20])
+
+
+@login_required
+@condition(etag_func=dashboards.etag)
+def admin_dashboard(request):
+    """Admin dashboard with system overview"""
+    if not request.user.is_admin:
+        raise Http404("Access denied")
+    
+    # Get statistics from the rollups maintained by reports.signals
+    rollups = ReportStatsRollup.objects.filter(count__gt=0)
+    
+    # Statistics and the rendered page are cached per filter until anything they show changes (see reports.dashboards)
+    dashboard_key = dashboards.key(request.user, sorted(request.GET.lists()))
+    stats = dashboards.cached(f'{dashboard_key}:stats', lambda: {
+        'total_reports': rollups.aggregate(total=Sum('count'))['total'] or 0,
+        'total_students': User.objects.filter(role='student').count(),
+        'total_evaluators': User.objects.filter(role='evaluator').count(),
+    })
+    
+    # Filter parameters
+    filter_type = request.GET.get('filter', 'all')
+    evaluator_filter = request.GET.get('evaluator')
+    status_filter = request.GET.get('status')
+    department_filter = request.GET.get('department')
+    batch_filter = request.GET.get('batch')
+    student_filter = request.GET.get('student')
+    
+    # Only run when the page is rendered, not when it comes from the cache
+    filtered_reports = SimpleLazyObject(lambda: _filtered_admin_reports(
+        filter_type, evaluator_filter, status_filter, department_filter, batch_filter, student_filter
+    ))
     
     # Recent reports
     recent_reports = ProjectReport.objects.order_by('-submitted_at')[:10]
     
     # Department-wise statistics
-    dept_stats = ProjectReport.objects.values('department').annotate(
-        count=Count('id')
+    dept_stats = rollups.values('department').annotate(
+        count=Sum('count')
     ).order_by('-count')
     
     # Status-wise statistics
-    status_stats = ProjectReport.objects.values('status').annotate(
-        count=Count('id')
-    )
+    status_stats = rollups.values('status').annotate(
+        count=Sum('count')
+    ).order_by('status')
     
     # Evaluator statistics
     evaluator_stats = User.objects.filter(role='evaluator').annotate(
-        assigned_count=Count('assigned_reports', filter=Q(assigned_reports__is_active=True)),
-        evaluated_count=Count('given_feedbacks')
+        assigned_count=Coalesce('report_stats__assigned_count', 0),
+        evaluated_count=Coalesce('report_stats__evaluated_count', 0)
     )
     
     context = {
-        'total_reports': total_reports,
-        'total_students': total_students,
-        'total_evaluators': total_evaluators,
+        **stats,
+        'dashboard_key': dashboard_key,
+        'dashboard_cache_seconds': dashboards.timeout(),
         'recent_reports': recent_reports,
         'dept_stats': dept_stats,
         'status_stats': status_stats,
         'evaluator_stats': evaluator_stats,
-        'filtered_reports': reports[:20],
+        'filtered_reports': filtered_reports,
         'filter_type': filter_type,
         'evaluator_filter': evaluator_filter,
         'status_filter': status_filter,
@@ -200,27 +246,8 @@ def submit_report(request):
                 
                 report.save()
                 
-                # Auto-assign based on explicit mappings first
-                mapped_evaluators = User.objects.filter(
-                    evaluator_student_mappings__student=request.user,
-                    evaluator_student_mappings__is_active=True
-                )
-                if mapped_evaluators.exists():
-                    for evaluator in mapped_evaluators:
-                        ReportAssignment.objects.get_or_create(
-                            report=report,
-                            evaluator=evaluator,
-                            defaults={'assigned_by': request.user, 'is_active': True}
-                        )
-                else:
-                    # Fallback: assign evaluators from same department
-                    evaluators = User.objects.filter(role='evaluator', department=report.department)
-                    for evaluator in evaluators:
-                        ReportAssignment.objects.get_or_create(
-                            report=report,
-                            evaluator=evaluator,
-                            defaults={'assigned_by': request.user, 'is_active': True}
-                        )
+                # Assign to mapped evaluators, falling back to the department's evaluators
+                assignments.auto_assign_reports([report], assigned_by=request.user)
                 messages.success(request, 'Report submitted successfully!')
                 return redirect('reports:student_dashboard')
         except Exception as e:
@@ -229,7 +256,91 @@ def submit_report(request):
     else:
         form = ProjectReportForm(user=request.user)
     
-    return render(request, 'reports/submit_report.html', {'form': form})
+    return render(request, 'reports/submit_report.html', {'form': form, 'max_upload_mb': max_upload_mb()})
+
+
+def _upload_json(session):
+    return {
+        'id': str(session.pk),
+        'size': session.size_bytes,
+        'received': session.received_bytes,
+        'chunk_size': uploads.chunk_limit(),
+        'chunk_url': reverse('reports:upload_chunk', args=[session.pk]),
+        'complete_url': reverse('reports:upload_complete', args=[session.pk]),
+    }
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_start(request):
+    """Start a resumable chunked upload of a report file (student only)"""
+    if not request.user.is_student:
+        return HttpResponseForbidden("Access denied")
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'The file size is missing.'}, status=400)
+    try:
+        session = uploads.start(request.user, request.POST.get('filename', ''), size)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(_upload_json(session), status=201)
+
+
+@login_required
+@require_http_methods(["GET", "PUT"])
+def upload_chunk(request, upload_id):
+    """GET: how much of an upload has arrived. PUT: append the next chunk (raw body)"""
+    try:
+        if request.method == 'GET':
+            session = uploads.status(upload_id, request.user)
+        else:
+            checksum = request.headers.get('X-Chunk-SHA256', '')
+            try:
+                offset = int(request.headers.get('X-Upload-Offset', ''))
+            except ValueError:
+                return JsonResponse({'error': 'X-Upload-Offset is missing.'}, status=400)
+            if not checksum:
+                return JsonResponse({'error': 'X-Chunk-SHA256 is missing.'}, status=400)
+            session = uploads.append(upload_id, request.user, offset, checksum, request)
+    except uploads.UploadError as e:
+        body = {'error': str(e)}
+        if e.status == 409:
+            body.update(_upload_json(uploads.status(upload_id, request.user)))
+        return JsonResponse(body, status=e.status)
+    return JsonResponse(_upload_json(session))
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_complete(request, upload_id):
+    """Create the report from a fully uploaded file and the submission form's other fields"""
+    if not request.user.is_student:
+        return HttpResponseForbidden("Access denied")
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().filter(pk=upload_id, user=request.user).first()
+            if session is None:
+                return JsonResponse({'error': 'Unknown upload.'}, status=404)
+            report_file = uploads.assembled_file(session)
+            try:
+                form = ProjectReportForm(request.POST, {'report_file': report_file}, user=request.user)
+                if not form.is_valid():
+                    return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+                report = form.save(commit=False)
+                report.student = request.user
+                report.save()
+            finally:
+                report_file.close()
+            uploads.discard(session)
+            assignments.auto_assign_reports([report], assigned_by=request.user)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    except Exception as e:
+        logger.error(f"Error completing upload {upload_id}: {str(e)}")
+        return JsonResponse({'error': 'An error occurred while submitting the report. Please try again.'}, status=500)
+    messages.success(request, 'Report submitted successfully!')
+    return JsonResponse({'report': report.id, 'sha256': report.sha256, 'redirect': reverse('reports:student_dashboard')})
 
 
 @login_required
@@ -259,11 +370,23 @@ def report_detail(request, report_id):
         Feedback.objects.filter(report=report).values_list('evaluator_id', flat=True)
     )
 
+    # Counts and preview come from the extracted text, not the file
+    extracted_text = ReportText.objects.filter(report=report, status='done').annotate(
+        preview=Substr('text', 1, 1200)
+    ).defer('text', 'error').first()
+
+    # Likely near-duplicates by other students, found by reports.similarity
+    similar_reports = []
+    if not request.user.is_student:
+        similar_reports = ReportSimilarity.objects.filter(report=report).select_related('similar__student')[:10]
+
     context = {
         'report': report,
         'feedbacks': feedbacks,
         'user_feedback': user_feedback,
         'evaluated_evaluator_ids': evaluated_evaluator_ids,
+        'extracted_text': extracted_text,
+        'similar_reports': similar_reports,
     }
     return render(request, 'reports/report_detail.html', context)
 
@@ -309,36 +432,37 @@ def all_reports(request):
     # Apply filters
     filter_form = ReportFilterForm(request.GET)
     if filter_form.is_valid():
-        department = filter_form.cleaned_data.get('department')
-        batch = filter_form.cleaned_data.get('batch')
-        status = filter_form.cleaned_data.get('status')
-        student = filter_form.cleaned_data.get('student')
-        
-        if department:
-            reports = reports.filter(department=department)
-        if batch:
-            reports = reports.filter(batch__icontains=batch)
-        if status:
-            reports = reports.filter(status=status)
-        if student:
-            reports = reports.filter(
-                Q(student__first_name__icontains=student) |
-                Q(student__last_name__icontains=student) |
-                Q(student__username__icontains=student)
-            )
+        reports = filter_form.filter_queryset(reports)
     
     # Pagination
-    paginator = Paginator(reports, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(report_listing(reports), ordering=('-submitted_at', '-id'), per_page=20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'page_obj': page_obj,
         'filter_form': filter_form,
+        'filter_query': filter_querystring(request),
     }
     return render(request, 'reports/all_reports.html', context)
 
 
+@login_required
+def export_reports(request):
+    """Download the filtered reports as one ZIP archive with a manifest (admin and evaluator access)"""
+    if not (request.user.is_admin or request.user.is_evaluator):
+        raise Http404("Access denied")
+    
+    filter_form = ReportExportForm(request.GET)
+    if not filter_form.is_valid():
+        return HttpResponse("Invalid export filters", status=400)
+    reports = filter_form.filter_queryset(export.exportable(request.user))
+    
+    # Built while it is sent, so the size is unknown up front
+    response = StreamingHttpResponse(export.stream(reports), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, export.export_filename())
+    return response
+
+
 @login_required
 def assign_evaluator(request, report_id):
     """Assign evaluator to a report (admin only)"""
@@ -380,13 +504,13 @@ def user_management(request):
         users = users.filter(role=role_filter)
     
     # Pagination
-    paginator = Paginator(users, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(users, ordering=('-date_joined', '-id'), per_page=20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'page_obj': page_obj,
         'role_filter': role_filter,
+        'filter_query': filter_querystring(request),
     }
     return render(request, 'reports/user_management.html', context)
 
@@ -406,7 +530,7 @@ def admin_add_evaluator(request):
                 email_error = getattr(evaluator, '_email_error', None)
                 
                 if email_sent and evaluator.email:
-                    messages.success(request, f"Evaluator '{evaluator.username}' created successfully. Login credentials have been sent to {evaluator.email}.")
+                    messages.success(request, f"Evaluator '{evaluator.username}' created successfully. Login credentials will be emailed to {evaluator.email} shortly.")
                 elif password:
                     messages.warning(request, 
                         f"Evaluator '{evaluator.username}' created, but email could not be sent. "
@@ -455,7 +579,7 @@ def evaluator_add_student(request):
                 )
                 
                 if email_sent and student.email:
-                    messages.success(request, f"Student '{student.username}' created and linked to you. Login credentials have been sent to {student.email}.")
+                    messages.success(request, f"Student '{student.username}' created and linked to you. Login credentials will be emailed to {student.email} shortly.")
                 elif password:
                     messages.warning(request, 
                         f"Student '{student.username}' created and linked to you, but email could not be sent. "
@@ -519,30 +643,20 @@ def approve_student(request, student_id):
             defaults={'assigned_by': request.user, 'is_active': True}
         )
         
-        # Send approval notification email to student
+        # Queue approval notification email to student
         if student.email:
-            try:
-                from django.core.mail import send_mail
-                from django.template.loader import render_to_string
-                from django.urls import reverse
-                login_url = f"{getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')}{reverse('accounts:login')}"
-                
-                html_message = render_to_string('emails/student_approved.html', {
-                    'first_name': student.first_name or student.username,
-                    'username': student.username,
-                    'login_url': login_url,
-                    'year': timezone.now().year,
-                })
-                send_mail(
-                    subject='Your Student Account Has Been Approved - Student Report System',
-                    message=f"Hello {student.first_name or student.username},\n\nYour student account has been approved!\nUsername: {student.username}\n\nYou can now log in at {login_url} and start submitting your reports.",
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[student.email],
-                    html_message=html_message,
-                    fail_silently=False,
-                )
-            except Exception as e:
-                logger.error(f"Failed to send approval email to {student.email}: {str(e)}")
+            html_message = render_to_string('emails/student_approved.html', {
+                'first_name': student.first_name or student.username,
+                'username': student.username,
+                'login_url': mail.login_url(),
+                'year': timezone.now().year,
+            })
+            mail.enqueue(
+                student.email,
+                subject='Your Student Account Has Been Approved - Student Report System',
+                body=f"Hello {student.first_name or student.username},\n\nYour student account has been approved!\nUsername: {student.username}\n\nYou can now log in at {mail.login_url()} and start submitting your reports.",
+                html_body=html_message,
+            )
         
         messages.success(request, f"Student '{student.username}' has been approved and can now access the system.")
         return redirect('reports:pending_students')
@@ -584,22 +698,63 @@ def admin_assign_students(request):
         if form.is_valid():
             evaluator = form.cleaned_data['evaluator']
             students = form.cleaned_data['students']
-            created = 0
-            for student in students:
-                _, was_created = EvaluatorStudentAssignment.objects.get_or_create(
-                    evaluator=evaluator,
-                    student=student,
-                    defaults={'assigned_by': request.user, 'is_active': True}
-                )
-                if was_created:
-                    created += 1
-            messages.success(request, f"Assigned {created} students to {evaluator.username}")
+            result = assignments.assign_students(evaluator, students, assigned_by=request.user)
+            messages.success(
+                request,
+                f"Assigned {result.assigned} students to {evaluator.username} "
+                f"({result.created} new, {result.reactivated} reactivated, {result.skipped} already assigned)"
+            )
             return redirect('reports:user_management')
     else:
         form = AssignStudentsToEvaluatorForm()
     return render(request, 'reports/admin_assign_students.html', {'form': form})
 
 
+@login_required
+def admin_import_users(request):
+    """Admin creates users in bulk from an uploaded roster"""
+    if not request.user.is_admin:
+        raise Http404("Access denied")
+    result = None
+    if request.method == 'POST':
+        form = ImportUsersForm(request.POST, request.FILES)
+        if form.is_valid():
+            roster = form.cleaned_data['roster']
+            dry_run = form.cleaned_data['dry_run']
+            try:
+                rows = importer.read_rows(roster, roster.name)
+                result = importer.import_users(
+                    rows,
+                    workers=getattr(settings, 'USER_IMPORT_WORKERS', None),
+                    dry_run=dry_run,
+                    send_emails=form.cleaned_data['send_emails'],
+                )
+            except importer.ImportFileError as e:
+                form.add_error('roster', str(e))
+            else:
+                if dry_run:
+                    messages.info(request, f"{result.created} rows valid, {len(result.errors)} rows with errors. No users were created.")
+                else:
+                    messages.success(
+                        request,
+                        f"Created {result.created} users, skipped {len(result.errors)} rows, "
+                        f"queued {result.queued} credential emails."
+                    )
+                    logger.info(f"Admin {request.user.username} imported {result.created} users from {roster.name}")
+                    # bulk_create sends no signals
+                    dashboards.invalidate(dashboards.ADMIN_SCOPE)
+                    if not result.errors:
+                        return redirect('reports:user_management')
+    else:
+        form = ImportUsersForm()
+    context = {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:100] if result else [],
+    }
+    return render(request, 'reports/admin_import_users.html', context)
+
+
 @login_required
 def admin_delete_evaluator(request, evaluator_id):
     """Admin deletes an evaluator - completely removes from database"""
@@ -644,29 +799,52 @@ def admin_delete_evaluator(request, evaluator_id):
         return redirect('reports:user_management')
 
 
+# Columns the evaluator student roster can be sorted by
+STUDENT_SORT_FIELDS = {
+    'name': 'first_name',
+    'username': 'username',
+    'date_joined': 'date_joined',
+    'reports': 'reports_count',
+    'evaluated': 'evaluated_count',
+    'latest': 'latest_submission',
+}
+
+
 @login_required
 def evaluator_view_students(request):
     """Evaluator views list of their assigned students"""
     if not request.user.is_evaluator:
         return HttpResponseForbidden("Access denied")
     
-    # Get students assigned to this evaluator
+    # Get students assigned to this evaluator with their report statistics in one query
     assigned_students = User.objects.filter(
         student_evaluator_mappings__evaluator=request.user,
         student_evaluator_mappings__is_active=True
-    ).distinct().order_by('-date_joined')
+    ).annotate(
+        reports_count=Count('submitted_reports', distinct=True),
+        evaluated_count=Count('submitted_reports', filter=Q(submitted_reports__status='evaluated'), distinct=True),
+        latest_submission=Max('submitted_reports__submitted_at'),
+    )
     
-    # Get student statistics
-    students_with_reports = []
-    for student in assigned_students:
-        reports_count = ProjectReport.objects.filter(student=student).count()
-        students_with_reports.append({
-            'student': student,
-            'reports_count': reports_count,
-        })
+    # Sorting
+    sort = request.GET.get('sort', '-date_joined')
+    if sort.lstrip('-') not in STUDENT_SORT_FIELDS:
+        sort = '-date_joined'
+    field = STUDENT_SORT_FIELDS[sort.lstrip('-')]
+    if sort.startswith('-'):
+        ordering = [F(field).desc(nulls_last=True), '-id']
+    else:
+        ordering = [F(field).asc(nulls_last=True), 'id']
+    assigned_students = assigned_students.order_by(*ordering)
+    
+    # Pagination
+    paginator = Paginator(assigned_students, 25)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
     
     context = {
-        'students_with_reports': students_with_reports,
+        'page_obj': page_obj,
+        'sort': sort,
     }
     return render(request, 'reports/evaluator_view_students.html', context)
 
@@ -737,29 +915,27 @@ def download_report(request, report_id):
             if not report.assignments.filter(evaluator=request.user, is_active=True).exists():
                 return HttpResponseForbidden("You don't have access to this file")
         
-        # Get the file path
-        file_path = os.path.join(settings.MEDIA_ROOT, report.report_file.name)
-        
-        if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path} for report {report_id}")
-            raise Http404("File not found")
-        
-        # Get original filename or use UUID filename
-        original_filename = getattr(report, '_original_filename', None) or report.filename
-        
-        # Create file response
-        response = FileResponse(
-            open(file_path, 'rb'),
-            as_attachment=True,
-            filename=original_filename
-        )
-        
-        return response
+        return delivery.serve(request, report, as_attachment=True)
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"Error downloading report {report_id}: {str(e)}")
         raise Http404("Error accessing file")
 
 
+@login_required
+def report_thumbnail(request, report_id):
+    """First-page thumbnail of a report, so it can be identified without opening the file"""
+    report = get_object_or_404(
+        ProjectReport.objects.only('id', 'student_id', 'title', 'report_file', 'sha256', 'content_type', 'file_missing'),
+        id=report_id
+    )
+    # Same access as view_report
+    if request.user.is_student and not request.user.is_admin and report.student_id != request.user.id:
+        return HttpResponseForbidden("You don't have access to this file")
+    return thumbnails.serve(request, report)
+
+
 @login_required
 def view_report(request, report_id):
     """View a report file in browser with access control"""
@@ -773,36 +949,9 @@ def view_report(request, report_id):
             return HttpResponseForbidden("You don't have access to this file")
         # Evaluators are allowed to view the file regardless of assignment.
         
-        # Get the file path
-        file_path = os.path.join(settings.MEDIA_ROOT, report.report_file.name)
-        
-        if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path} for report {report_id}")
-            raise Http404("File not found")
-        
-        # Determine content type based on file extension
-        file_extension = os.path.splitext(report.filename)[1].lower()
-        
-        if file_extension == '.pdf':
-            content_type = 'application/pdf'
-        elif file_extension == '.docx':
-            content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        elif file_extension == '.doc':
-            content_type = 'application/msword'
-        elif file_extension == '.xlsx':
-            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        elif file_extension == '.txt':
-            content_type = 'text/plain'
-        else:
-            content_type = 'application/octet-stream'
-        
-        # Create file response for viewing
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type=content_type
-        )
-        
-        return response
+        return delivery.serve(request, report)
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"Error viewing report {report_id}: {str(e)}")
         raise Http404("Error accessing file")
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Maintenance of the evaluator -> report visibility index.
+
+An evaluator can see a report when it is assigned to them directly
+(ReportAssignment) or when they are mapped to the report's student
+(EvaluatorStudentAssignment). Both paths are materialized into
+EvaluatorReportVisibility so the evaluator dashboard reads a single index.
+Every change to the index also invalidates the cached dashboards of the
+evaluators it affects (see reports.dashboards).
+"""
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+
+from . import dashboards
+from .models import EvaluatorReportVisibility, ProjectReport, ReportAssignment, EvaluatorStudentAssignment
+
+ASSIGNMENT = 'assignment'
+STUDENT_MAPPING = 'student_mapping'
+
+BATCH_SIZE = 1000
+
+
+def _group(pairs):
+    """Group (evaluator_id, other_id) pairs by evaluator"""
+    grouped = defaultdict(set)
+    for evaluator_id, other_id in pairs:
+        grouped[evaluator_id].add(other_id)
+    return grouped
+
+
+def grant_assignments(pairs):
+    """Add visibility rows for (evaluator_id, report_id) assignment pairs"""
+    pairs = list(pairs)
+    if not pairs:
+        return
+    report_ids = {report_id for _, report_id in pairs}
+    submitted = dict(
+        ProjectReport.objects.filter(id__in=report_ids).values_list('id', 'submitted_at')
+    )
+    EvaluatorReportVisibility.objects.bulk_create(
+        [
+            EvaluatorReportVisibility(
+                evaluator_id=evaluator_id,
+                report_id=report_id,
+                source=ASSIGNMENT,
+                submitted_at=submitted[report_id],
+            )
+            for evaluator_id, report_id in pairs
+            if report_id in submitted
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    dashboards.invalidate_evaluators({evaluator_id for evaluator_id, _ in pairs})
+
+
+def revoke_assignments(pairs):
+    """Remove visibility rows for (evaluator_id, report_id) assignment pairs"""
+    grouped = _group(pairs)
+    for evaluator_id, report_ids in grouped.items():
+        EvaluatorReportVisibility.objects.filter(
+            evaluator_id=evaluator_id, report_id__in=report_ids, source=ASSIGNMENT
+        ).delete()
+    dashboards.invalidate_evaluators(grouped)
+
+
+def grant_student_mappings(pairs):
+    """Add visibility rows for every report of the mapped (evaluator_id, student_id) pairs"""
+    grouped = _group(pairs)
+    dashboards.invalidate_evaluators(grouped)
+    for evaluator_id, student_ids in grouped.items():
+        reports = ProjectReport.objects.filter(student_id__in=student_ids).values_list('id', 'submitted_at')
+        EvaluatorReportVisibility.objects.bulk_create(
+            (
+                EvaluatorReportVisibility(
+                    evaluator_id=evaluator_id,
+                    report_id=report_id,
+                    source=STUDENT_MAPPING,
+                    submitted_at=submitted_at,
+                )
+                for report_id, submitted_at in reports.iterator()
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def revoke_student_mappings(pairs):
+    """Remove visibility rows granted through the (evaluator_id, student_id) mappings"""
+    grouped = _group(pairs)
+    dashboards.invalidate_evaluators(grouped)
+    for evaluator_id, student_ids in grouped.items():
+        EvaluatorReportVisibility.objects.filter(
+            evaluator_id=evaluator_id, report__student_id__in=student_ids, source=STUDENT_MAPPING
+        ).delete()
+
+
+def grant_new_report(report):
+    """Expose a freshly submitted report to the evaluators mapped to its student"""
+    evaluator_ids = list(EvaluatorStudentAssignment.objects.filter(
+        student_id=report.student_id, is_active=True
+    ).values_list('evaluator_id', flat=True))
+    dashboards.invalidate_evaluators(evaluator_ids)
+    EvaluatorReportVisibility.objects.bulk_create(
+        [
+            EvaluatorReportVisibility(
+                evaluator_id=evaluator_id,
+                report_id=report.id,
+                source=STUDENT_MAPPING,
+                submitted_at=report.submitted_at,
+            )
+            for evaluator_id in evaluator_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild():
+    """Recompute the whole index from the assignment tables. Returns the number of rows written."""
+    assignments = ReportAssignment.objects.filter(is_active=True).values_list(
+        'evaluator_id', 'report_id', 'report__submitted_at'
+    )
+    mappings = EvaluatorStudentAssignment.objects.filter(
+        is_active=True, student__submitted_reports__isnull=False
+    ).values_list('evaluator_id', 'student__submitted_reports__id', 'student__submitted_reports__submitted_at')
+    rows = (
+        EvaluatorReportVisibility(
+            evaluator_id=evaluator_id, report_id=report_id, source=source, submitted_at=submitted_at
+        )
+        for source, queryset in ((ASSIGNMENT, assignments), (STUDENT_MAPPING, mappings))
+        for evaluator_id, report_id, submitted_at in queryset.iterator(chunk_size=BATCH_SIZE)
+    )
+    written = 0
+    with transaction.atomic():
+        EvaluatorReportVisibility.objects.all().delete()
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            EvaluatorReportVisibility.objects.bulk_create(batch)
+            written += len(batch)
+        dashboards.invalidate_all()
+    return written
+
+
+def evaluators_of(report_ids):
+    """Ids of the evaluators who can see any of the reports"""
+    return set(EvaluatorReportVisibility.objects.filter(report_id__in=report_ids).values_list('evaluator_id', flat=True))
+
+
+def evaluators_of_student(student_id):
+    """Ids of the evaluators who can see any of a student's reports"""
+    return set(
+        EvaluatorReportVisibility.objects.filter(report__student_id=student_id).values_list('evaluator_id', flat=True)
+    )
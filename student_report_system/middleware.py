@@ -1,32 +1,55 @@
 """
-Middleware to add no-cache headers to prevent browser caching
+Middleware to control browser caching of pages
 """
-from django.utils.cache import add_never_cache_headers
-from django.http import HttpResponse
+from django.conf import settings
 
 
 class NoCacheMiddleware:
     """
     Middleware to prevent browser caching of pages.
     This ensures users always see fresh content after logout.
+
+    PAGE_CACHE_MODE chooses how:
+    - no-store (default): browsers keep no copy of any HTML page.
+    - etag: pages sent with an ETag (the dashboards, see reports.dashboards)
+      may be kept but are revalidated on every use, so an unchanged page is
+      answered with 304 before its view body runs; other HTML pages stay
+      no-store. The ETag covers the session, so a copy is never reused
+      after logout, and the response that ends or replaces a session tells
+      the browser to drop its cached copies (Clear-Site-Data) so back and
+      forward navigation cannot show them either.
     """
-    
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+
     def __call__(self, request):
+        etag_mode = getattr(settings, 'PAGE_CACHE_MODE', 'no-store') == 'etag'
+        session = getattr(request, 'session', None)
+        # Read from the cookie; no database access
+        session_key = session.session_key if session is not None else None
+
         response = self.get_response(request)
-        
+
         # Don't add no-cache headers to static files, media files, or API responses
         if request.path.startswith('/static/') or request.path.startswith('/media/'):
             return response
-        
+
+        if etag_mode and session_key and request.session.session_key != session_key:
+            # Logged out, logged in again or expired: forget pages of the old session
+            response['Clear-Site-Data'] = '"cache"'
+
+        if etag_mode and response.has_header('ETag') and (
+            response.status_code == 304 or 'text/html' in response.get('Content-Type', '')
+        ):
+            # Kept by this browser only and revalidated before every use
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
         # For HTML responses, add no-cache headers
-        if hasattr(response, 'content_type') and 'text/html' in response.get('Content-Type', ''):
+        if 'text/html' in response.get('Content-Type', ''):
             response['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
             response['Pragma'] = 'no-cache'
             response['Expires'] = '0'
-        
-        return response
-
 
+        return response
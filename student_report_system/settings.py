@@ -107,6 +107,40 @@ else:
         }
     }
 
+# Cache (dashboards are cached here, see reports.dashboards): locmem only
+# suits a single server process; use file or redis (needs the redis package)
+# when several processes serve the site so they see the same invalidations
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'django') if CACHE_BACKEND == 'file' else ''),
+    }
+}
+# Seconds a cached dashboard may be served before it is recomputed anyway
+DASHBOARD_CACHE_SECONDS = config('DASHBOARD_CACHE_SECONDS', default=300, cast=int)
+
+# Session storage: db, cached_db (reads served from the cache above, which
+# must then be shared by all processes so logouts reach them) or
+# signed_cookies (no server-side storage; a session cannot be revoked
+# before it expires, and logout only clears the browser's cookie)
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_BACKEND = config('SESSION_BACKEND', default='db')
+SESSION_ENGINE = SESSION_ENGINES.get(SESSION_BACKEND, SESSION_BACKEND)
+
+# Browser caching of pages (see student_report_system.middleware): no-store,
+# or etag to let browsers revalidate the dashboards and get 304 if unchanged
+PAGE_CACHE_MODE = config('PAGE_CACHE_MODE', default='no-store')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -181,6 +215,51 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@student-repo
 # Site URL for email links
 SITE_URL = config('SITE_URL', default='http://127.0.0.1:8000')
 
+# Report full-text search (see reports.search)
+REPORT_SEARCH_LIMIT = config('REPORT_SEARCH_LIMIT', default=500, cast=int)
+REPORT_SEARCH_BUDGET_MS = config('REPORT_SEARCH_BUDGET_MS', default=250, cast=int)
+
+# Processes hashing passwords during bulk user import (0 = one per CPU)
+USER_IMPORT_WORKERS = config('USER_IMPORT_WORKERS', default=0, cast=int)
+
+# Background text extraction (see reports.extraction): parallel child
+# processes, and the wall time and address space each may use
+REPORT_EXTRACTION_WORKERS = config('REPORT_EXTRACTION_WORKERS', default=2, cast=int)
+REPORT_EXTRACTION_TIMEOUT = config('REPORT_EXTRACTION_TIMEOUT', default=30, cast=int)
+REPORT_EXTRACTION_MEMORY_MB = config('REPORT_EXTRACTION_MEMORY_MB', default=512, cast=int)
+
+# Report files are checked against their extension while they stream in
+# (see reports.upload_handlers), before the rest is buffered or spooled
+FILE_UPLOAD_HANDLERS = [
+    'reports.upload_handlers.ContentSniffingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Report uploads: largest file accepted, largest chunk of a resumable upload
+# (see reports.uploads; keep below the proxy's client_max_body_size), and
+# hours before an abandoned resumable upload is removed by expire_uploads
+REPORT_MAX_UPLOAD_MB = config('REPORT_MAX_UPLOAD_MB', default=5, cast=int)
+REPORT_UPLOAD_CHUNK_MB = config('REPORT_UPLOAD_CHUNK_MB', default=4, cast=int)
+REPORT_UPLOAD_EXPIRY_HOURS = config('REPORT_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Near-duplicate detection (see reports.similarity): estimated share of
+# common word shingles from which two students' reports are flagged
+REPORT_SIMILARITY_THRESHOLD = config('REPORT_SIMILARITY_THRESHOLD', default=0.5, cast=float)
+
+# Report thumbnails (see reports.thumbnails): LRU disk cache location and
+# size, image format (webp or png) and background render threads
+REPORT_THUMBNAIL_DIR = config('REPORT_THUMBNAIL_DIR', default=str(BASE_DIR / 'cache' / 'thumbnails'))
+REPORT_THUMBNAIL_CACHE_MB = config('REPORT_THUMBNAIL_CACHE_MB', default=256, cast=int)
+REPORT_THUMBNAIL_FORMAT = config('REPORT_THUMBNAIL_FORMAT', default='webp')
+REPORT_THUMBNAIL_WORKERS = config('REPORT_THUMBNAIL_WORKERS', default=2, cast=int)
+
+# Who transfers report files after the access checks (see reports.delivery):
+# django, sendfile, x-accel-redirect (nginx) or x-sendfile (Apache/lighttpd)
+REPORT_FILE_DELIVERY = config('REPORT_FILE_DELIVERY', default='django')
+# Internal nginx location aliased to MEDIA_ROOT for x-accel-redirect
+REPORT_FILE_ACCEL_PREFIX = config('REPORT_FILE_ACCEL_PREFIX', default='/protected-media/')
+
 # Logging configuration
 LOGGING = {
     'version': 1,